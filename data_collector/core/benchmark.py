@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+import subprocess
+
+# Root of the repository, each case runs inside its own package directory
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Fixed scenarios over the bundled networks: 3x3 grid (data_collector) and StudyArea (sumo_running_simulation)
+DEFAULT_CASES = (
+    {"name": "grid_bare", "package": "data_collector", "steps": 1000, "seed": 1,
+     "logging": False, "node_logging": False, "graph_export": False},
+    {"name": "grid_logging", "package": "data_collector", "steps": 1000, "seed": 1,
+     "logging": True, "node_logging": True, "graph_export": False},
+    {"name": "grid_full", "package": "data_collector", "steps": 1000, "seed": 1,
+     "logging": True, "node_logging": True, "graph_export": True},
+    {"name": "study_bare", "package": "sumo_running_simulation", "steps": 1000, "seed": 1,
+     "logging": False, "eta_tracking": False},
+    {"name": "study_logging", "package": "sumo_running_simulation", "steps": 1000, "seed": 1,
+     "logging": True, "eta_tracking": False},
+    {"name": "study_eta", "package": "sumo_running_simulation", "steps": 1000, "seed": 1,
+     "logging": False, "eta_tracking": True},
+    # SUMO-free load tests of the controllers on a synthetic 30x30 grid (see core/mock_backend.py)
+    {"name": "mock_10k", "package": "data_collector", "steps": 200, "seed": 1, "backend": "mock", "vehicles": 10000,
+     "logging": False, "node_logging": False, "graph_export": False},
+    {"name": "mock_100k", "package": "data_collector", "steps": 50, "seed": 1, "backend": "mock", "vehicles": 100000,
+     "logging": False, "node_logging": False, "graph_export": False},
+)
+
+# Metric -> direction of a regression ("lower" means a drop is a regression)
+REGRESSION_METRICS = {
+    "steps_per_sec": "lower",
+    "calls_per_step": "higher",
+    "peak_rss_mb": "higher",
+    "log_bytes": "higher",
+}
+
+def run_case(case, backend="traci"):
+    """ Runs one case in a fresh interpreter inside its package directory and returns its measurements (a case may pin its own backend). """
+    completed = subprocess.run(
+        [sys.executable, "-m", "main.benchmark_case", json.dumps(dict({"backend": backend}, **case))],
+        cwd=os.path.join(REPO_ROOT, case["package"]), capture_output=True, text=True,
+    )
+    lines = completed.stdout.strip().splitlines()
+    if completed.returncode != 0 or not lines:
+        raise RuntimeError(f"Benchmark case {case['name']} failed: {completed.stderr.strip()[-500:]}")
+    return json.loads(lines[-1])
+
+
+class BenchmarkSuite:
+    """ Runs the benchmark cases headless, stores the results as JSON and compares them with a baseline. """
+
+    def __init__(self, cases=DEFAULT_CASES, repeat=3, backend="traci"):
+        """
+        :param cases: Case dicts (see DEFAULT_CASES), each run in its own process.
+        :param repeat: Runs per case, the median of every metric is reported.
+        :param backend: SUMO backend of every case not pinning its own ("traci" or "libsumo").
+        """
+        self.cases = cases
+        self.repeat = repeat
+        self.backend = backend
+
+    def run(self):
+        """ Runs every case repeat times and returns the results document. """
+        results = {}
+        for case in self.cases:
+            runs = [run_case(case, self.backend) for _ in range(self.repeat)]
+            result = {metric: statistics.median(run[metric] for run in runs) for metric in runs[0]}
+            result["case"] = case
+            results[case["name"]] = result
+            print(f"⏱️ {case['name']}: {result['steps_per_sec']:.1f} steps/s, {result['calls_per_step']:.1f} calls/step, "
+                  f"{result['peak_rss_mb']:.0f} MB peak RSS, {result['log_bytes']:.0f} log bytes")
+        return {
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": self.backend,
+            "repeat": self.repeat,
+            "results": results,
+        }
+
+    @staticmethod
+    def save(document, path):
+        """ Writes a results document as JSON. """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as results_file:
+            json.dump(document, results_file, indent=2)
+
+    @staticmethod
+    def load(path):
+        """ Reads a results document written by save(). """
+        with open(path, encoding="utf-8") as results_file:
+            return json.load(results_file)
+
+    @staticmethod
+    def compare(document, baseline, threshold=0.10):
+        """
+        Compares results with a baseline document.
+
+        :param threshold: Relative change (0.10 = 10%) in the wrong direction that counts as a regression.
+        :return: List of (case, metric, baseline value, current value, relative change) regressions.
+        """
+        regressions = []
+        for name, result in document["results"].items():
+            reference = baseline["results"].get(name)
+            if reference is None:
+                continue
+            for metric, direction in REGRESSION_METRICS.items():
+                before, after = reference.get(metric), result.get(metric)
+                if not before or after is None:
+                    continue
+                change = (after - before) / before
+                if (direction == "lower" and change < -threshold) or (direction == "higher" and change > threshold):
+                    regressions.append((name, metric, before, after, change))
+        return regressions
@@ -0,0 +1,272 @@
+import os
+import heapq
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import quoteattr
+import numpy as np
+from .net_tables import load_net_tables
+
+# How departure times are spread over [begin, end]
+DEPARTURE_PROFILES = ("uniform", "peak", "ramp")
+
+# How origin and destination edges are picked:
+# "uniform" - every routable edge alike, "fringe" - edges entering or leaving the network boundary,
+# "central" - origins anywhere, destinations drawn towards the centre of the network
+OD_DISTRIBUTIONS = ("uniform", "fringe", "central")
+
+# Vehicles written per block - departure times, OD pairs and routes are drawn for one block at a time
+BLOCK_SIZE = 10_000
+
+# Attributes of the generated vehicle type
+DEFAULT_VTYPE = {"accel": "2.6", "decel": "4.5", "sigma": "0.5", "length": "5.0", "maxSpeed": "20.0"}
+
+
+class RoadGraph:
+    """
+    Edge-to-edge graph of the network for one vehicle class, built from the cached NetworkTables.
+
+    Nodes are the normal edges the class may drive on, arcs the lane connections between them
+    (internal via lanes are skipped). Arc costs are free-flow travel times of the target edge.
+    """
+
+    def __init__(self, tables, vehicle_class="passenger"):
+        """
+        :param tables: NetworkTables of the network (see load_net_tables).
+        :param vehicle_class: SUMO vehicle class the routes are computed for.
+        """
+        self.tables = tables
+        lane_edge = tables.lane_edge
+        allowed_lanes = np.array([tables.is_lane_allowed(lane, vehicle_class) for lane in range(len(tables.lane_ids))],
+                                 dtype=bool)
+        # an edge is routable when it is not internal and at least one of its lanes admits the class
+        routable = np.zeros(len(tables.edge_ids), dtype=bool)
+        routable[lane_edge[allowed_lanes]] = True
+        internal = [edge for edge in range(len(tables.edge_ids)) if tables.is_internal_edge(edge)]
+        routable[internal] = False
+        self.edges = np.flatnonzero(routable)
+
+        self.successors = {int(edge): set() for edge in self.edges}
+        from_lanes, to_lanes = tables.connection_from_lane, tables.connection_to_lane
+        usable = allowed_lanes[from_lanes] & allowed_lanes[to_lanes]
+        for from_edge, to_edge in zip(lane_edge[from_lanes[usable]].tolist(), lane_edge[to_lanes[usable]].tolist()):
+            if from_edge in self.successors and to_edge in self.successors and from_edge != to_edge:
+                self.successors[from_edge].add(to_edge)
+        self.successors = {edge: sorted(targets) for edge, targets in self.successors.items()}
+
+        first_lanes = tables.edge_first_lane[self.edges]
+        speeds = np.maximum(tables.lane_speed[first_lanes], 0.1)
+        self.travel_times = dict(zip(self.edges.tolist(), (tables.lane_length[first_lanes] / speeds).tolist()))
+        self.trees = {}  # origin edge -> predecessor of every reachable edge
+
+    def get_fringe_edges(self):
+        """ Returns (origin edges, destination edges) at the network boundary: no way in, respectively no way out. """
+        has_predecessor = {target for targets in self.successors.values() for target in targets}
+        origins = [edge for edge in self.successors if edge not in has_predecessor]
+        destinations = [edge for edge, targets in self.successors.items() if not targets]
+        # a network without dead ends (e.g. a grid with turnarounds) counts edges touching its outermost junctions
+        if not origins or not destinations:
+            tables = self.tables
+            junction_degree = np.bincount(np.concatenate((tables.edge_from[self.edges], tables.edge_to[self.edges])),
+                                          minlength=len(tables.junction_ids))
+            boundary = junction_degree <= np.percentile(junction_degree[junction_degree > 0], 50)
+            origins = origins or [edge for edge in self.successors if boundary[tables.edge_from[edge]]]
+            destinations = destinations or [edge for edge in self.successors if boundary[tables.edge_to[edge]]]
+        return origins, destinations
+
+    def get_route(self, origin, destination):
+        """ Returns the fastest route from one edge to another as a list of edge indices, or None if there is none. """
+        tree = self.trees.get(origin)
+        if tree is None:
+            tree = self.trees[origin] = self._shortest_path_tree(origin)
+        if destination not in tree:
+            return None
+        route = [destination]
+        while route[-1] != origin:
+            route.append(tree[route[-1]])
+        route.reverse()
+        return route
+
+    def _shortest_path_tree(self, origin):
+        """ Dijkstra from one edge, returns the predecessor of every reachable edge. Computed once per origin. """
+        costs = {origin: 0.0}
+        predecessors = {origin: origin}
+        queue = [(0.0, origin)]
+        while queue:
+            cost, edge = heapq.heappop(queue)
+            if cost > costs[edge]:
+                continue
+            for target in self.successors[edge]:
+                target_cost = cost + self.travel_times[target]
+                if target_cost < costs.get(target, float("inf")):
+                    costs[target] = target_cost
+                    predecessors[target] = edge
+                    heapq.heappush(queue, (target_cost, target))
+        return predecessors
+
+
+class DemandGenerator:
+    """
+    Writes a SUMO route file with a chosen number of vehicles on an existing network.
+
+    Departure times follow a departure profile, origins and destinations an OD distribution, and every
+    route is the fastest free-flow path on the cached network graph. The file is written block by block,
+    each distinct route once before its first vehicle, so besides the sorted departure times (8 bytes per
+    vehicle) memory only grows with the number of distinct routes, not with the vehicle count.
+    """
+
+    def __init__(self, network_path, vehicles=1000, begin=0.0, end=3600.0, departure_profile="uniform",
+                 od_distribution="uniform", seed=None, vehicle_class="passenger", vtype=None, min_route_edges=2,
+                 peak_time=None, peak_width=None, cache_dir=None):
+        """
+        :param network_path: SUMO .net.xml file, or a .sumocfg configuration referencing it.
+        :param vehicles: Number of vehicles to generate.
+        :param begin: First departure time (s).
+        :param end: Last departure time (s).
+        :param departure_profile: "uniform" (constant rate), "peak" (normal around peak_time) or "ramp" (rate growing linearly).
+        :param od_distribution: "uniform", "fringe" or "central" (see OD_DISTRIBUTIONS).
+        :param seed: Seed of the random generator, the same seed writes the same file.
+        :param vehicle_class: SUMO vehicle class of the vehicles, only lanes admitting it are routed on.
+        :param vtype: Attributes of the vehicle type (default: DEFAULT_VTYPE).
+        :param min_route_edges: Shortest route kept, OD pairs with shorter routes are drawn again.
+        :param peak_time: Centre of the "peak" profile (default: the middle of [begin, end]).
+        :param peak_width: Standard deviation (s) of the "peak" profile (default: a sixth of [begin, end]).
+        :param cache_dir: Directory of the network tables cache (see load_net_tables).
+        """
+        if departure_profile not in DEPARTURE_PROFILES:
+            raise ValueError(f"Unknown departure profile '{departure_profile}', expected one of {DEPARTURE_PROFILES}")
+        if od_distribution not in OD_DISTRIBUTIONS:
+            raise ValueError(f"Unknown OD distribution '{od_distribution}', expected one of {OD_DISTRIBUTIONS}")
+        if end < begin:
+            raise ValueError(f"Departure window ends ({end}) before it begins ({begin})")
+        self.network_path = network_path
+        self.vehicles = vehicles
+        self.begin = begin
+        self.end = end
+        self.departure_profile = departure_profile
+        self.od_distribution = od_distribution
+        self.seed = seed
+        self.vehicle_class = vehicle_class
+        self.vtype = dict(vtype or DEFAULT_VTYPE)
+        self.min_route_edges = min_route_edges
+        self.peak_time = peak_time if peak_time is not None else (begin + end) / 2
+        self.peak_width = peak_width if peak_width is not None else max(end - begin, 1.0) / 6
+
+        self.tables = load_net_tables(network_path, cache_dir)
+        self.graph = RoadGraph(self.tables, vehicle_class)
+        self.origins, self.origin_weights, self.destinations, self.destination_weights = self._get_od_candidates()
+        self.random = np.random.default_rng(seed)
+
+    def _get_od_candidates(self):
+        """ Returns (origin edges, their weights, destination edges, their weights) of the OD distribution. """
+        edges = list(self.graph.successors)
+        if not edges:
+            raise ValueError(f"No edge of {self.network_path} admits vehicle class '{self.vehicle_class}'")
+        origins, destinations = edges, edges
+        destination_weights = None
+        if self.od_distribution == "fringe":
+            origins, destinations = self.graph.get_fringe_edges()
+        elif self.od_distribution == "central":
+            tables = self.tables
+            to_junctions = tables.edge_to[destinations]
+            x, y = tables.junction_x[to_junctions], tables.junction_y[to_junctions]
+            distance = np.hypot(x - x.mean(), y - y.mean())
+            scale = max(float(distance.std()), 1.0)
+            destination_weights = np.exp(-0.5 * (distance / scale) ** 2)
+        # origins are weighted by their lane count, so wide roads carry more traffic
+        origin_weights = self.tables.edge_lane_count[origins].astype(np.float64)
+        if destination_weights is None:
+            destination_weights = self.tables.edge_lane_count[destinations].astype(np.float64)
+        return (np.array(origins), origin_weights / origin_weights.sum(),
+                np.array(destinations), destination_weights / destination_weights.sum())
+
+    def get_departures(self):
+        """ Returns the sorted departure times (s) of all vehicles, drawn from the departure profile. """
+        span = self.end - self.begin
+        if self.departure_profile == "uniform":
+            times = self.begin + self.random.random(self.vehicles) * span
+        elif self.departure_profile == "ramp":
+            # density growing linearly from begin to end - the inverse of its CDF is a square root
+            times = self.begin + np.sqrt(self.random.random(self.vehicles)) * span
+        else:
+            times = np.clip(self.random.normal(self.peak_time, self.peak_width, self.vehicles), self.begin, self.end)
+        return np.round(np.sort(times), 2)
+
+    def _draw_routes(self, count):
+        """ Draws OD pairs until count routes of at least min_route_edges edges are found. Returns the routes. """
+        routes = []
+        attempts = 0
+        while len(routes) < count:
+            wanted = count - len(routes)
+            origins = self.random.choice(self.origins, size=wanted, p=self.origin_weights)
+            destinations = self.random.choice(self.destinations, size=wanted, p=self.destination_weights)
+            for origin, destination in zip(origins.tolist(), destinations.tolist()):
+                route = self.graph.get_route(origin, destination)
+                if route is not None and len(route) >= self.min_route_edges:
+                    routes.append(tuple(route))
+            attempts += wanted
+            if attempts > 100 * count + 1000 and len(routes) < count / 100:
+                raise ValueError(f"Almost no OD pair of {self.network_path} is connected for vehicle class "
+                                 f"'{self.vehicle_class}' with at least {self.min_route_edges} edges")
+        return routes
+
+    def write(self, path):
+        """
+        Streams the route file to path, replacing it atomically.
+
+        :return: Dict with the numbers of vehicles and distinct routes written.
+        """
+        departures = self.get_departures()
+        edge_ids = self.tables.edge_ids
+        route_ids = {}
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8", buffering=1 << 20) as route_file:
+            route_file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            route_file.write(f"<!-- generated by core/demand_generator.py: {self.vehicles} vehicles, "
+                             f"{self.departure_profile} departures, {self.od_distribution} OD, seed {self.seed} -->\n")
+            route_file.write("<routes>\n")
+            attributes = " ".join(f"{name}={quoteattr(str(value))}" for name, value in self.vtype.items())
+            route_file.write(f'    <vType id="synthetic" vClass={quoteattr(self.vehicle_class)} {attributes}/>\n')
+            for block_start in range(0, self.vehicles, BLOCK_SIZE):
+                block_departures = departures[block_start:block_start + BLOCK_SIZE]
+                lines = []
+                for index, (depart, route) in enumerate(zip(block_departures.tolist(),
+                                                            self._draw_routes(len(block_departures))), block_start):
+                    route_id = route_ids.get(route)
+                    if route_id is None:
+                        route_id = route_ids[route] = f"synthetic_route_{len(route_ids)}"
+                        edges = " ".join(edge_ids[edge] for edge in route)
+                        lines.append(f'    <route id="{route_id}" edges={quoteattr(edges)}/>\n')
+                    lines.append(f'    <vehicle id="synthetic_{index}" type="synthetic" route="{route_id}" '
+                                 f'depart="{depart:.2f}" departLane="best" departSpeed="max"/>\n')
+                route_file.write("".join(lines))
+            route_file.write("</routes>\n")
+        os.replace(tmp_path, path)
+        return {"vehicles": self.vehicles, "routes": len(route_ids)}
+
+
+def write_sumo_config(source_config, route_path, config_path, end=None):
+    """
+    Writes a copy of a .sumocfg configuration that loads a generated route file instead of its own.
+
+    :param source_config: Configuration whose network and options are kept.
+    :param route_path: Generated route file.
+    :param config_path: Where the new configuration is written.
+    :param end: Simulation end time (s) of the new configuration (default: unchanged).
+    """
+    source_dir = os.path.dirname(os.path.abspath(source_config))
+    config_dir = os.path.dirname(os.path.abspath(config_path))
+    tree = ET.parse(source_config)
+    root = tree.getroot()
+    inputs = root.find("input")
+    # the input files are relative to the configuration, rebase them onto the new one's directory
+    for element in inputs:
+        paths = [os.path.join(source_dir, value.strip()) for value in element.get("value", "").split(",") if value.strip()]
+        element.set("value", ",".join(os.path.relpath(path, config_dir) for path in paths))
+    route_files = inputs.find("route-files")
+    if route_files is None:
+        route_files = ET.SubElement(inputs, "route-files")
+    route_files.set("value", os.path.relpath(route_path, config_dir))
+    if end is not None:
+        end_element = root.find("time/end")
+        if end_element is not None:
+            end_element.set("value", str(end))
+    tree.write(config_path, encoding="unicode")
@@ -0,0 +1,137 @@
+import os
+import queue
+import multiprocessing
+
+def _render_worker(frames, static_scene, output_dir, rendered):
+    """
+    Renderer process: builds the static part of the figure once, then only updates the labels of every frame.
+
+    :param frames: Queue of (step, junction vehicle counts, edge vehicle counts) tuples, None stops the worker.
+    :param static_scene: Dict with "junctions" [(id, x, y)] and "edges" [(id, x1, y1, x2, y2)].
+    :param rendered: Shared counter of the frames written so far.
+    """
+    # Figure + Agg canvas instead of pyplot: no global state and no GUI backend in the worker
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    figure = Figure(figsize=(12, 10))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    label_box = dict(facecolor='white', alpha=0.6, edgecolor='none')
+
+    # static artists: edge lines and junction markers never change
+    edge_labels = []
+    for _, x1, y1, x2, y2 in static_scene["edges"]:
+        axes.plot([x1, x2], [y1, y2], 'gray', zorder=1)
+        # label at 40% of the way from the source, so the two directions of a road do not overlap
+        edge_labels.append(axes.text(x1 + (x2 - x1) * 0.4, y1 + (y2 - y1) * 0.4 - 40, "", fontsize=10, ha='center',
+                                     zorder=10, bbox=label_box))
+
+    junction_labels = []
+    for junction_id, x, y in static_scene["junctions"]:
+        axes.scatter(x, y, s=100, c='red', edgecolors='black', zorder=5)
+        junction_labels.append((junction_id, axes.text(x, y + 20, "", fontsize=12, ha='center', zorder=10, bbox=label_box)))
+
+    axes.set_title("SUMO Network Graph")
+    axes.set_xlabel("X Coordinate")
+    axes.set_ylabel("Y Coordinate")
+    axes.grid(True)
+
+    while True:
+        frame = frames.get()
+        if frame is None:
+            break
+        step, junction_counts, edge_counts = frame
+        for (junction_id, label), count in zip(junction_labels, junction_counts):
+            label.set_text(f"{junction_id}\nVehicles: {count}")
+        for label, count in zip(edge_labels, edge_counts):
+            label.set_text(str(count))
+        figure.savefig(os.path.join(output_dir, f"network_graph_step_{step}.png"))
+        with rendered.get_lock():
+            rendered.value += 1
+
+
+class NetworkGraphRenderer:
+    """ Renders network graph snapshots in a background process, so graph export never stalls the simulation loop. """
+
+    def __init__(self, logger, topology, junction_ids, output_dir=".", max_pending_frames=64):
+        """
+        :param topology: NetworkTopology providing junction positions and edge endpoints.
+        :param junction_ids: Junctions drawn in the graph (their real edges are drawn as well).
+        :param output_dir: Directory receiving the network_graph_step_<step>.png files.
+        :param max_pending_frames: Frames waiting for the renderer before new ones are dropped.
+        """
+        self.logger = logger
+        self.junction_ids = tuple(junction_ids)
+
+        # every real edge touching a drawn junction is drawn once, from its source to its destination junction
+        self.edge_ids = tuple(sorted({edge for junction_id in self.junction_ids
+                                      for edge in topology.junction_real_edges[junction_id]}))
+        positions = topology.junction_positions
+        static_scene = {
+            "junctions": [(junction_id, *positions[junction_id]) for junction_id in self.junction_ids],
+            "edges": [(edge, *positions[topology.edge_endpoints[edge][0]], *positions[topology.edge_endpoints[edge][1]])
+                      for edge in self.edge_ids],
+        }
+
+        os.makedirs(output_dir, exist_ok=True)
+        # spawn instead of fork: the parent already runs the log writer threads
+        context = multiprocessing.get_context("spawn")
+        self.frames = context.Queue(maxsize=max_pending_frames)
+        self.rendered_frames = context.Value("i", 0)
+        self.worker = context.Process(target=_render_worker, args=(self.frames, static_scene, output_dir, self.rendered_frames),
+                                      daemon=True)
+        self.worker.start()
+        self.submitted_frames = 0
+        self.dropped_frames = 0
+        self.worker_failed = False
+
+    def submit(self, step, junction_counts, edge_counts):
+        """
+        Queues one frame for rendering without waiting for it.
+
+        :param junction_counts: Dict of junction ID -> number of vehicles near the junction.
+        :param edge_counts: Dict of edge ID -> number of vehicles on the edge.
+        """
+        if not self.worker.is_alive():
+            # e.g. matplotlib is missing or savefig raised - the queue would only fill up
+            self.dropped_frames += 1
+            if not self.worker_failed:
+                self.worker_failed = True
+                self.logger.log(f"❌ Graph renderer process exited with code {self.worker.exitcode}, "
+                                f"network graphs are no longer exported (from step {step})", "ERROR", "red",
+                                class_name="NetworkGraphRenderer", function_name="submit")
+            return
+        frame = (step,
+                 [junction_counts.get(junction_id, 0) for junction_id in self.junction_ids],
+                 [edge_counts.get(edge, 0) for edge in self.edge_ids])
+        try:
+            self.frames.put_nowait(frame)
+            self.submitted_frames += 1
+        except queue.Full:
+            self.dropped_frames += 1
+            self.logger.log(f"⚠️ Graph renderer is busy, dropped the frame of step {step}", "WARNING", "yellow",
+                            class_name="NetworkGraphRenderer", function_name="submit")
+
+    def close(self, timeout=60.0):
+        """
+        Waits for the pending frames to be rendered and stops the renderer process.
+
+        :param timeout: Seconds to wait for the renderer, after which it is terminated with its pending frames.
+        """
+        if self.worker.is_alive():
+            try:
+                self.frames.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self.worker.join(timeout)
+        if self.worker.is_alive():
+            self.worker.terminate()
+            self.worker.join()
+            self.logger.log(f"⚠️ Graph renderer did not finish within {timeout} s, terminated it", "WARNING", "yellow",
+                            class_name="NetworkGraphRenderer", function_name="close")
+        # frames still buffered for a dead worker must not block the interpreter exit
+        self.frames.cancel_join_thread()
+        self.logger.log(f"✅ Network graph renderer finished: {self.rendered_frames.value} of {self.submitted_frames} "
+                        f"queued frames rendered, {self.dropped_frames} dropped", "INFO", "green",
+                        class_name="NetworkGraphRenderer", function_name="close")
@@ -1,86 +1,70 @@
-import traci
-import networkx as nx
-import matplotlib.pyplot as plt
+import numpy as np
+from .graph_renderer import NetworkGraphRenderer
+from .junction_proximity import JunctionProximityIndex
 
 class JunctionController:
     """ Handles operations related to junctions (static nodes) in the SUMO simulation. """
 
-    def __init__(self, logger):
+    def __init__(self, logger, sumo, topology, step_state, proximity_radius=20.0, graph_dir="."):
+        """
+        :param proximity_radius: Distance (m) within which a vehicle is counted as being in a junction.
+        :param graph_dir: Directory receiving the exported network graph images.
+        """
         self.logger = logger
+        self.sumo = sumo
+        self.topology = topology
+        self.step_state = step_state
+        self.graph_dir = graph_dir
+        self.graph_renderer = None
+
+        # vehicles near each real junction, counted locally from the vehicle positions snapshot
+        self.proximity = JunctionProximityIndex(topology.real_junction_ids, topology.junction_positions, proximity_radius)
+        self.junction_vehicle_counts = np.zeros(len(self.proximity.junction_ids), dtype=np.int64)
 
     def get_all_junctions(self):
         """ Retrieves all static junctions in the network. """
-        junctions = traci.junction.getIDList()
+        junctions = self.topology.junction_ids
         self.logger.log(f"📍 Static Junctions Retrieved: {junctions}", "INFO",
                         class_name="JunctionController", function_name="get_all_junctions")
         return junctions
 
-    def subscribe_to_junctions(self):
-        """ Subscribes all junctions to track vehicles in their vicinity. """
-        for junction_id in traci.junction.getIDList():
-            traci.junction.subscribeContext(
-                junction_id,
-                traci.constants.CMD_GET_VEHICLE_VARIABLE,  # vehicle information
-                20.0  # radius in meters to track vehicles around the junction
-            )
+    def update_vehicle_counts(self):
+        """ Counts the vehicles near every real junction from the current step state. Call once per step. """
+        self.junction_vehicle_counts = self.proximity.count(self.step_state.positions)
+
+    def get_vehicle_count(self, junction_id):
+        """ Returns the number of vehicles near a junction at the last count (0 for internal junctions). """
+        index = self.proximity.junction_index.get(junction_id)
+        return int(self.junction_vehicle_counts[index]) if index is not None else 0
 
     def get_junction_info(self, junction_id):
         """ Retrieves detailed information about a specific junction. """
-        info = {}
-
-        # position of the junction
-        position = traci.junction.getPosition(junction_id)
-        info["Position"] = f"({position[0]:.2f}, {position[1]:.2f})"
+        # position, edges and lanes never change - they come from the topology cache
+        info = self.topology.get_static_info(junction_id)
 
         # count of vehicles in the junction
-        vehicles_nearby = traci.junction.getContextSubscriptionResults(junction_id)
-        vehicle_count = len(vehicles_nearby) if vehicles_nearby else 0
-        info["Vehicles in Junction"] = vehicle_count
+        info["Vehicles in Junction"] = self.get_vehicle_count(junction_id)
 
         # traffic light state
-        if junction_id in traci.trafficlight.getIDList():
-            light_state = traci.trafficlight.getRedYellowGreenState(junction_id)
+        if self.topology.has_traffic_light(junction_id):
+            light_state = self.sumo.trafficlight.getRedYellowGreenState(junction_id)
             info["Traffic Light State"] = light_state
         else:
             info["Traffic Light State"] = "No Traffic Light"
 
-        # finding all edges connected to the junction
-        incoming_edges = traci.junction.getIncomingEdges(junction_id)
-        outgoing_edges = traci.junction.getOutgoingEdges(junction_id)
-        all_edges = list(set(incoming_edges + outgoing_edges))
-
-        # internal edges are edges that are not connected to any other 
-        real_edges = [edge for edge in all_edges if not edge.startswith(":")]
-        internal_edges = [edge for edge in all_edges if edge.startswith(":")]
-
-        info["Connected Edges"] = real_edges
-        info["Internal Edges"] = internal_edges
-
-        # finding all lanes connected to the junction
-        real_lanes = []
-        internal_lanes = []
-
-        for edge in real_edges:
-            lane_count = traci.edge.getLaneNumber(edge)
-            for i in range(lane_count):
-                lane_id = f"{edge}_{i}"
-                real_lanes.append(lane_id)
-
-        for edge in internal_edges:
-            lane_count = traci.edge.getLaneNumber(edge)
-            for i in range(lane_count):
-                lane_id = f"{edge}_{i}"
-                internal_lanes.append(lane_id)
-
-        info["Connected Lanes"] = real_lanes
-        info["Internal Lanes"] = internal_lanes
-
-        # # if true - export the network graph
-        # if export_graph:
-        #     self.export_network_graph()
-
         return info
 
+    def get_junction_states(self, junction_ids=None):
+        """ Returns (junction ID, vehicle count, traffic light state) for the given junctions (default: all real junctions). """
+        states = []
+        for junction_id in junction_ids or self.topology.real_junction_ids:
+            if self.topology.has_traffic_light(junction_id):
+                light_state = self.sumo.trafficlight.getRedYellowGreenState(junction_id)
+            else:
+                light_state = ""
+            states.append((junction_id, self.get_vehicle_count(junction_id), light_state))
+        return states
+
     def log_all_junctions_info(self):
         """ Logs detailed information about all junctions in the simulation. """
         junctions = self.get_all_junctions()
@@ -97,51 +81,26 @@ class JunctionController:
                             class_name="JunctionController", function_name="log_all_junctions_info")
 
     def export_network_graph(self, step_number, _filtered_static_nodes):
-        """ Exports the network graph as an image using matplotlib. """
+        """ Exports the network graph as an image. Rendering happens in the background, only a snapshot of the counts is taken here. """
         self.logger.log("📡 Exporting network graph...", "INFO", 
                         class_name="JunctionController", function_name="export_network_graph")
 
-        # create figure
-        plt.figure(figsize=(12, 10))
-
-        # pull all junctions and their outgoing edges
-        junction_positions = {junction: traci.junction.getPosition(junction) for junction in _filtered_static_nodes}
-
-        for junction, position in junction_positions.items():
-            plt.scatter(position[0], position[1], s=100, c='red', edgecolors='black', zorder=5)
-
-            # get vehicles near the junction
-            vehicles_nearby = traci.junction.getContextSubscriptionResults(junction)
-            vehicle_count = len(vehicles_nearby) if vehicles_nearby else 0
-            plt.text(position[0], position[1] + 20, f"{junction}\nVehicles: {vehicle_count}", fontsize=12, ha='center', zorder=10, 
-                     bbox=dict(facecolor='white', alpha=0.6, edgecolor='none'))
-
-            # get real edges connected to the junction
-            incoming_edges = traci.junction.getIncomingEdges(junction)
-            outgoing_edges = traci.junction.getOutgoingEdges(junction)
-            all_edges = list(set(incoming_edges + outgoing_edges))
-            real_edges = [edge for edge in all_edges if not edge.startswith(":")]
-
-            # draw edges and count vehicles on them
-            for edge in real_edges:
-                outgoing_junction = traci.edge.getToJunction(edge)
-                outgoing_position = traci.junction.getPosition(outgoing_junction)
-                plt.plot([position[0], outgoing_position[0]], [position[1], outgoing_position[1]], 'gray', zorder=1)
-
-                # get vehicles on the edge
-                vehicles_on_edge = traci.edge.getLastStepVehicleNumber(edge)
-                mid_x = (position[0] + outgoing_position[0]) / 2
-                mid_y = (position[1] + outgoing_position[1]) / 2
-                plt.text(mid_x, mid_y - 40, str(vehicles_on_edge), fontsize=10, ha='center', zorder=10, 
-                            bbox=dict(facecolor='white', alpha=0.6, edgecolor='none'))
-
-        # save and close
-        plt.title("SUMO Network Graph")
-        plt.xlabel("X Coordinate")
-        plt.ylabel("Y Coordinate")
-        plt.grid(True)
-        plt.savefig(f"network_graph_step_{step_number}.png")
-        plt.close()
-
-        self.logger.log("✅ Network graph exported successfully as 'network_graph.png'", "INFO", 
+        # static artists are built once by the renderer, later frames only update the counts
+        if self.graph_renderer is None:
+            self.graph_renderer = NetworkGraphRenderer(self.logger, self.topology, _filtered_static_nodes, self.graph_dir)
+
+        # get vehicles near each junction
+        junction_counts = {junction: self.get_vehicle_count(junction) for junction in _filtered_static_nodes}
+
+        # count vehicles per edge from the subscribed road IDs instead of one query per edge
+        edge_counts = self.step_state.get_edge_counts()
+
+        self.graph_renderer.submit(step_number, junction_counts, edge_counts)
+        self.logger.log(f"✅ Network graph of step {step_number} queued as 'network_graph_step_{step_number}.png'", "INFO", 
                         class_name="JunctionController", function_name="export_network_graph")
+
+    def close(self):
+        """ Waits for the queued network graphs to be written. """
+        if self.graph_renderer is not None:
+            self.graph_renderer.close()
+            self.graph_renderer = None
@@ -0,0 +1,83 @@
+import numpy as np
+
+# Offsets of a grid cell and its 8 neighbours - with cells as large as the radius, every match lies in one of them
+_NEIGHBOUR_OFFSETS = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)], dtype=np.int64)
+
+def _cell_keys(cells):
+    """ Packs (x cell, y cell) pairs into one sortable int64 key per pair. """
+    return (cells[:, 0] << 32) + cells[:, 1]
+
+
+class JunctionProximityIndex:
+    """
+    Counts the vehicles within a radius of every junction from one batch of vehicle positions.
+
+    Junctions are binned once into a uniform grid whose cells are as large as the radius, and the
+    cell keys are kept sorted. A query bins the vehicles the same way and finds the candidate
+    junctions of the 9 surrounding cells with searchsorted, all vectorized with NumPy.
+    """
+
+    def __init__(self, junction_ids, junction_positions, radius=20.0):
+        """
+        :param junction_ids: IDs of the indexed junctions, counts are returned in this order.
+        :param junction_positions: Dict of junction ID -> (x, y).
+        :param radius: Distance (m) within which a vehicle counts as near a junction.
+        """
+        self.junction_ids = tuple(junction_ids)
+        self.junction_index = {junction_id: index for index, junction_id in enumerate(self.junction_ids)}
+        self.radius = float(radius)
+
+        positions = np.array([junction_positions[junction_id] for junction_id in self.junction_ids], dtype=np.float64).reshape(-1, 2)
+        keys = _cell_keys(np.floor(positions / self.radius).astype(np.int64))
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+        self.sorted_positions = positions[self.order]
+        # most junctions a single cell holds - bounds the candidate loop of a query
+        self.max_per_cell = int(np.unique(self.sorted_keys, return_counts=True)[1].max()) if len(keys) else 0
+
+    def match(self, vehicle_positions):
+        """
+        Finds every (vehicle, junction) pair closer than the radius.
+
+        :param vehicle_positions: Array of shape (vehicles, 2) with the vehicle x, y positions.
+        :return: (vehicle indices, junction indices) arrays, junction indices follow junction_ids.
+        """
+        positions = np.asarray(vehicle_positions, dtype=np.float64).reshape(-1, 2)
+        if not len(positions) or not self.max_per_cell:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+
+        cells = np.floor(positions / self.radius).astype(np.int64)
+        radius_squared = self.radius * self.radius
+        vehicle_matches, junction_matches = [], []
+        for offset in _NEIGHBOUR_OFFSETS:
+            keys = _cell_keys(cells + offset)
+            starts = np.searchsorted(self.sorted_keys, keys, side="left")
+            ends = np.searchsorted(self.sorted_keys, keys, side="right")
+            for k in range(self.max_per_cell):
+                vehicles = np.nonzero(starts + k < ends)[0]
+                if not len(vehicles):
+                    break
+                candidates = starts[vehicles] + k
+                deltas = positions[vehicles] - self.sorted_positions[candidates]
+                near = np.einsum("ij,ij->i", deltas, deltas) <= radius_squared
+                vehicle_matches.append(vehicles[near])
+                junction_matches.append(self.order[candidates[near]])
+
+        if not vehicle_matches:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        return np.concatenate(vehicle_matches), np.concatenate(junction_matches)
+
+    def count(self, vehicle_positions):
+        """ Returns the number of vehicles near each junction, as an array following junction_ids. """
+        _, junctions = self.match(vehicle_positions)
+        return np.bincount(junctions, minlength=len(self.junction_ids))
+
+    def vehicles_near(self, vehicle_positions, vehicle_ids):
+        """ Returns a dict of junction ID -> list of IDs of the vehicles near it (junctions without vehicles are left out). """
+        vehicles, junctions = self.match(vehicle_positions)
+        nearby = {}
+        for vehicle, junction in zip(vehicles.tolist(), junctions.tolist()):
+            nearby.setdefault(self.junction_ids[junction], []).append(vehicle_ids[vehicle])
+        return nearby
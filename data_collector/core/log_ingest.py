@@ -0,0 +1,300 @@
+import os
+import re
+import json
+import glob
+import math
+import time
+from array import array
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from .id_table import IdTable
+from .nodes_delta import read_nodes_log
+from .telemetry_writer import TELEMETRY_FORMATS, _import_pyarrow
+
+# Tables extracted from the text logs: name -> ((column, array typecode), ...)
+# Interned columns (vehicle, junction, light_state, road) hold indices into the ID lists of ids.json, -1 when absent.
+TABLES = {
+    "steps": (("step", "i"), ("vehicle_count", "i"), ("mean_speed", "d"), ("stopped", "i")),
+    "vehicles": (("step", "i"), ("vehicle", "i"), ("x", "d"), ("y", "d"), ("speed", "d"), ("lane", "h")),
+    "junctions": (("step", "i"), ("junction", "i"), ("vehicle_count", "i"), ("light_state", "i")),
+    "eta": (("step", "i"), ("vehicle", "i"), ("road", "i"), ("distance_remaining", "d"), ("eta", "d")),
+}
+
+# Records extracted from the logs, matched on their "[Class::function] message" part. Every pattern starts
+# with its source literal, so the regex engine skips ahead to candidate records instead of trying every line.
+# Logs are parsed as UTF-8 bytes: the emoji would make decoded text four bytes per character.
+STEP_RECORD = re.compile((r"\[SimulationRunner::run_simulation\] 🔹 Step (\d+): (\d+) vehicles on the road"
+                          r"(?: \(mean speed (\S+) m/s, (\d+) stopped\))?\n").encode("utf-8"))
+VEHICLE_RECORD = re.compile((r"\[VehicleController::log_vehicle_info\] 🚙 Vehicle (.+?): "
+                              r"Position \(([^,\n]+), ([^)\n]+)\), Speed (\S+) m/s, Lane (-?\d+)\n").encode("utf-8"))
+NODES_STEP_RECORD = re.compile((r"\[SimulationRunner::log_nodes\] 🔹 Step #(\d+)\n").encode("utf-8"))
+# multi-line junction block of the full nodes log (see JUNCTION_LOG_TEMPLATE in core/simulation_runner.py)
+JUNCTION_RECORD = re.compile((r"\[SimulationRunner::log_nodes\] 🔹 Junction (\S+) \n[^\n]*\n"
+                              r"[ \t]*🚗 Vehicles in Junction: (\d+)\n[ \t]*🚦 Traffic Light: ([^\n]*)\n").encode("utf-8"))
+ETA_RECORD = re.compile((r"\[ETAVehicleTracker::track_vehicle\] Step (\d+) \| Vehicle (.+?) \| "
+                         r"(?:Road: (.+?) \| ETA \(edge travel times\)|Distance remaining: (\S+) m \| ETA): (\S+) s\n").encode("utf-8"))
+TRACKED_VEHICLE_RECORD = re.compile((r"\[ETAVehicleTracker::track_vehicle\] Vehicle (.+?) info at step (\d+): "
+                                     r"Position=\(([^,\n]+), ([^)\n]+)\), Speed=(\S+) m/s\n").encode("utf-8"))
+
+# Bytes of log text parsed at a time, cut at a record boundary
+BLOCK_SIZE = 1 << 24
+
+class LogIngester:
+    """
+    Converts text logs (simulation_log.log, nodes_log.log, ETA_vehicle_log.log) into typed columnar tables.
+
+    Files are streamed in blocks and records are recognized by their Class::function source, so any mix of
+    log files can be ingested into one output directory. Rows are buffered per table and a chunk is written
+    once a table holds chunk_rows rows, memory stays bounded whatever the size of the logs.
+    The output has the layout of TelemetryWriter: <table>_<chunk>.npz/.parquet files plus ids.json.
+    """
+
+    def __init__(self, output_dir, chunk_rows=1_000_000, file_format="auto"):
+        """
+        :param output_dir: Directory receiving the chunk files and the ID index.
+        :param chunk_rows: Rows of a table buffered in memory before a chunk is written.
+        :param file_format: "npz", "parquet" or "auto" (parquet when pyarrow is available).
+        """
+        if file_format not in TELEMETRY_FORMATS:
+            raise ValueError(f"Unknown table format '{file_format}', expected one of {TELEMETRY_FORMATS}")
+        self.pa, self.pq = _import_pyarrow() if file_format != "npz" else (None, None)
+        if file_format == "parquet" and self.pa is None:
+            raise ImportError("Parquet tables require pyarrow (pip install pyarrow)")
+
+        self.output_dir = output_dir
+        self.chunk_rows = chunk_rows
+        self.file_format = "parquet" if file_format == "parquet" or (file_format == "auto" and self.pa is not None) else "npz"
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.vehicle_ids = IdTable()
+        self.junction_ids = IdTable()
+        self.light_states = IdTable()
+        self.road_ids = IdTable()
+        self.sources = []
+        self.chunks = dict.fromkeys(TABLES, 0)
+        self.rows = dict.fromkeys(TABLES, 0)
+        self.columns = {table: {name: array(typecode) for name, typecode in columns} for table, columns in TABLES.items()}
+
+    def ingest(self, log_path):
+        """
+        Appends the records of one log file to the tables.
+
+        :return: Dict of table name -> rows extracted from the file.
+        """
+        rows_before = dict(self.rows)
+        self.sources.append(log_path)
+        with open(log_path, "rb") as log_file:
+            # nodes logs in delta mode only record changes, they are rebuilt per step by their own reader
+            delta_mode = b"[NodesDeltaEncoder::" in log_file.read(1 << 16)
+        if delta_mode:
+            self._ingest_delta_nodes(log_path)
+        else:
+            self._ingest_records(log_path)
+        return {table: self.rows[table] - rows_before[table] for table in TABLES}
+
+    def _ingest_records(self, log_path):
+        """
+        Parses a log file block by block, including the multi-line junction blocks of the full nodes log.
+
+        Vehicle rows take the step of the step record before them, junction rows the step of the nodes log
+        step marker before them. Each block is split at these markers and every part is matched in one pass.
+        """
+        step = -1
+        nodes_step = -1
+        with open(log_path, "rb") as log_file:
+            rest = b""
+            while True:
+                text = log_file.read(BLOCK_SIZE)
+                block = rest + text
+                if text:
+                    # keep the last (possibly incomplete) record for the next block
+                    cut = block.rfind(b"\n[")
+                    if cut < 0:
+                        rest = block
+                        continue
+                    block, rest = block[:cut + 1], block[cut + 1:]
+                elif not block:
+                    break
+                else:
+                    rest = b""
+                if not block.endswith(b"\n"):
+                    block += b"\n"
+
+                if b"[SimulationRunner::run_simulation]" in block or b"[VehicleController::log_vehicle_info]" in block:
+                    step = self._ingest_steps(block, step)
+                if b"[SimulationRunner::log_nodes]" in block:
+                    nodes_step = self._ingest_junctions(block, nodes_step)
+                if b"[ETAVehicleTracker::track_vehicle]" in block:
+                    self._ingest_eta(block)
+                self.flush(final=False)
+                if not text:
+                    break
+
+    def _ingest_steps(self, block, step):
+        """ Extracts the step and vehicle records of a block. Returns the step of the last step record. """
+        parts = STEP_RECORD.split(block)
+        # parts: text before the first step record, then (step, count, mean speed, stopped, text after it) per record
+        self._extend_vehicles(step, VEHICLE_RECORD.findall(parts[0]))
+        for index in range(1, len(parts), 5):
+            step_text, count, mean_speed, stopped, text = parts[index:index + 5]
+            step = int(step_text)
+            self._extend("steps", (step,), (int(count),), (float(mean_speed) if mean_speed else math.nan,),
+                         (int(stopped) if stopped else -1,))
+            self._extend_vehicles(step, VEHICLE_RECORD.findall(text))
+        return step
+
+    def _extend_vehicles(self, step, records):
+        """ Appends the vehicle records (ID, x, y, speed, lane) found after a step record. """
+        if records:
+            v_ids, xs, ys, speeds, lanes = zip(*records)
+            self._extend("vehicles", repeat(step, len(records)), map(self.vehicle_ids.intern, v_ids),
+                         map(float, xs), map(float, ys), map(float, speeds), map(int, lanes))
+
+    def _ingest_junctions(self, block, nodes_step):
+        """ Extracts the junction blocks of a full nodes log. Returns the step of the last step marker. """
+        parts = NODES_STEP_RECORD.split(block)
+        for index in range(0, len(parts), 2):
+            if index:
+                nodes_step = int(parts[index - 1])
+            records = JUNCTION_RECORD.findall(parts[index])
+            if records:
+                junction_ids, counts, lights = zip(*records)
+                self._extend("junctions", repeat(nodes_step, len(records)), map(self.junction_ids.intern, junction_ids),
+                             map(int, counts), map(self.light_states.intern, lights))
+        return nodes_step
+
+    def _ingest_eta(self, block):
+        """ Extracts the ETA predictions and tracked vehicle states of an ETA log, both carry their own step. """
+        records = ETA_RECORD.findall(block)
+        if records:
+            steps, v_ids, roads, distances, etas = zip(*records)
+            self._extend("eta", map(int, steps), map(self.vehicle_ids.intern, v_ids),
+                         (self.road_ids.intern(road) if road else -1 for road in roads),
+                         (float(distance) if distance else math.nan for distance in distances), map(float, etas))
+        records = TRACKED_VEHICLE_RECORD.findall(block)
+        if records:
+            v_ids, steps, xs, ys, speeds = zip(*records)
+            self._extend("vehicles", map(int, steps), map(self.vehicle_ids.intern, v_ids),
+                         map(float, xs), map(float, ys), map(float, speeds), repeat(-1, len(records)))
+
+    def _ingest_delta_nodes(self, log_path):
+        """ Extracts the junction states of a nodes log written in delta mode, one full view per step. """
+        for view in read_nodes_log(log_path):
+            junctions = view["junctions"]
+            self._extend("junctions", repeat(view["step"], len(junctions)),
+                         (self.junction_ids.intern(junction_id.encode("utf-8")) for junction_id in junctions),
+                         (info["Vehicles in Junction"] for info in junctions.values()),
+                         (self.light_states.intern(info["Traffic Light State"].encode("utf-8")) for info in junctions.values()))
+            self.flush(final=False)
+
+    def _extend(self, table, *values):
+        """ Appends rows to a table, given as one iterable of values per column (in column order). """
+        columns = self.columns[table]
+        step_column = columns["step"]
+        rows_before = len(step_column)
+        for column, column_values in zip(columns.values(), values):
+            column.extend(column_values)
+        self.rows[table] += len(step_column) - rows_before
+
+    def flush(self, final=True):
+        """ Writes the buffered rows of every table (only the full ones unless final). """
+        for table, columns in self.columns.items():
+            if len(columns["step"]) and (final or len(columns["step"]) >= self.chunk_rows):
+                self._write_chunk(table)
+
+    def _write_chunk(self, table):
+        """ Writes the buffered rows of one table as a chunk in the configured format. """
+        columns = self.columns[table]
+        arrays = {name: np.frombuffer(column, dtype=column.typecode) if len(column) else np.array([], dtype=column.typecode)
+                  for name, column in columns.items()}
+        chunk_path = os.path.join(self.output_dir, f"{table}_{self.chunks[table]:05d}")
+        if self.file_format == "parquet":
+            self.pq.write_table(self.pa.table(arrays), chunk_path + ".parquet")
+        else:
+            np.savez(chunk_path + ".npz", **arrays)
+        self.chunks[table] += 1
+        self.columns[table] = {name: array(typecode) for name, typecode in TABLES[table]}
+
+    def close(self):
+        """ Writes the remaining rows and the ID index that maps the interned integers back to IDs. """
+        self.flush()
+        index = {
+            "format": self.file_format,
+            "sources": self.sources,
+            "chunks": self.chunks,
+            "rows": self.rows,
+            # IDs are interned as the UTF-8 bytes read from the logs
+            "vehicle_ids": [id_.decode("utf-8", "replace") for id_ in self.vehicle_ids.ids],
+            "junction_ids": [id_.decode("utf-8", "replace") for id_ in self.junction_ids.ids],
+            "light_states": [id_.decode("utf-8", "replace") for id_ in self.light_states.ids],
+            "road_ids": [id_.decode("utf-8", "replace") for id_ in self.road_ids.ids],
+        }
+        with open(os.path.join(self.output_dir, "ids.json"), "w", encoding="utf-8") as index_file:
+            json.dump(index, index_file)
+
+
+def ingest_log_file(log_path, output_dir, chunk_rows=1_000_000, file_format="auto"):
+    """
+    Converts one log file into its own table directory (runs in a worker process when ingesting in parallel).
+
+    :return: Dict with the source, the output directory, the rows per table, the file size and the wall time.
+    """
+    started = time.perf_counter()
+    ingester = LogIngester(output_dir, chunk_rows, file_format)
+    rows = ingester.ingest(log_path)
+    ingester.close()
+    return {"source": log_path, "output_dir": output_dir, "rows": rows, "bytes": os.path.getsize(log_path),
+            "wall_time": round(time.perf_counter() - started, 3)}
+
+def ingest_logs(log_paths, output_dir, max_workers=None, chunk_rows=1_000_000, file_format="auto"):
+    """
+    Converts log files in parallel, one worker process per file, each into output_dir/<log file name>.
+
+    :param max_workers: Number of worker processes (default: number of CPUs, at most one per file).
+    :return: List of the ingest_log_file summaries, in the order of log_paths.
+    """
+    # files of the same name (e.g. one simulation_log.log per sweep scenario) get numbered directories
+    names = {}
+    jobs = []
+    for log_path in log_paths:
+        name = os.path.splitext(os.path.basename(log_path))[0]
+        names[name] = names.get(name, 0) + 1
+        jobs.append((log_path, os.path.join(output_dir, name if names[name] == 1 else f"{name}_{names[name]}")))
+
+    max_workers = min(max_workers or os.cpu_count(), len(jobs)) or 1
+    if max_workers == 1:
+        return [ingest_log_file(log_path, table_dir, chunk_rows, file_format) for log_path, table_dir in jobs]
+    summaries = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(ingest_log_file, log_path, table_dir, chunk_rows, file_format): position
+                   for position, (log_path, table_dir) in enumerate(jobs)}
+        for future in as_completed(futures):
+            summaries[futures[future]] = future.result()
+    return summaries
+
+def load_ingested(output_dir):
+    """
+    Loads a table directory written by LogIngester.
+
+    :return: (dict of table name -> columns, ID index), columns are dicts of name -> NumPy array.
+    """
+    with open(os.path.join(output_dir, "ids.json"), encoding="utf-8") as index_file:
+        index = json.load(index_file)
+    _, pq = _import_pyarrow() if index["format"] == "parquet" else (None, None)
+    if index["format"] == "parquet" and pq is None:
+        raise ImportError("Reading parquet tables requires pyarrow (pip install pyarrow)")
+
+    tables = {}
+    for table, columns in TABLES.items():
+        chunks = []
+        for chunk_path in sorted(glob.glob(os.path.join(output_dir, f"{table}_*.{index['format']}"))):
+            if index["format"] == "parquet":
+                chunk = pq.read_table(chunk_path)
+                chunks.append({name: chunk.column(name).to_numpy() for name in chunk.column_names})
+            else:
+                with np.load(chunk_path) as chunk:
+                    chunks.append({name: chunk[name] for name in chunk.files})
+        tables[table] = {name: np.concatenate([chunk[name] for chunk in chunks]) if chunks else np.array([], dtype=typecode)
+                         for name, typecode in columns}
+    return tables, index
@@ -0,0 +1,416 @@
+from collections import deque
+import numpy as np
+import traci
+import traci.constants as tc
+
+class SyntheticTrace:
+    """
+    Deterministic synthetic traffic on a square grid network, for running the project without SUMO.
+
+    Vehicles depart at a fixed rate, follow random routes (no U-turns) at their own constant speed and
+    arrive at the end of the route. All movement is vectorized, so the trace scales to 100k vehicles.
+
+    Any trace driving MockSumo exposes the same attributes: the network (junction_ids, junction_positions,
+    edge_ids, edge_from, edge_to, edge_lengths, edge_speeds, edge_lanes, traffic_lights, light_phases), the demand
+    (vehicle_ids, vehicle_max_speeds, route_ids, routes, vehicle_routes), step_length, advance() and set_speed(),
+    plus the per-vehicle state arrays (x, y, speed, edge, lane, lane_position, route_index) valid for the indices in active.
+    """
+
+    def __init__(self, num_vehicles=1000, grid_size=10, edge_length=200.0, max_speed=13.89, route_length=8,
+                 depart_rate=None, step_length=1.0, seed=0):
+        """
+        :param num_vehicles: Vehicles departing over the run.
+        :param grid_size: Junctions per side of the grid.
+        :param edge_length: Length (m) of every edge.
+        :param max_speed: Speed limit (m/s) of every edge, vehicles drive at 60-100% of it.
+        :param route_length: Edges per route.
+        :param depart_rate: Vehicles departing per step (default: all of them within the first 100 steps).
+        :param seed: Seed of the route and speed generation.
+        """
+        rng = np.random.default_rng(seed)
+        self.step_length = step_length
+        self.current_step = -1
+
+        # network: junctions J<x>_<y> and one single-lane edge per direction between neighbours
+        self.junction_ids = [f"J{x}_{y}" for x in range(grid_size) for y in range(grid_size)]
+        self.junction_positions = np.array([(x * edge_length, y * edge_length) for x in range(grid_size) for y in range(grid_size)],
+                                           dtype=np.float64)
+        edges = []
+        for x in range(grid_size):
+            for y in range(grid_size):
+                for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                    if 0 <= x + dx < grid_size and 0 <= y + dy < grid_size:
+                        edges.append((x * grid_size + y, (x + dx) * grid_size + y + dy))
+        self.edge_from = np.array([edge[0] for edge in edges], dtype=np.int64)
+        self.edge_to = np.array([edge[1] for edge in edges], dtype=np.int64)
+        self.edge_ids = [f"{self.junction_ids[a]}to{self.junction_ids[b]}" for a, b in edges]
+        self.edge_lengths = np.full(len(edges), edge_length)
+        self.edge_speeds = np.full(len(edges), max_speed)
+        self.edge_lanes = np.ones(len(edges), dtype=np.int64)
+
+        # four-way junctions are signalized with a fixed two-direction program
+        degree = np.bincount(self.edge_to, minlength=len(self.junction_ids))
+        self.traffic_lights = {self.junction_ids[j]: ["GGrr", "yyrr", "rrGG", "rryy"] for j in np.flatnonzero(degree == 4)}
+        self.light_phases = {}  # phases forced by the trace itself, the synthetic lights only change through setPhase
+
+        # successors of every edge, U-turns excluded, padded to the widest junction
+        successors = [[e for e in np.flatnonzero(self.edge_from == self.edge_to[edge]) if self.edge_to[e] != self.edge_from[edge]]
+                      for edge in range(len(edges))]
+        width = max(len(s) for s in successors)
+        successor_table = np.array([s + [s[0]] * (width - len(s)) for s in successors], dtype=np.int64)
+        successor_counts = np.array([len(s) for s in successors], dtype=np.int64)
+
+        # demand: one random route per vehicle, built for all vehicles at once
+        self.vehicle_ids = [f"veh{n}" for n in range(num_vehicles)]
+        routes = np.empty((num_vehicles, route_length), dtype=np.int64)
+        routes[:, 0] = rng.integers(0, len(edges), num_vehicles)
+        for k in range(1, route_length):
+            choice = (rng.random(num_vehicles) * successor_counts[routes[:, k - 1]]).astype(np.int64)
+            routes[:, k] = successor_table[routes[:, k - 1], choice]
+        self.vehicle_routes = routes
+        self.route_ids = [f"route_{vehicle_id}" for vehicle_id in self.vehicle_ids]
+        self.routes = {route_id: tuple(route) for route_id, route in zip(self.route_ids, routes.tolist())}
+        self.vehicle_max_speeds = max_speed * rng.uniform(0.6, 1.0, num_vehicles)
+        self.depart_steps = np.arange(num_vehicles) // (depart_rate or max(1, -(-num_vehicles // 100)))
+
+        # per-vehicle state, valid for the indices in self.active
+        self.status = np.zeros(num_vehicles, dtype=np.int8)  # 0 waiting, 1 driving, 2 arrived
+        self.route_index = np.zeros(num_vehicles, dtype=np.int64)
+        self.lane_position = np.zeros(num_vehicles)
+        self.speed_override = np.full(num_vehicles, -1.0)
+        self.speed = np.zeros(num_vehicles)
+        self.edge = np.zeros(num_vehicles, dtype=np.int64)
+        self.lane = np.zeros(num_vehicles, dtype=np.int64)
+        self.x = np.zeros(num_vehicles)
+        self.y = np.zeros(num_vehicles)
+        self.active = np.empty(0, dtype=np.int64)
+
+    def advance(self):
+        """ Moves the traffic one step ahead and returns the (departed, arrived) vehicle indices. """
+        self.current_step += 1
+        driving = self.active
+        speed = np.where(self.speed_override[driving] >= 0, self.speed_override[driving], self.vehicle_max_speeds[driving])
+        self.speed[driving] = speed
+        position = self.lane_position[driving] + speed * self.step_length
+        lengths = self.edge_lengths[self.edge[driving]]
+        passed = np.floor(position / lengths).astype(np.int64)
+        self.lane_position[driving] = position - passed * lengths
+        self.route_index[driving] += passed
+
+        arrived = driving[self.route_index[driving] >= self.vehicle_routes.shape[1]]
+        self.status[arrived] = 2
+        departed = np.flatnonzero(self.depart_steps == self.current_step)
+        self.status[departed] = 1
+        self.route_index[departed] = 0
+        self.lane_position[departed] = 0.0
+        self.speed[departed] = 0.0
+
+        self.active = np.flatnonzero(self.status == 1)
+        active = self.active
+        self.edge[active] = self.vehicle_routes[active, self.route_index[active]]
+        start = self.junction_positions[self.edge_from[self.edge[active]]]
+        end = self.junction_positions[self.edge_to[self.edge[active]]]
+        share = (self.lane_position[active] / self.edge_lengths[self.edge[active]])[:, None]
+        position = start + (end - start) * share
+        self.x[active] = position[:, 0]
+        self.y[active] = position[:, 1]
+        return departed, arrived
+
+    def set_speed(self, vehicle_index, speed):
+        """ Overrides the speed of one vehicle (a negative speed restores its own speed). """
+        self.speed_override[vehicle_index] = speed
+
+
+class _Domain:
+    """ Base of the mock TraCI domains, all sharing the MockSumo state. """
+
+    def __init__(self, sumo):
+        self._sumo = sumo
+        self._trace = sumo.trace
+
+
+class _VehicleDomain(_Domain):
+
+    def _index(self, vehicle_id):
+        index = self._sumo.vehicle_index.get(vehicle_id)
+        if index is None or self._trace.status[index] != 1:
+            raise traci.TraCIException(f"Vehicle '{vehicle_id}' is not known.")
+        return index
+
+    def getIDList(self):
+        return tuple(self._trace.vehicle_ids[index] for index in self._trace.active.tolist())
+
+    def getIDCount(self):
+        return len(self._trace.active)
+
+    def subscribe(self, vehicle_id, variables):
+        self._index(vehicle_id)
+        self._sumo.subscriptions[vehicle_id] = tuple(variables)
+        self._sumo.results = None
+
+    def unsubscribe(self, vehicle_id):
+        self._sumo.subscriptions.pop(vehicle_id, None)
+        self._sumo.results = None
+
+    def getAllSubscriptionResults(self):
+        return self._sumo.get_vehicle_results()
+
+    def getSubscriptionResults(self, vehicle_id):
+        return self._sumo.get_vehicle_results().get(vehicle_id, {})
+
+    def getPosition(self, vehicle_id):
+        index = self._index(vehicle_id)
+        return float(self._trace.x[index]), float(self._trace.y[index])
+
+    def getSpeed(self, vehicle_id):
+        return float(self._trace.speed[self._index(vehicle_id)])
+
+    def getMaxSpeed(self, vehicle_id):
+        return float(self._trace.vehicle_max_speeds[self._index(vehicle_id)])
+
+    def getRoadID(self, vehicle_id):
+        return self._trace.edge_ids[self._trace.edge[self._index(vehicle_id)]]
+
+    def getLanePosition(self, vehicle_id):
+        return float(self._trace.lane_position[self._index(vehicle_id)])
+
+    def getRouteID(self, vehicle_id):
+        return self._trace.route_ids[self._index(vehicle_id)]
+
+    def getRouteIndex(self, vehicle_id):
+        return int(self._trace.route_index[self._index(vehicle_id)])
+
+    def getRoute(self, vehicle_id):
+        return self._sumo.route.getEdges(self.getRouteID(vehicle_id))
+
+    def getDrivingDistance(self, vehicle_id, edge_id, position, laneIndex=0):
+        index = self._index(vehicle_id)
+        route = self._trace.routes[self._trace.route_ids[index]]
+        route_index = int(self._trace.route_index[index])
+        target = self._sumo.edge_index[edge_id]
+        if target not in route[route_index:]:
+            return tc.INVALID_DOUBLE_VALUE
+        target_index = route.index(target, route_index)
+        lengths = self._trace.edge_lengths
+        distance = sum(lengths[edge] for edge in route[route_index:target_index]) - self._trace.lane_position[index]
+        return float(distance + position)
+
+    def setSpeed(self, vehicle_id, speed):
+        self._trace.set_speed(self._index(vehicle_id), speed)
+
+    def changeLane(self, vehicle_id, lane_index, duration):
+        index = self._index(vehicle_id)
+        if not 0 <= lane_index < self._trace.edge_lanes[self._trace.edge[index]]:
+            raise traci.TraCIException(f"No lane with index {lane_index} on the road of vehicle '{vehicle_id}'.")
+        self._trace.lane[index] = lane_index
+
+
+class _JunctionDomain(_Domain):
+
+    def _index(self, junction_id):
+        index = self._sumo.junction_index.get(junction_id)
+        if index is None:
+            raise traci.TraCIException(f"Junction '{junction_id}' is not known.")
+        return index
+
+    def getIDList(self):
+        return tuple(self._trace.junction_ids)
+
+    def getPosition(self, junction_id):
+        return tuple(float(value) for value in self._trace.junction_positions[self._index(junction_id)])
+
+    def getIncomingEdges(self, junction_id):
+        return tuple(self._trace.edge_ids[e] for e in np.flatnonzero(self._trace.edge_to == self._index(junction_id)))
+
+    def getOutgoingEdges(self, junction_id):
+        return tuple(self._trace.edge_ids[e] for e in np.flatnonzero(self._trace.edge_from == self._index(junction_id)))
+
+
+class _EdgeDomain(_Domain):
+
+    def _index(self, edge_id):
+        index = self._sumo.edge_index.get(edge_id)
+        if index is None:
+            raise traci.TraCIException(f"Edge '{edge_id}' is not known.")
+        return index
+
+    def getIDList(self):
+        return tuple(self._trace.edge_ids)
+
+    def getFromJunction(self, edge_id):
+        return self._trace.junction_ids[self._trace.edge_from[self._index(edge_id)]]
+
+    def getToJunction(self, edge_id):
+        return self._trace.junction_ids[self._trace.edge_to[self._index(edge_id)]]
+
+    def getLaneNumber(self, edge_id):
+        return int(self._trace.edge_lanes[self._index(edge_id)])
+
+    def getLastStepVehicleNumber(self, edge_id):
+        index = self._index(edge_id)
+        return int(np.count_nonzero(self._trace.edge[self._trace.active] == index))
+
+
+class _LaneDomain(_Domain):
+
+    def _edge_index(self, lane_id):
+        edge_id, _, lane_index = lane_id.rpartition("_")
+        index = self._sumo.edge_index.get(edge_id)
+        if index is None or not lane_index.isdigit() or int(lane_index) >= self._trace.edge_lanes[index]:
+            raise traci.TraCIException(f"Lane '{lane_id}' is not known.")
+        return index
+
+    def getLength(self, lane_id):
+        return float(self._trace.edge_lengths[self._edge_index(lane_id)])
+
+    def getMaxSpeed(self, lane_id):
+        return float(self._trace.edge_speeds[self._edge_index(lane_id)])
+
+
+class _RouteDomain(_Domain):
+
+    def getEdges(self, route_id):
+        route = self._trace.routes.get(route_id)
+        if route is None:
+            raise traci.TraCIException(f"Route '{route_id}' is not known.")
+        return tuple(self._trace.edge_ids[edge] for edge in route)
+
+
+class _TrafficLightDomain(_Domain):
+
+    def _program(self, tl_id):
+        program = self._trace.traffic_lights.get(tl_id)
+        if program is None:
+            raise traci.TraCIException(f"Traffic light '{tl_id}' is not known.")
+        return program
+
+    def getIDList(self):
+        return tuple(self._trace.traffic_lights)
+
+    def getPhase(self, tl_id):
+        self._program(tl_id)
+        return self._sumo.tl_phases.get(tl_id, 0)
+
+    def setPhase(self, tl_id, phase):
+        if not 0 <= phase < len(self._program(tl_id)):
+            raise traci.TraCIException(f"The phase index {phase} is not in the allowed range for traffic light '{tl_id}'.")
+        self._sumo.tl_phases[tl_id] = phase
+
+    def getRedYellowGreenState(self, tl_id):
+        return self._program(tl_id)[self.getPhase(tl_id)]
+
+
+class _SimulationDomain(_Domain):
+
+    def getDeltaT(self):
+        return self._trace.step_length
+
+    def getTime(self):
+        return (self._trace.current_step + 1) * self._trace.step_length
+
+    def getMinExpectedNumber(self):
+        return int(np.count_nonzero(self._trace.status < 2))
+
+    def subscribe(self, variables):
+        self._sumo.simulation_variables = tuple(variables)
+
+    def getSubscriptionResults(self):
+        results = {}
+        for variable in self._sumo.simulation_variables:
+            if variable == tc.VAR_DEPARTED_VEHICLES_IDS:
+                results[variable] = self._sumo.departed
+            elif variable == tc.VAR_ARRIVED_VEHICLES_IDS:
+                results[variable] = self._sumo.arrived
+        return results
+
+    def getDistanceRoad(self, edge_id1, position1, edge_id2, position2, isDriving=False):
+        """ Driving distance along the fewest edges (all edges of the synthetic grid are equally long). """
+        start, end = self._sumo.edge_index[edge_id1], self._sumo.edge_index[edge_id2]
+        if start == end and position2 >= position1:
+            return float(position2 - position1)
+        hops = self._sumo.count_hops(start, end)
+        if hops is None:
+            return tc.INVALID_DOUBLE_VALUE
+        lengths = self._trace.edge_lengths
+        return float(lengths[start] - position1 + lengths[start] * (hops - 1) + position2)
+
+
+class MockSumo:
+    """
+    In-process stand-in for a SUMO handle, implementing the TraCI subset the controllers use.
+
+    It is driven by a trace (see SyntheticTrace) instead of a simulator, so the Python side of the
+    project can be profiled and load-tested without a SUMO install.
+    """
+
+    def __init__(self, trace=None):
+        self.trace = trace or SyntheticTrace()
+        self.vehicle_index = {vehicle_id: index for index, vehicle_id in enumerate(self.trace.vehicle_ids)}
+        self.junction_index = {junction_id: index for index, junction_id in enumerate(self.trace.junction_ids)}
+        self.edge_index = {edge_id: index for index, edge_id in enumerate(self.trace.edge_ids)}
+        self.subscriptions = {}
+        self.simulation_variables = ()
+        self.departed = ()
+        self.arrived = ()
+        self.results = None
+        self.tl_phases = {}
+        self.hops = {}
+
+        self.vehicle = _VehicleDomain(self)
+        self.junction = _JunctionDomain(self)
+        self.edge = _EdgeDomain(self)
+        self.lane = _LaneDomain(self)
+        self.route = _RouteDomain(self)
+        self.trafficlight = _TrafficLightDomain(self)
+        self.simulation = _SimulationDomain(self)
+
+    def simulationStep(self):
+        """ Advances the trace by one step, SUMO drops the subscriptions of arrived vehicles itself. """
+        departed, arrived = self.trace.advance()
+        self.tl_phases.update(self.trace.light_phases)
+        vehicle_ids = self.trace.vehicle_ids
+        self.departed = tuple(vehicle_ids[index] for index in departed.tolist())
+        self.arrived = tuple(vehicle_ids[index] for index in arrived.tolist())
+        for vehicle_id in self.arrived:
+            self.subscriptions.pop(vehicle_id, None)
+        self.results = None
+
+    def get_vehicle_results(self):
+        """ Builds (once per step) the subscription results of every subscribed vehicle. """
+        if self.results is None:
+            trace = self.trace
+            indices = [self.vehicle_index[vehicle_id] for vehicle_id in self.subscriptions]
+            columns = {
+                tc.VAR_POSITION: list(zip(trace.x[indices].tolist(), trace.y[indices].tolist())),
+                tc.VAR_SPEED: trace.speed[indices].tolist(),
+                tc.VAR_LANE_INDEX: trace.lane[indices].tolist(),
+                tc.VAR_ROAD_ID: [trace.edge_ids[edge] for edge in trace.edge[indices].tolist()],
+                tc.VAR_LANEPOSITION: trace.lane_position[indices].tolist(),
+                tc.VAR_ROUTE_ID: [trace.route_ids[index] for index in indices],
+                tc.VAR_ROUTE_INDEX: trace.route_index[indices].tolist(),
+            }
+            self.results = {
+                vehicle_id: {variable: columns[variable][row] for variable in variables if variable in columns}
+                for row, (vehicle_id, variables) in enumerate(self.subscriptions.items())
+            }
+        return self.results
+
+    def count_hops(self, start, end):
+        """ Returns the number of edges from the start of one edge to the start of another (BFS, cached). """
+        key = (start, end)
+        if key not in self.hops:
+            trace = self.trace
+            seen = {start: 0}
+            queue = deque([start])
+            while queue and end not in seen:
+                edge = queue.popleft()
+                for successor in np.flatnonzero(trace.edge_from == trace.edge_to[edge]).tolist():
+                    if successor not in seen:
+                        seen[successor] = seen[edge] + 1
+                        queue.append(successor)
+            self.hops[key] = seen.get(end)
+        return self.hops[key]
+
+    def close(self):
+        self.subscriptions.clear()
+        self.results = None
@@ -0,0 +1,306 @@
+import os
+import json
+import mmap
+import struct
+import hashlib
+import xml.etree.ElementTree as ET
+import numpy as np
+
+# Binary cache layout: MAGIC, the size of a JSON header, the header, then every column as raw
+# little-endian array data at a 64-byte aligned offset, so the whole file can be memory-mapped.
+# String columns are stored as NUL-separated UTF-8 bytes.
+MAGIC = b"NETTABLES2\n"
+HEADER_SIZE = struct.Struct("<Q")
+ALIGNMENT = 64
+
+# Columns of the tables, in the order they are stored: name -> dtype ("str" for string columns)
+COLUMNS = {
+    # junctions
+    "junction_ids": "str",
+    "junction_x": "<f8",
+    "junction_y": "<f8",
+    "junction_type": "<u1",  # index into junction_type_names
+    "junction_type_names": "str",
+    # edges, their lanes are the lane_count lanes starting at first_lane
+    "edge_ids": "str",
+    "edge_from": "<i4",  # junction index, -1 for internal edges
+    "edge_to": "<i4",
+    "edge_function": "<u1",  # index into edge_function_names
+    "edge_function_names": "str",
+    "edge_first_lane": "<i4",
+    "edge_lane_count": "<i4",
+    # lanes, the shape of lane i are the points shape_start[i]:shape_start[i + 1]
+    "lane_ids": "str",
+    "lane_edge": "<i4",
+    "lane_length": "<f8",
+    "lane_speed": "<f8",
+    "lane_width": "<f8",
+    "lane_allow": "str",  # vehicle classes of the allow / disallow attributes, "" when the lane does not set it
+    "lane_disallow": "str",
+    "lane_shape_start": "<i8",
+    "shape_x": "<f8",
+    "shape_y": "<f8",
+    # connections between lanes (-1 when there is no via lane or traffic light)
+    "connection_from_lane": "<i4",
+    "connection_to_lane": "<i4",
+    "connection_via_lane": "<i4",
+    "connection_tl": "<i4",  # index into tl_ids
+    "connection_link_index": "<i4",
+    "connection_dir": "<u1",  # ASCII code of the direction (s, l, r, t, L, R)
+    # traffic lights
+    "tl_ids": "str",
+}
+
+def get_net_file_path(config_path):
+    """ Returns the path of the net file referenced by a .sumocfg configuration. """
+    net_file = ET.parse(config_path).getroot().find("input/net-file").get("value")
+    return os.path.join(os.path.dirname(config_path), net_file)
+
+def get_content_hash(path):
+    """ Returns the hex digest of a file's content, the key of its cached tables. """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _intern(names, name):
+    """ Returns the index of a name in a list of names, appending it when it is new. """
+    try:
+        return names.index(name)
+    except ValueError:
+        names.append(name)
+        return len(names) - 1
+
+def _parse_shape(shape):
+    """ Returns the x and y coordinates of a SUMO shape attribute ("x1,y1 x2,y2 ..."). """
+    points = [point.split(",") for point in shape.split()] if shape else []
+    return [float(point[0]) for point in points], [float(point[1]) for point in points]
+
+
+class NetworkTables:
+    """
+    Static network of a SUMO .net.xml file as array-backed tables, usable without a running simulation.
+
+    Junctions, edges, lanes, lane shapes, connections and traffic lights are columns of NumPy arrays
+    (see COLUMNS) that refer to each other by row index. IDs are tuples of strings with a dict for
+    the reverse lookup. Tables loaded from the cache are memory-mapped and read-only.
+    """
+
+    def __init__(self, columns, source_hash=None):
+        """
+        :param columns: Dict of column name (see COLUMNS) -> NumPy array, or tuple of str for string columns.
+        :param source_hash: Content hash of the net file the tables were parsed from.
+        """
+        self.source_hash = source_hash
+        for name, dtype in COLUMNS.items():
+            setattr(self, name, tuple(columns[name]) if dtype == "str" else columns[name])
+        self.junction_index = {junction_id: index for index, junction_id in enumerate(self.junction_ids)}
+        self.edge_index = {edge_id: index for index, edge_id in enumerate(self.edge_ids)}
+        self.lane_index = {lane_id: index for index, lane_id in enumerate(self.lane_ids)}
+
+    @classmethod
+    def parse(cls, net_file_path):
+        """ Streams a .net.xml file into tables, keeping only the element being read in memory. """
+        junction_ids, junction_x, junction_y, junction_type, junction_type_names = [], [], [], [], []
+        edge_ids, edge_from, edge_to, edge_function, edge_function_names = [], [], [], [], []
+        edge_first_lane, edge_lane_count = [], []
+        lane_ids, lane_edge, lane_length, lane_speed, lane_width, lane_shape_start = [], [], [], [], [], [0]
+        lane_allow, lane_disallow = [], []
+        shape_x, shape_y = [], []
+        connections = []  # (from edge, from lane index, to edge, to lane index, via lane, tl, link index, dir)
+        tl_ids = []
+
+        depth = 0
+        root = None
+        for event, element in ET.iterparse(net_file_path, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = element
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1:
+                # lanes and requests are read with their edge or junction, the root is left alone
+                continue
+
+            tag = element.tag
+            if tag == "junction":
+                junction_ids.append(element.get("id"))
+                junction_x.append(float(element.get("x")))
+                junction_y.append(float(element.get("y")))
+                junction_type.append(_intern(junction_type_names, element.get("type", "")))
+            elif tag == "edge":
+                edge_ids.append(element.get("id"))
+                edge_from.append(element.get("from"))
+                edge_to.append(element.get("to"))
+                edge_function.append(_intern(edge_function_names, element.get("function", "normal")))
+                edge_first_lane.append(len(lane_ids))
+                lanes = element.findall("lane")
+                edge_lane_count.append(len(lanes))
+                for lane in lanes:
+                    lane_ids.append(lane.get("id"))
+                    lane_edge.append(len(edge_ids) - 1)
+                    lane_length.append(float(lane.get("length", 0.0)))
+                    lane_speed.append(float(lane.get("speed", 0.0)))
+                    lane_width.append(float(lane.get("width", -1.0)))
+                    lane_allow.append(lane.get("allow", ""))
+                    lane_disallow.append(lane.get("disallow", ""))
+                    xs, ys = _parse_shape(lane.get("shape"))
+                    shape_x.extend(xs)
+                    shape_y.extend(ys)
+                    lane_shape_start.append(len(shape_x))
+            elif tag == "connection":
+                connections.append((element.get("from"), int(element.get("fromLane")), element.get("to"),
+                                    int(element.get("toLane")), element.get("via"), element.get("tl"),
+                                    int(element.get("linkIndex", -1)), element.get("dir", "?")))
+            elif tag == "tlLogic":
+                # one tlLogic per program, the traffic light is listed once
+                if element.get("id") not in tl_ids:
+                    tl_ids.append(element.get("id"))
+            # drop every processed top-level element, so memory stays flat on large networks
+            root.clear()
+
+        junction_index = {junction_id: index for index, junction_id in enumerate(junction_ids)}
+        edge_index = {edge_id: index for index, edge_id in enumerate(edge_ids)}
+        lane_index = {lane_id: index for index, lane_id in enumerate(lane_ids)}
+        tl_index = {tl_id: index for index, tl_id in enumerate(tl_ids)}
+        first_lane = np.array(edge_first_lane, dtype=np.int32)
+
+        def lane_of(edge_id, lane):
+            return int(first_lane[edge_index[edge_id]]) + lane
+
+        columns = {
+            "junction_ids": junction_ids,
+            "junction_x": np.array(junction_x, dtype=np.float64),
+            "junction_y": np.array(junction_y, dtype=np.float64),
+            "junction_type": np.array(junction_type, dtype=np.uint8),
+            "junction_type_names": junction_type_names,
+            "edge_ids": edge_ids,
+            "edge_from": np.array([junction_index.get(j, -1) for j in edge_from], dtype=np.int32),
+            "edge_to": np.array([junction_index.get(j, -1) for j in edge_to], dtype=np.int32),
+            "edge_function": np.array(edge_function, dtype=np.uint8),
+            "edge_function_names": edge_function_names,
+            "edge_first_lane": first_lane,
+            "edge_lane_count": np.array(edge_lane_count, dtype=np.int32),
+            "lane_ids": lane_ids,
+            "lane_edge": np.array(lane_edge, dtype=np.int32),
+            "lane_length": np.array(lane_length, dtype=np.float64),
+            "lane_speed": np.array(lane_speed, dtype=np.float64),
+            "lane_width": np.array(lane_width, dtype=np.float64),
+            "lane_allow": lane_allow,
+            "lane_disallow": lane_disallow,
+            "lane_shape_start": np.array(lane_shape_start, dtype=np.int64),
+            "shape_x": np.array(shape_x, dtype=np.float64),
+            "shape_y": np.array(shape_y, dtype=np.float64),
+            "connection_from_lane": np.array([lane_of(c[0], c[1]) for c in connections], dtype=np.int32),
+            "connection_to_lane": np.array([lane_of(c[2], c[3]) for c in connections], dtype=np.int32),
+            "connection_via_lane": np.array([lane_index.get(c[4], -1) for c in connections], dtype=np.int32),
+            "connection_tl": np.array([tl_index.get(c[5], -1) for c in connections], dtype=np.int32),
+            "connection_link_index": np.array([c[6] for c in connections], dtype=np.int32),
+            "connection_dir": np.array([ord(c[7][0]) for c in connections], dtype=np.uint8),
+            "tl_ids": tl_ids,
+        }
+        return cls(columns)
+
+    def save(self, path):
+        """ Writes the tables to a memory-mappable cache file, replacing it atomically. """
+        blobs = {}
+        arrays = {}
+        for name, dtype in COLUMNS.items():
+            value = getattr(self, name)
+            if dtype == "str":
+                blobs[name] = len(value)
+                value = np.frombuffer("\0".join(value).encode("utf-8"), dtype=np.uint8)
+            arrays[name] = np.ascontiguousarray(value, dtype=np.uint8 if dtype == "str" else dtype)
+
+        # lay out the columns after the header, which is padded so the first column is aligned too
+        layout = {}
+        offset = 0
+        for name, array in arrays.items():
+            layout[name] = [array.dtype.str, len(array), offset, blobs.get(name)]
+            offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+        header = json.dumps({"source_hash": self.source_hash, "columns": layout}).encode("utf-8")
+        data_start = -(-(len(MAGIC) + HEADER_SIZE.size + len(header)) // ALIGNMENT) * ALIGNMENT
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as cache_file:
+            cache_file.write(MAGIC + HEADER_SIZE.pack(len(header)) + header)
+            for name, array in arrays.items():
+                cache_file.seek(data_start + layout[name][2])
+                cache_file.write(array.tobytes())
+            cache_file.truncate(data_start + offset)
+        # several workers may build the same cache at once, the last complete file wins
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """ Memory-maps a cache file written by save(). The columns share the pages of every process mapping it. """
+        with open(path, "rb") as cache_file:
+            buffer = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a network tables cache")
+        (header_size,) = HEADER_SIZE.unpack_from(buffer, len(MAGIC))
+        header_start = len(MAGIC) + HEADER_SIZE.size
+        header = json.loads(bytes(buffer[header_start:header_start + header_size]))
+        data_start = -(-(header_start + header_size) // ALIGNMENT) * ALIGNMENT
+
+        columns = {}
+        for name, (dtype, length, offset, string_count) in header["columns"].items():
+            array = np.frombuffer(buffer, dtype=dtype, count=length, offset=data_start + offset)
+            if string_count is not None:
+                array = array.tobytes().decode("utf-8").split("\0") if string_count else []
+            columns[name] = array
+        return cls(columns, header["source_hash"])
+
+    def get_edge_length(self, edge_index):
+        """ Returns the length (m) of an edge, the length of its first lane. """
+        return float(self.lane_length[self.edge_first_lane[edge_index]])
+
+    def get_edge_lane_ids(self, edge_index):
+        """ Returns the lane IDs of an edge. """
+        first_lane = int(self.edge_first_lane[edge_index])
+        return self.lane_ids[first_lane:first_lane + int(self.edge_lane_count[edge_index])]
+
+    def get_lane_shape(self, lane_index):
+        """ Returns the shape of a lane as an (n, 2) array of points. """
+        start, end = self.lane_shape_start[lane_index], self.lane_shape_start[lane_index + 1]
+        return np.column_stack((self.shape_x[start:end], self.shape_y[start:end]))
+
+    def is_lane_allowed(self, lane_index, vehicle_class):
+        """ Returns True if vehicles of a SUMO vehicle class (e.g. "passenger") may use a lane. """
+        allow, disallow = self.lane_allow[lane_index], self.lane_disallow[lane_index]
+        if allow:
+            return allow == "all" or vehicle_class in allow.split()
+        return vehicle_class not in disallow.split()
+
+    def is_internal_edge(self, edge_index):
+        """ Returns True for the edges inside junctions. """
+        return self.edge_function_names[self.edge_function[edge_index]] == "internal"
+
+
+def load_net_tables(net_file_path, cache_dir=None):
+    """
+    Returns the NetworkTables of a net file, from the cache when the file content was parsed before.
+
+    :param net_file_path: SUMO .net.xml file, or a .sumocfg configuration referencing it.
+    :param cache_dir: Directory of the cache files (default: __netcache__ next to the net file).
+                      Cache files are named after the net file and its content hash, so an edited
+                      network is parsed again and processes sharing a directory share one cache.
+    """
+    if net_file_path.endswith(".sumocfg"):
+        net_file_path = get_net_file_path(net_file_path)
+    cache_dir = cache_dir or os.path.join(os.path.dirname(net_file_path), "__netcache__")
+    source_hash = get_content_hash(net_file_path)
+    cache_path = os.path.join(cache_dir, f"{os.path.basename(net_file_path)}.{source_hash}.nettab")
+    if os.path.exists(cache_path):
+        try:
+            return NetworkTables.load(cache_path)
+        except ValueError:
+            pass  # written by an older version of the cache format, parsed again below
+
+    tables = NetworkTables.parse(net_file_path)
+    tables.source_hash = source_hash
+    os.makedirs(cache_dir, exist_ok=True)
+    tables.save(cache_path)
+    return NetworkTables.load(cache_path)
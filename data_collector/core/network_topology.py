@@ -0,0 +1,106 @@
+from .net_tables import load_net_tables, get_net_file_path
+
+class NetworkTopology:
+    """ Static index of the road network (junctions, edges, lanes, traffic lights), built once at startup. """
+
+    def __init__(self, junction_positions, junction_edges, edge_endpoints, edge_lanes, traffic_lights):
+        """
+        :param junction_positions: Dict of junction ID -> (x, y).
+        :param junction_edges: Dict of junction ID -> tuple of all edges connected to it (incoming + outgoing).
+        :param edge_endpoints: Dict of real edge ID -> (from junction ID, to junction ID).
+        :param edge_lanes: Dict of edge ID -> tuple of lane IDs.
+        :param traffic_lights: Iterable of traffic light IDs.
+        """
+        self.junction_ids = tuple(sorted(junction_positions))
+        self.real_junction_ids = tuple(j for j in self.junction_ids if not j.startswith(":"))
+        self.junction_positions = junction_positions
+        self.edge_endpoints = edge_endpoints
+        self.edge_lanes = edge_lanes
+        self.traffic_lights = frozenset(traffic_lights)
+
+        # split edges/lanes of every junction once instead of on every query
+        self.junction_real_edges = {}
+        self.junction_internal_edges = {}
+        self.junction_real_lanes = {}
+        self.junction_internal_lanes = {}
+        for junction_id, all_edges in junction_edges.items():
+            real_edges = tuple(edge for edge in all_edges if not edge.startswith(":"))
+            internal_edges = tuple(edge for edge in all_edges if edge.startswith(":"))
+            self.junction_real_edges[junction_id] = real_edges
+            self.junction_internal_edges[junction_id] = internal_edges
+            self.junction_real_lanes[junction_id] = tuple(lane for edge in real_edges for lane in edge_lanes.get(edge, ()))
+            self.junction_internal_lanes[junction_id] = tuple(lane for edge in internal_edges for lane in edge_lanes.get(edge, ()))
+
+    @classmethod
+    def from_traci(cls, sumo):
+        """ Builds the topology by querying the running simulation once through the given SUMO handle. """
+        junction_positions = {}
+        junction_edges = {}
+        edge_lanes = {}
+        for junction_id in sumo.junction.getIDList():
+            junction_positions[junction_id] = tuple(sumo.junction.getPosition(junction_id))
+            incoming_edges = sumo.junction.getIncomingEdges(junction_id)
+            outgoing_edges = sumo.junction.getOutgoingEdges(junction_id)
+            junction_edges[junction_id] = tuple(set(incoming_edges + outgoing_edges))
+
+        edge_endpoints = {}
+        for edges in junction_edges.values():
+            for edge in edges:
+                if edge in edge_lanes:
+                    continue
+                lane_count = sumo.edge.getLaneNumber(edge)
+                edge_lanes[edge] = tuple(f"{edge}_{i}" for i in range(lane_count))
+                if not edge.startswith(":"):
+                    edge_endpoints[edge] = (sumo.edge.getFromJunction(edge), sumo.edge.getToJunction(edge))
+
+        return cls(junction_positions, junction_edges, edge_endpoints, edge_lanes, sumo.trafficlight.getIDList())
+
+    @classmethod
+    def from_net_file(cls, net_file_path, cache_dir=None):
+        """
+        Builds the topology straight from a SUMO .net.xml file, without a running simulation.
+        The file is parsed once into cached NetworkTables (see core/net_tables.py), repeat runs only map the cache.
+        """
+        tables = load_net_tables(net_file_path, cache_dir)
+        junction_ids = tables.junction_ids
+        junction_positions = dict(zip(junction_ids, zip(tables.junction_x.tolist(), tables.junction_y.tolist())))
+        edge_endpoints = {}
+        edge_lanes = {}
+        internal_edges = {}
+        for index, edge_id in enumerate(tables.edge_ids):
+            edge_lanes[edge_id] = tables.get_edge_lane_ids(index)
+            if tables.is_internal_edge(index):
+                # internal edges are named ':<junction>_<index>'
+                internal_edges.setdefault(edge_id[1:].rsplit("_", 1)[0], []).append(edge_id)
+            else:
+                from_junction, to_junction = int(tables.edge_from[index]), int(tables.edge_to[index])
+                edge_endpoints[edge_id] = (junction_ids[from_junction] if from_junction >= 0 else None,
+                                           junction_ids[to_junction] if to_junction >= 0 else None)
+
+        junction_edges = {junction_id: tuple(internal_edges.get(junction_id, ())) for junction_id in junction_positions}
+        for edge_id, (from_junction, to_junction) in edge_endpoints.items():
+            for junction_id in (from_junction, to_junction):
+                if junction_id in junction_edges and edge_id not in junction_edges[junction_id]:
+                    junction_edges[junction_id] += (edge_id,)
+
+        return cls(junction_positions, junction_edges, edge_endpoints, edge_lanes, tables.tl_ids)
+
+    @classmethod
+    def from_sumo_config(cls, config_path, cache_dir=None):
+        """ Builds the topology from the net file referenced by a .sumocfg configuration. """
+        return cls.from_net_file(get_net_file_path(config_path), cache_dir)
+
+    def get_static_info(self, junction_id):
+        """ Returns the immutable part of a junction's description. """
+        x, y = self.junction_positions[junction_id]
+        return {
+            "Position": f"({x:.2f}, {y:.2f})",
+            "Connected Edges": list(self.junction_real_edges[junction_id]),
+            "Internal Edges": list(self.junction_internal_edges[junction_id]),
+            "Connected Lanes": list(self.junction_real_lanes[junction_id]),
+            "Internal Lanes": list(self.junction_internal_lanes[junction_id]),
+        }
+
+    def has_traffic_light(self, junction_id):
+        """ Returns True if the junction is controlled by a traffic light. """
+        return junction_id in self.traffic_lights
@@ -1,29 +1,36 @@
 import datetime
-from termcolor import colored
+from .log_writer import AsyncLogWriter, LOG_LEVELS
 
 class NodesLogger:
     """ Handles logging specifically for nodes (static and dynamic) to a separate file. """
 
-    def __init__(self, log_file_path="main/nodes_log.log"):
+    def __init__(self, log_file_path="main/nodes_log.log", level="INFO", overflow_policy="block", console=True):
         """ Initialize the nodes logger. """
-        self.log_file = open(log_file_path, "w", encoding="utf-8")
+        self.level = LOG_LEVELS[level]
+        self.console = console
+        self.timestamp = None
+        self.writer = AsyncLogWriter(log_file_path, overflow_policy=overflow_policy)
         self.log("Nodes log file initialized.", "INFO", 
                  class_name="NodesLogger", function_name="__init__", print_to_console=True)
 
-    def log(self, message, level="INFO", class_name="UNKNOWN", function_name="UNKNOWN", print_to_console=False):
+    def is_enabled(self, level):
+        """ Returns True if records of the given level are written. """
+        return LOG_LEVELS.get(level, 0) >= self.level
+
+    def refresh_timestamp(self):
+        """ Caches the current time once per simulation step. """
+        self.timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def log(self, message, level="INFO", class_name="UNKNOWN", function_name="UNKNOWN", print_to_console=False, args=None):
         """
         Logs a message to the nodes log file.
+        When args are given, message is a %-format template formatted by the writer thread.
         """
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"[{timestamp}] [{level}] [{class_name}::{function_name}] {message}"
-
-        # Write to log file
-        self.log_file.write(log_entry + "\n")
-
-        # Print to console
-        if print_to_console:
-            print(log_entry)
+        if LOG_LEVELS.get(level, 0) < self.level:
+            return
+        timestamp = self.timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.writer.submit(timestamp, level, class_name, function_name, message, args, None, print_to_console and self.console)
         
     def close(self):
-        """ Closes the nodes log file. """
-        self.log_file.close()
\ No newline at end of file
+        """ Flushes all queued records and closes the nodes log file. """
+        self.writer.close()
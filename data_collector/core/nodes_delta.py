@@ -0,0 +1,136 @@
+import re
+import ast
+import numpy as np
+
+# "full" rewrites every junction description each step, "delta" writes the topology once and then only the changes
+NODES_LOG_MODES = ("full", "delta")
+
+# Parses the records written by the log writer: [timestamp] [level] [class::function] message
+_RECORD = re.compile(r"^\[[^\]]*\] \[\w+\] \[[^\]]*\] (.*)$")
+
+class NodesDeltaEncoder:
+    """
+    Writes nodes_log.log in delta mode.
+
+    The static topology (positions, edges, lanes) is written once as a header. Each step then only records
+    the junction vehicle counts and light states that changed and the vehicles that entered or left the road.
+    Every keyframe_interval steps a keyframe repeats the complete dynamic state, so a reader can recover
+    from a record lost to the "drop" overflow policy. read_nodes_log() rebuilds the full per-step view.
+    """
+
+    def __init__(self, nodes_logger, topology, junction_controller, keyframe_interval=100):
+        """
+        :param junction_controller: JunctionController whose vehicle counts were updated for the current step.
+        :param keyframe_interval: Steps between keyframes.
+        """
+        self.nodes_logger = nodes_logger
+        self.topology = topology
+        self.junction_controller = junction_controller
+        self.keyframe_interval = keyframe_interval
+        self.junction_ids = junction_controller.proximity.junction_ids
+        self.light_ids = tuple(j for j in self.junction_ids if topology.has_traffic_light(j))
+        self.counts = None
+        self.lights = {}
+        self.vehicles = set()
+
+    def log_header(self):
+        """ Writes the static description of every real junction, once before the first step. """
+        self.nodes_logger.log("🗺️ Static Nodes Count (Real Only): %d", "INFO",
+                              class_name="NodesDeltaEncoder", function_name="log_header", args=(len(self.junction_ids),))
+        for junction_id in self.junction_ids:
+            info = self.topology.get_static_info(junction_id)
+            self.nodes_logger.log("🗺️ Junction %s | Position: %s | Connected Edges: %s | Internal Edges: %s | "
+                                  "Connected Lanes: %s | Internal Lanes: %s", "INFO",
+                                  class_name="NodesDeltaEncoder", function_name="log_header",
+                                  args=(junction_id, info["Position"], info["Connected Edges"], info["Internal Edges"],
+                                        info["Connected Lanes"], info["Internal Lanes"]))
+
+    def log_step(self, step_number, vehicle_ids):
+        """ Writes the changes of one step, or a keyframe with the complete dynamic state. """
+        if self.counts is None:
+            self.log_header()
+        log = self.nodes_logger.log
+        keyframe = self.counts is None or step_number % self.keyframe_interval == 0
+        counts = self.junction_controller.junction_vehicle_counts
+        lights = {junction_id: self.junction_controller.sumo.trafficlight.getRedYellowGreenState(junction_id)
+                  for junction_id in self.light_ids}
+
+        if keyframe:
+            log("🔑 Step #%d", "INFO", class_name="NodesDeltaEncoder", function_name="log_step", args=(step_number,))
+            changed = range(len(self.junction_ids))
+            changed_lights = lights
+        else:
+            log("🔹 Step #%d", "INFO", class_name="NodesDeltaEncoder", function_name="log_step", args=(step_number,))
+            changed = np.flatnonzero(counts != self.counts).tolist()
+            changed_lights = {junction_id: state for junction_id, state in lights.items() if self.lights.get(junction_id) != state}
+        if changed:
+            log("🚗 Vehicles in Junction: %s", "INFO", class_name="NodesDeltaEncoder", function_name="log_step",
+                args=({self.junction_ids[index]: int(counts[index]) for index in changed},))
+        if changed_lights:
+            log("🚦 Traffic Light: %s", "INFO", class_name="NodesDeltaEncoder", function_name="log_step", args=(changed_lights,))
+
+        current = set(vehicle_ids)
+        if keyframe:
+            log("🚙 Dynamic Nodes: %s", "INFO", class_name="NodesDeltaEncoder", function_name="log_step", args=(list(vehicle_ids),))
+        else:
+            entered = [v_id for v_id in vehicle_ids if v_id not in self.vehicles]
+            left = [v_id for v_id in self.vehicles if v_id not in current]
+            if entered:
+                log("➕ Entered: %s", "INFO", class_name="NodesDeltaEncoder", function_name="log_step", args=(entered,))
+            if left:
+                log("➖ Left: %s", "INFO", class_name="NodesDeltaEncoder", function_name="log_step", args=(left,))
+
+        self.counts = counts.copy()
+        self.lights = lights
+        self.vehicles = current
+
+
+def read_nodes_log(log_file_path):
+    """
+    Rebuilds the full per-step view from a nodes log written in delta mode.
+
+    :return: Generator of dicts {"step", "junctions": {junction ID: info dict as in JunctionController.get_junction_info},
+             "vehicles": list of vehicle IDs (in keyframe order, then in order of entry)}, one per step.
+             Steps before the first keyframe are skipped.
+    """
+    junctions = {}
+    vehicles = []
+    step = None
+    synced = False
+
+    def view():
+        return {"step": step, "junctions": {junction_id: dict(info) for junction_id, info in junctions.items()}, "vehicles": list(vehicles)}
+
+    with open(log_file_path, encoding="utf-8") as log_file:
+        for line in log_file:
+            match = _RECORD.match(line.rstrip("\n"))
+            if match is None:
+                continue
+            message = match.group(1)
+            if message.startswith("🗺️ Junction "):
+                junction_id, *fields = message[len("🗺️ Junction "):].split(" | ")
+                info = {}
+                for field in fields:
+                    name, value = field.split(": ", 1)
+                    info[name] = value if name == "Position" else ast.literal_eval(value)
+                junctions[junction_id] = dict(info, **{"Vehicles in Junction": 0, "Traffic Light State": "No Traffic Light"})
+            elif message.startswith(("🔑 Step #", "🔹 Step #")):
+                if synced and step is not None:
+                    yield view()
+                step = int(message.split("#", 1)[1])
+                synced = synced or message.startswith("🔑")
+            elif message.startswith("🚗 Vehicles in Junction: "):
+                for junction_id, count in ast.literal_eval(message.split(": ", 1)[1]).items():
+                    junctions[junction_id]["Vehicles in Junction"] = count
+            elif message.startswith("🚦 Traffic Light: "):
+                for junction_id, state in ast.literal_eval(message.split(": ", 1)[1]).items():
+                    junctions[junction_id]["Traffic Light State"] = state
+            elif message.startswith("🚙 Dynamic Nodes: "):
+                vehicles = ast.literal_eval(message.split(": ", 1)[1])
+            elif message.startswith("➕ Entered: "):
+                vehicles.extend(ast.literal_eval(message.split(": ", 1)[1]))
+            elif message.startswith("➖ Left: "):
+                left = set(ast.literal_eval(message.split(": ", 1)[1]))
+                vehicles = [v_id for v_id in vehicles if v_id not in left]
+    if synced and step is not None:
+        yield view()
@@ -0,0 +1,107 @@
+from abc import ABC, abstractmethod
+
+class StepContext:
+    """ Data of the current step, fetched once by the runner and shared by every plugin that runs in it. """
+
+    def __init__(self):
+        self.step = None
+        self.snapshot = {}  # vehicle ID -> subscription results, with the variables of every registered plugin
+        self.departed = ()
+        self.arrived = ()
+        self.step_state = None  # the snapshot as NumPy arrays (see StepState)
+        self.history = None  # rolling history of the previous steps, when the runner keeps one (see StepHistory)
+
+
+class StepPlugin(ABC):
+    """
+    Base class of the tasks run by the PluginScheduler.
+
+    A plugin declares how often it runs (every interval steps, starting at offset, interval 0 disables it)
+    and the vehicle variables it reads from the snapshot, which are subscribed once for all plugins.
+    """
+
+    name = None  # name in the profile and the summary (default: the class name)
+    interval = 1
+    offset = 0
+    variables = ()  # TraCI vehicle variables (traci.constants.VAR_*) read from context.snapshot
+
+    def is_due(self, step):
+        """ Returns whether the plugin runs at the given step. """
+        return bool(self.interval) and step >= self.offset and (step - self.offset) % self.interval == 0
+
+    @abstractmethod
+    def run(self, context):
+        """ Runs the plugin for the step described by the StepContext. """
+        pass
+
+
+class CallbackPlugin(StepPlugin):
+    """ Runs a plain function (receiving the StepContext) as a plugin. """
+
+    def __init__(self, name, callback, interval=1, offset=0, variables=()):
+        self.name = name
+        self.callback = callback
+        self.interval = interval
+        self.offset = offset
+        self.variables = tuple(variables)
+
+    def run(self, context):
+        self.callback(context)
+
+
+class PluginScheduler:
+    """ Runs the registered plugins in registration order, each only at the steps it is due. """
+
+    def __init__(self, profiler=None):
+        """
+        :param profiler: StepProfiler, every plugin run is charged to a phase named after the plugin.
+        """
+        self.profiler = profiler
+        self.plugins = []
+        self.run_counts = {}
+        self.context = StepContext()
+
+    def register(self, plugin, interval=None, offset=None):
+        """ Adds a plugin, optionally overriding its interval and offset. Returns the plugin. """
+        if interval is not None:
+            plugin.interval = interval
+        if offset is not None:
+            plugin.offset = offset
+        if plugin.name is None:
+            plugin.name = type(plugin).__name__
+        self.plugins.append(plugin)
+        self.run_counts[plugin.name] = 0
+        return plugin
+
+    def add(self, name, callback, interval=1, offset=0, variables=()):
+        """ Registers a function (receiving the StepContext) as a plugin. Returns the plugin. """
+        return self.register(CallbackPlugin(name, callback, interval, offset, variables))
+
+    def get_variables(self):
+        """ Returns the union of the vehicle variables declared by the enabled plugins. """
+        variables = {}
+        for plugin in self.plugins:
+            if plugin.interval:
+                variables.update(dict.fromkeys(plugin.variables))
+        return tuple(variables)
+
+    def run(self, step, vehicle_state, step_state):
+        """ Shares the state of the step with the plugins and runs the ones that are due. """
+        context = self.context
+        context.step = step
+        context.snapshot = vehicle_state.snapshot
+        context.departed = vehicle_state.departed
+        context.arrived = vehicle_state.arrived
+        context.step_state = step_state
+        for plugin in self.plugins:
+            if plugin.is_due(step):
+                plugin.run(context)
+                self.run_counts[plugin.name] += 1
+                if self.profiler:
+                    self.profiler.lap(plugin.name)
+
+    def log_summary(self, logger):
+        """ Logs how often every plugin ran. """
+        for plugin in self.plugins:
+            logger.log(f"🧩 Plugin {plugin.name}: every {plugin.interval or '-'} steps, ran {self.run_counts[plugin.name]} times",
+                       "INFO", "cyan", class_name="PluginScheduler", function_name="log_summary")
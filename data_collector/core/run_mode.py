@@ -0,0 +1,52 @@
+import time
+
+# headless: plain sumo at maximum speed, no pacing, no console output
+# gui: sumo-gui for visualization, paced only when a delay is requested
+# realtime: plain sumo paced so one simulated step takes one step length (or the given delay) of wall time
+RUN_MODES = ("headless", "gui", "realtime")
+
+def get_sumo_binary(run_mode):
+    """ Returns the SUMO executable of a run mode. """
+    if run_mode not in RUN_MODES:
+        raise ValueError(f"Unknown run mode '{run_mode}', expected one of {RUN_MODES}")
+    return "sumo-gui" if run_mode == "gui" else "sumo"
+
+def get_sumo_options(run_mode):
+    """ Returns the SUMO command line options of a run mode. """
+    if run_mode == "headless":
+        return ["--no-step-log"]
+    return ["--start"]
+
+def create_pacer(run_mode, delay, step_length):
+    """ Returns the pacer for a run, or None when the loop should run at full speed. """
+    if run_mode == "realtime":
+        return DeadlinePacer(delay if delay > 0 else step_length)
+    if run_mode == "gui" and delay > 0:
+        return DeadlinePacer(delay)
+    return None
+
+
+class DeadlinePacer:
+    """
+    Paces a loop to a fixed period against absolute deadlines.
+    Time spent in the step itself is absorbed by the wait, so the pace does not drift.
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.next_deadline = None
+        self.overruns = 0
+
+    def wait(self):
+        """ Sleeps until the end of the current period. Call once per step. """
+        now = time.perf_counter()
+        if self.next_deadline is None:
+            self.next_deadline = now + self.period
+        remaining = self.next_deadline - now
+        if remaining > 0:
+            time.sleep(remaining)
+        elif remaining < -self.period:
+            # more than a whole period behind - restart the schedule instead of bursting to catch up
+            self.overruns += 1
+            self.next_deadline = now
+        self.next_deadline += self.period
@@ -1,78 +1,215 @@
-import traci
+import os
 import time
+import traci
 import random
 from .logger import Logger
 from .node_logger import NodesLogger
 from .traffic_controller import TrafficController
 from .vehicle_controller import VehicleController
+from .vehicle_state import VehicleStateCache
+from .step_state import StepState
 from .junction_controller import JunctionController
+from .network_topology import NetworkTopology
+from .nodes_delta import NodesDeltaEncoder, NODES_LOG_MODES
+from .trace_replay import TraceRecorder
+from .telemetry_writer import TelemetryWriter
+from .telemetry_publisher import TelemetryPublisher
+from .step_history import StepHistory
+from .sumo_backend import launch_backend
+from .run_mode import get_sumo_binary, get_sumo_options, create_pacer
+from .step_profiler import StepProfiler
+from .plugin_scheduler import PluginScheduler
+
+# Multi-line junction description written to nodes_log.log every step
+JUNCTION_LOG_TEMPLATE = """🔹 Junction %s 
+            📍 Position: %s
+            🚗 Vehicles in Junction: %s
+            🚦 Traffic Light: %s
+            🛣️ Connected Edges: %s
+            🔀 Internal Edges: %s
+            ➡️ Connected Lanes: %s
+            ⚙️ Internal Lanes: %s
+            """
 
 class SimulationRunner:
     """ Main class to run the SUMO simulation with plugins and dynamic vehicle behavior. """
 
-    def __init__(self, delay=0.01, num_of_steps=100):
-        self.logger = Logger(log_file_path="main/simulation_log.log")
-        self.nodes_logger = NodesLogger(log_file_path="main/nodes_log.log") 
-    
-        # Close existing SUMO connection if it's already active
-        if traci.isLoaded():
-            self.logger.log("⚠️ Closing existing SUMO connection before starting a new one.", "WARNING", "yellow",
-                            class_name="SimulationRunner", function_name="__init__")
+    def __init__(self, delay=0.01, num_of_steps=100, topology_source="traci", log_level="INFO", log_overflow_policy="block",
+                 telemetry_dir=None, telemetry_format="auto", backend="traci", run_mode="headless",
+                 junction_radius=20.0, profile=False, profile_steps=None, log_dir="main", node_log_level=None,
+                 graph_dir=".", graph_export_interval=10, seed=None, trace=None, record_path=None,
+                 nodes_log_mode="full", plugins=(), publish_address=None, publish_wait_for=0,
+                 history_memory=None, sumo_config="sumo_config/my_3x3_simulation.sumocfg"):
+        """
+        :param delay: Wall-clock seconds per step in "realtime" mode (default: the step length) or "gui" mode (default: unpaced).
+        :param run_mode: "headless" (plain sumo, full speed, no console output), "gui" (sumo-gui) or "realtime" (paced).
+        :param junction_radius: Distance (m) within which a vehicle is counted as being in a junction.
+        :param profile: Records per-phase step times and SUMO call counts, summarized at the end of the run.
+        :param profile_steps: (first step, last step) window run under cProfile when profiling, written to log_dir/profile.pstats.
+        :param log_dir: Directory receiving simulation_log.log and nodes_log.log.
+        :param node_log_level: Minimum level of nodes_log.log records (default: log_level).
+        :param graph_dir: Directory receiving the network_graph_step_<step>.png files.
+        :param graph_export_interval: Steps between network graph exports (0 disables the export).
+        :param seed: Seeds both SUMO and the random vehicle speed changes for reproducible runs.
+        :param trace: Trace replayed by the "mock" backend instead of running SUMO (default: a SyntheticTrace).
+        :param record_path: File receiving a binary trace of the run, replayable with core.trace_replay.ReplayTrace.
+        :param nodes_log_mode: "full" (every junction described every step) or "delta" (topology once, then only
+                               the changes with periodic keyframes, read back with core.nodes_delta.read_nodes_log).
+        :param plugins: Additional StepPlugins, run after the built-in tasks at their own interval.
+        :param publish_address: "host:port" or Unix socket path on which a live state frame is published every step
+                                (see core/telemetry_publisher.py and main/subscribe.py), None disables it.
+        :param publish_wait_for: Number of telemetry subscribers awaited before the first step, so they receive every frame.
+        :param history_memory: Bytes preallocated for the rolling step history that plugins query as context.history
+                               (see core/step_history.py), None disables it.
+        :param sumo_config: SUMO configuration to run, e.g. one with generated demand (see main/generate_demand.py).
+        """
+        if nodes_log_mode not in NODES_LOG_MODES:
+            raise ValueError(f"Unknown nodes log mode '{nodes_log_mode}', expected one of {NODES_LOG_MODES}")
+        init_started = time.perf_counter()
+        # Start SUMO (or SUMO-GUI, depending on the run mode) first, it loads the network while the loggers are set up
+        sumo_cmd = [get_sumo_binary(run_mode), "-c", sumo_config] + get_sumo_options(run_mode)
+        if seed is not None:
+            sumo_cmd += ["--seed", str(seed)]
+        # Close existing SUMO connection if it's already active (before launching, the new one takes the default label)
+        closed_existing = traci.isLoaded()
+        if closed_existing:
             traci.close()
+        launch = launch_backend(sumo_cmd, backend, trace=trace)
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            console_output = run_mode != "headless"
+            self.logger = Logger(log_file_path=os.path.join(log_dir, "simulation_log.log"), level=log_level,
+                                 overflow_policy=log_overflow_policy, console=console_output)
+            self.nodes_logger = NodesLogger(log_file_path=os.path.join(log_dir, "nodes_log.log"), level=node_log_level or log_level,
+                                            overflow_policy=log_overflow_policy, console=console_output)
+            if closed_existing:
+                self.logger.log("⚠️ Closed the existing SUMO connection before starting a new one.", "WARNING", "yellow",
+                                class_name="SimulationRunner", function_name="__init__")
 
-        # Start SUMO-GUI with the simulation configuration
-        sumo_cmd = ["sumo", "-c", "sumo_config/my_3x3_simulation.sumocfg", "--start"]
-        traci.start(sumo_cmd)
-        self.logger.log("✅ Simulation started successfully with SUMO!", "INFO", "green",
+            # Static network topology is indexed once, straight from the net file while SUMO is still loading ("net_file")
+            # or from TraCI once it is connected ("traci")
+            if topology_source == "net_file":
+                self.topology = NetworkTopology.from_sumo_config(sumo_config)
+
+            # every controller queries SUMO through this one handle (TraCI connection or in-process libsumo)
+            self.sumo, self.backend = launch.connect(self.logger)
+        except BaseException:
+            # nothing else would stop the SUMO process started above
+            launch.abort()
+            raise
+        # with profiling on, every controller gets the call-counting handle
+        self.profiler = StepProfiler(enabled=profile, profile_steps=profile_steps,
+                                     profile_path=os.path.join(log_dir, "profile.pstats"))
+        self.sumo = self.profiler.wrap(self.sumo)
+        self.logger.log(f"✅ Simulation started successfully with SUMO! (backend: {self.backend})", "INFO", "green",
                         class_name="SimulationRunner", function_name="__init__", print_to_console=True)
+
+        if topology_source != "net_file":
+            self.topology = NetworkTopology.from_traci(self.sumo)
+        self.logger.log(f"🗺️ Network topology cached from {topology_source}: {len(self.topology.junction_ids)} junctions, "
+                        f"{len(self.topology.edge_lanes)} edges", "INFO", "cyan",
+                        class_name="SimulationRunner", function_name="__init__")
         
         # Initialize controllers
-        self.traffic_controller = TrafficController(self.logger)
-        self.vehicle_controller = VehicleController(self.logger)
-        self.junction_controller = JunctionController(self.logger)
+        self.vehicle_state = VehicleStateCache(self.logger, self.sumo)
+        self.step_state = StepState() # the same snapshot as NumPy arrays, for vectorized per-step aggregates
+        self.traffic_controller = TrafficController(self.logger, self.sumo)
+        self.vehicle_controller = VehicleController(self.logger, self.sumo, self.vehicle_state, self.step_state)
+        self.junction_controller = JunctionController(self.logger, self.sumo, self.topology, self.step_state,
+                                                      proximity_radius=junction_radius, graph_dir=graph_dir)
+        self.nodes_delta = NodesDeltaEncoder(self.nodes_logger, self.topology, self.junction_controller) \
+            if nodes_log_mode == "delta" else None
         # Any appeal to traci should be done from VehicleController 
        
+        # Columnar per-step telemetry (disabled unless a directory is given)
+        self.telemetry = TelemetryWriter(telemetry_dir, file_format=telemetry_format) if telemetry_dir else None
+        if self.telemetry:
+            self.logger.log(f"📦 Writing {self.telemetry.file_format} telemetry to {telemetry_dir}", "INFO", "cyan",
+                            class_name="SimulationRunner", function_name="__init__")
+
+        # Live per-step frames for local subscribers such as dashboards (disabled unless an address is given)
+        self.publisher = TelemetryPublisher(publish_address, self.junction_controller, self.step_state, self.logger) \
+            if publish_address else None
+        if self.publisher:
+            self.publisher.start(wait_for=publish_wait_for)
+            self.logger.log(f"📡 Publishing live telemetry on {self.publisher.get_address()}", "INFO", "cyan",
+                            class_name="SimulationRunner", function_name="__init__", print_to_console=True)
+
+        # Binary trace of the run for SUMO-free replays (disabled unless a path is given)
+        self.recorder = TraceRecorder(record_path, self.sumo, self.vehicle_state, self.step_state) if record_path else None
+        if self.recorder:
+            self.logger.log(f"⏺️ Recording a replay trace to {record_path}", "INFO", "cyan",
+                            class_name="SimulationRunner", function_name="__init__")
+
         # Simulation parameters
         self.delay = delay
+        self.run_mode = run_mode
+        self.random = random.Random(seed)
+        self.graph_export_interval = graph_export_interval
         self.num_of_steps = num_of_steps
         self.most_veh = 0
         self.most_veh_step = 0
         self.traffic_phase_duration = 10
 
+        # Every per-step task is a plugin with its own interval, fed from one shared snapshot per step
+        self.scheduler = PluginScheduler(self.profiler)
+        # the history is recorded first, so every later plugin can query the current step
+        self.history = self.scheduler.register(StepHistory(self.step_state, self.junction_controller, history_memory)) \
+            if history_memory else None
+        self.scheduler.context.history = self.history
+        self.scheduler.add("log_nodes", lambda context: self.log_nodes(context.step))
+        self.scheduler.add("graph_export", self.export_network_graph, interval=graph_export_interval)
+        self.scheduler.add("step_log", self.log_step)
+        self.scheduler.add("speed_adjust", lambda context: self.adjust_vehicle_speeds_randomly(), interval=10)
+        # self.scheduler.add("traffic_lights", lambda context: self.traffic_controller.update_traffic_light(
+        #     context.step, self.traffic_phase_duration), interval=self.traffic_phase_duration)
+        self.scheduler.add("log_vehicle_info", lambda context: self.vehicle_controller.log_vehicle_info())
+        self.scheduler.add("fastest_vehicle", lambda context: self.vehicle_controller.track_fastest_vehicle(context.step))
+        if self.telemetry:
+            self.scheduler.add("telemetry", lambda context: self.telemetry.record_step(
+                context.step, context.snapshot, self.junction_controller.get_junction_states()))
+        if self.publisher:
+            self.scheduler.add("publish", lambda context: self.publisher.publish(context.step))
+        for plugin in plugins:
+            self.scheduler.register(plugin)
+
+        self.logger.log("⏱️ Startup: SUMO ready %.3f s after launch (waited %.3f s for it), runner initialized in %.3f s",
+                        "INFO", "cyan", class_name="SimulationRunner", function_name="__init__",
+                        args=(launch.startup_time, launch.connect_wait, time.perf_counter() - init_started))
+
     def run_simulation(self):
         """ Runs the simulation loop while logging all events. """
         try:
-            self.junction_controller.subscribe_to_junctions() # register all junctions for vehicle tracking around them
+            self.vehicle_state.require(self.scheduler.get_variables()) # one subscription covers what every plugin reads
+            self.vehicle_state.start() # subscribe vehicles so each step costs one snapshot instead of per-vehicle queries
+            if self.recorder:
+                self.recorder.start()
+            pacer = create_pacer(self.run_mode, self.delay, self.sumo.simulation.getDeltaT())
+            profiler = self.profiler
+            profiler.start()
 
             for step in range(self.num_of_steps):
-                traci.simulationStep()
-                time.sleep(self.delay)
-
-                # Log all nodes (junctions and vehicles)
-                self.log_nodes(step)
+                profiler.begin_step(step)
+                self.sumo.simulationStep()
+                profiler.lap("simulation_step")
+                self.vehicle_state.refresh()
+                self.step_state.load(step, self.vehicle_state.snapshot)
+                self.junction_controller.update_vehicle_counts() # vehicles around each junction, from the positions snapshot
+                profiler.lap("state_refresh")
+                if self.recorder:
+                    self.recorder.record_step(step)
+                    profiler.lap("record")
+                if pacer:
+                    pacer.wait()
+                    profiler.lap("pacing")
 
-                # Log current step and vehicle count
-                num_vehicles = traci.vehicle.getIDCount()
-                self.logger.log(f"🔹 Step {step}: {num_vehicles} vehicles on the road", "INFO",
-                                class_name="SimulationRunner", function_name="run_simulation")
+                # One timestamp per step for every log record of this step
+                self.logger.refresh_timestamp()
+                self.nodes_logger.refresh_timestamp()
 
-                # Track the maximum vehicle count
-                if num_vehicles > self.most_veh:
-                    self.most_veh = num_vehicles
-                    self.most_veh_step = step
-
-                # Adjust the speed of one random vehicle every 10 steps
-                if step % 10 == 0:
-                    self.adjust_vehicle_speeds_randomly()
-
-                # # Update traffic lights
-                # self.traffic_controller.update_traffic_light(step, self.traffic_phase_duration)
-
-                # Log all vehicle information
-                self.vehicle_controller.log_vehicle_info()
-
-                # Track the fastest vehicle each step
-                self.vehicle_controller.track_fastest_vehicle(step)
+                # Nodes log, step log, speed changes, vehicle info, fastest vehicle, telemetry and extra plugins
+                self.scheduler.run(step, self.vehicle_state, self.step_state)
+                profiler.end_step()
 
             # Log the summary of the fastest vehicle
             fastest_vehicle, fastest_speed, fastest_step = self.vehicle_controller.get_fastest_vehicle_summary()
@@ -80,24 +217,54 @@ class SimulationRunner:
                             class_name="SimulationRunner", function_name="run_simulation")
             self.logger.log(f"🚀 Fastest vehicle: {fastest_vehicle} with speed {fastest_speed:.2f} m/s at step {fastest_step}", "INFO", "green",
                             class_name="SimulationRunner", function_name="run_simulation")
+            self.scheduler.log_summary(self.logger)
+            if self.history:
+                self.history.log_summary(self.logger)
+            if self.publisher:
+                self.publisher.log_summary()
+            self.profiler.log_summary(self.logger)
 
         except Exception as e:
             self.logger.log(f"❌ Critical simulation error: {e}", "ERROR", "red",
                             class_name="SimulationRunner", function_name="run_simulation", print_to_console=True)
 
         finally:
-            traci.close()
+            self.sumo.close()
+            self.junction_controller.close()
+            if self.telemetry:
+                self.telemetry.close()
+            if self.publisher:
+                self.publisher.close()
+            if self.recorder:
+                self.recorder.close()
+            self.logger.refresh_timestamp()
             self.logger.log("🔚 Simulation finished and closed successfully!", "INFO", "green",
                             class_name="SimulationRunner", function_name="run_simulation", print_to_console=True)
             self.logger.close()
             self.nodes_logger.close()
 
+    def log_step(self, context):
+        """ Logs the vehicle count of the step and tracks the maximum. """
+        num_vehicles = context.step_state.size
+        self.logger.log("🔹 Step %d: %d vehicles on the road (mean speed %.2f m/s, %d stopped)", "INFO",
+                        class_name="SimulationRunner", function_name="run_simulation",
+                        args=(context.step, num_vehicles, context.step_state.get_mean_speed(), context.step_state.get_stopped_count()))
+
+        # Track the maximum vehicle count
+        if num_vehicles > self.most_veh:
+            self.most_veh = num_vehicles
+            self.most_veh_step = context.step
+
+    def export_network_graph(self, context):
+        """ Queues the network graph of the step for rendering. """
+        self.junction_controller.export_network_graph(context.step, self.topology.real_junction_ids)
+
     def adjust_vehicle_speeds_randomly(self):
         """ Randomly adjust the speed of one random active vehicle. """
         vehicles = self.vehicle_controller.get_active_vehicles()
         if vehicles:
-            selected_vehicle = random.choice(vehicles)
-            random_speed = random.uniform(5, 25)  # Speed between 5 and 25 m/s
+            selected_vehicle = self.random.choice(vehicles)
+            random_speed = self.random.uniform(5, 25)  # Speed between 5 and 25 m/s
             self.vehicle_controller.update_vehicle_speed(selected_vehicle, random_speed)
             self.logger.log(f"🔀 Randomly adjusted speed of vehicle {selected_vehicle} to {random_speed:.2f} m/s",
                             "INFO", "blue", class_name="SimulationRunner", function_name="adjust_vehicle_speeds_randomly")
@@ -112,45 +279,44 @@ class SimulationRunner:
 
     def log_nodes(self, step_number):
         """ Logs both static and dynamic nodes ONLY to nodes_log.log. """
+        if self.nodes_delta:
+            if self.nodes_logger.is_enabled("INFO"):
+                self.nodes_delta.log_step(step_number, self.step_state.vehicle_ids)
+        else:
+            self.log_all_nodes(step_number)
+
+    def log_all_nodes(self, step_number):
+        """ Writes the full description of every junction and the active vehicles ("full" nodes log mode). """
         static_nodes = self.get_static_nodes()
         dynamic_nodes = self.get_dynamic_nodes()
 
         # סינון צמתים פנימיים
-        self.filtered_static_nodes = [node for node in static_nodes if not node.startswith(":")]
+        self.filtered_static_nodes = self.topology.real_junction_ids
 
         # Log the nodes to the nodes log file
         self.nodes_logger.log("-------------------------", "INFO", 
                             class_name="SimulationRunner", function_name="log_nodes")
-        self.nodes_logger.log(f"🔹 Step #{step_number}", "INFO",
-                            class_name="SimulationRunner", function_name="log_nodes")
-        self.nodes_logger.log(f"📍 Static Nodes Count (Real Only): {len(self.filtered_static_nodes)}", "INFO",
-                            class_name="SimulationRunner", function_name="log_nodes")
-        self.nodes_logger.log(f"🚗 Dynamic Nodes Count: {len(dynamic_nodes)}", "INFO",
-                            class_name="SimulationRunner", function_name="log_nodes")
+        self.nodes_logger.log("🔹 Step #%d", "INFO",
+                            class_name="SimulationRunner", function_name="log_nodes", args=(step_number,))
+        self.nodes_logger.log("📍 Static Nodes Count (Real Only): %d", "INFO",
+                            class_name="SimulationRunner", function_name="log_nodes", args=(len(self.filtered_static_nodes),))
+        self.nodes_logger.log("🚗 Dynamic Nodes Count: %d", "INFO",
+                            class_name="SimulationRunner", function_name="log_nodes", args=(len(dynamic_nodes),))
 
         
 
         # הצגת מידע מפורט על כל צומת
-        for junction_id in self.filtered_static_nodes:
-            junction_info = self.junction_controller.get_junction_info(junction_id)
-            
-            # לוג מסודר ומפורמט
-            log_message = f"""🔹 Junction {junction_id} 
-            📍 Position: {junction_info['Position']}
-            🚗 Vehicles in Junction: {junction_info['Vehicles in Junction']}
-            🚦 Traffic Light: {junction_info['Traffic Light State']}
-            🛣️ Connected Edges: {junction_info['Connected Edges']}
-            🔀 Internal Edges: {junction_info['Internal Edges']}
-            ➡️ Connected Lanes: {junction_info['Connected Lanes']}
-            ⚙️ Internal Lanes: {junction_info['Internal Lanes']}
-            """
-            self.nodes_logger.log(log_message, "INFO",
-                            class_name="SimulationRunner", function_name="log_nodes")
-
-        self.nodes_logger.log(f"Dynamic Nodes: {dynamic_nodes}", "INFO",
-                            class_name="SimulationRunner", function_name="log_nodes")
+        if self.nodes_logger.is_enabled("INFO"):
+            for junction_id in self.filtered_static_nodes:
+                junction_info = self.junction_controller.get_junction_info(junction_id)
 
-        # export_graph_flag = True if step_number % 5 == 0 else False
+                # לוג מסודר ומפורמט - formatted by the writer thread
+                self.nodes_logger.log(JUNCTION_LOG_TEMPLATE, "INFO",
+                                class_name="SimulationRunner", function_name="log_nodes",
+                                args=(junction_id, junction_info['Position'], junction_info['Vehicles in Junction'],
+                                      junction_info['Traffic Light State'], junction_info['Connected Edges'],
+                                      junction_info['Internal Edges'], junction_info['Connected Lanes'],
+                                      junction_info['Internal Lanes']))
 
-        if step_number % 10 == 0:
-            self.junction_controller.export_network_graph(step_number, self.filtered_static_nodes)
\ No newline at end of file
+        self.nodes_logger.log("Dynamic Nodes: %s", "INFO",
+                            class_name="SimulationRunner", function_name="log_nodes", args=(dynamic_nodes,))
\ No newline at end of file
@@ -0,0 +1,298 @@
+from array import array
+from bisect import bisect_left
+import numpy as np
+from .plugin_scheduler import StepPlugin
+
+# Bytes of one vehicle row: step, vehicle, x, y, speed, running speed total, lane, edge + its entry in the vehicle index
+VEHICLE_ROW_BYTES = 4 + 4 + 4 + 4 + 4 + 8 + 1 + 4 + 8
+
+# Share of the memory budget given to the per-step ring when max_steps is not set
+STEP_RING_SHARE = 1 / 16
+
+
+def _ring_positions(head, capacity, start, stop):
+    """ Returns the physical indices of the logical entries start..stop-1 of a ring whose oldest entry is at head. """
+    return (head + np.arange(start, stop)) % capacity
+
+
+class StepHistory(StepPlugin):
+    """
+    Rolling in-memory history of the vehicle and junction state of the last steps, queryable during the run.
+
+    Vehicle rows (one per vehicle and step) go to a preallocated ring sized from the memory budget; the oldest
+    rows are overwritten once it is full. Every step also fills one slot of a step ring holding the junction
+    vehicle counts and the network-wide vehicle count and speed sum. Both rings carry running totals, so
+    sums and means over any step window cost two binary searches instead of a scan:
+    - steps are recorded in increasing order, so a step window is found with searchsorted on the step ring,
+    - every vehicle has a sorted index of its rows, so its part of the window is found with bisect.
+
+    Register it before the plugins that query it (the runner does, as context.history), so they see the current step.
+    """
+
+    name = "history"
+
+    def __init__(self, step_state, junction_controller, memory_budget=64 * 1024 ** 2, max_steps=None):
+        """
+        :param step_state: StepState of the run, loaded before every record() call.
+        :param junction_controller: JunctionController whose vehicle counts were updated for the current step.
+        :param memory_budget: Bytes preallocated for the history (the step ring and the vehicle rows).
+        :param max_steps: Steps kept in the step ring (default: what 1/16 of the budget holds).
+        """
+        self.step_state = step_state
+        self.junction_controller = junction_controller
+        self.junction_ids = junction_controller.proximity.junction_ids
+        self.junction_index = junction_controller.proximity.junction_index
+        self.memory_budget = memory_budget
+
+        step_row_bytes = 4 + 8 + 4 + 8 + 8 + 8 + (4 + 8) * len(self.junction_ids)
+        self.step_capacity = max_steps or max(1, int(memory_budget * STEP_RING_SHARE) // step_row_bytes)
+        self.row_capacity = (memory_budget - self.step_capacity * step_row_bytes) // VEHICLE_ROW_BYTES
+        if self.row_capacity < 1:
+            raise ValueError(f"History memory budget of {memory_budget} bytes is too small for {self.step_capacity} steps")
+
+        # Step ring, one slot per recorded step
+        self._steps = np.zeros(self.step_capacity, dtype=np.int32)
+        self._row_starts = np.zeros(self.step_capacity, dtype=np.int64)  # absolute number of the step's first vehicle row
+        self._vehicle_counts = np.zeros(self.step_capacity, dtype=np.int32)
+        self._vehicle_totals = np.zeros(self.step_capacity, dtype=np.int64)  # running total of the vehicle counts
+        self._speed_sums = np.zeros(self.step_capacity, dtype=np.float64)
+        self._speed_totals = np.zeros(self.step_capacity, dtype=np.float64)  # running total of the speed sums
+        self._junction_counts = np.zeros((self.step_capacity, len(self.junction_ids)), dtype=np.int32)
+        self._junction_totals = np.zeros((self.step_capacity, len(self.junction_ids)), dtype=np.int64)  # running totals
+        self.step_head = 0  # slot of the oldest kept step
+        self.step_size = 0
+        self.steps_recorded = 0
+
+        # Vehicle ring, one row per vehicle and step; rows are numbered absolutely, the slot is row % row_capacity
+        self._row_steps = np.zeros(self.row_capacity, dtype=np.int32)
+        self._row_vehicles = np.zeros(self.row_capacity, dtype=np.int32)
+        self._row_positions = np.zeros((self.row_capacity, 2), dtype=np.float32)
+        self._row_speeds = np.zeros(self.row_capacity, dtype=np.float32)
+        self._row_speed_totals = np.zeros(self.row_capacity, dtype=np.float64)  # running total of the vehicle's speeds
+        self._row_lanes = np.zeros(self.row_capacity, dtype=np.int8)
+        self._row_edges = np.zeros(self.row_capacity, dtype=np.int32)
+        self.rows_written = 0
+        self.next_trim = self.row_capacity
+
+        # Per interned vehicle ID (see StepState.vehicle_table): sorted absolute rows and running speed total
+        self._vehicle_rows = []
+        self._vehicle_speed_totals = np.zeros(0, dtype=np.float64)
+        self._vehicle_total = 0
+        self._speed_total = 0.0
+        self._junction_total = np.zeros(len(self.junction_ids), dtype=np.int64)
+
+    def run(self, context):
+        self.record(context.step)
+
+    def record(self, step):
+        """ Appends the current step state and junction counts. Steps must be recorded in increasing order. """
+        state = self.step_state
+        size = state.size
+        if size > self.row_capacity:
+            raise ValueError(f"Step {step} has {size} vehicles, more than the {self.row_capacity} rows of the history budget")
+        vehicles = state.vehicles
+
+        # running speed totals, per vehicle and network-wide
+        if len(state.vehicle_table) > len(self._vehicle_speed_totals):
+            grown = np.zeros(max(len(state.vehicle_table), 2 * len(self._vehicle_speed_totals)), dtype=np.float64)
+            grown[:len(self._vehicle_speed_totals)] = self._vehicle_speed_totals
+            self._vehicle_speed_totals = grown
+        self._vehicle_speed_totals[vehicles] += state.speeds  # a vehicle appears once per step
+        speed_sum = float(state.speeds.sum())
+        self._vehicle_total += size
+        self._speed_total += speed_sum
+        counts = self.junction_controller.junction_vehicle_counts
+        self._junction_total += counts
+
+        # step slot, overwriting the oldest step when the ring is full
+        if self.step_size == self.step_capacity:
+            slot = self.step_head
+            self.step_head = (self.step_head + 1) % self.step_capacity
+        else:
+            slot = (self.step_head + self.step_size) % self.step_capacity
+            self.step_size += 1
+        self._steps[slot] = step
+        self._row_starts[slot] = self.rows_written
+        self._vehicle_counts[slot] = size
+        self._vehicle_totals[slot] = self._vehicle_total
+        self._speed_sums[slot] = speed_sum
+        self._speed_totals[slot] = self._speed_total
+        self._junction_counts[slot] = counts
+        self._junction_totals[slot] = self._junction_total
+        self.steps_recorded += 1
+
+        # vehicle rows, wrapping around the end of the ring
+        first = self.rows_written
+        slots = np.arange(first, first + size) % self.row_capacity
+        self._row_steps[slots] = step
+        self._row_vehicles[slots] = vehicles
+        self._row_positions[slots] = state.positions
+        self._row_speeds[slots] = state.speeds
+        self._row_speed_totals[slots] = self._vehicle_speed_totals[vehicles]
+        self._row_lanes[slots] = state.lanes
+        self._row_edges[slots] = state.edges
+        vehicle_rows = self._vehicle_rows
+        if len(state.vehicle_table) > len(vehicle_rows):
+            vehicle_rows.extend(array("q") for _ in range(len(state.vehicle_table) - len(vehicle_rows)))
+        for row, vehicle in enumerate(vehicles.tolist(), first):
+            vehicle_rows[vehicle].append(row)
+        self.rows_written += size
+
+        if self.rows_written >= self.next_trim:
+            self._trim_vehicle_rows()
+
+    def _trim_vehicle_rows(self):
+        """ Drops the overwritten rows from the vehicle indices. Runs once per turn of the vehicle ring. """
+        oldest = self.get_oldest_row()
+        for rows in self._vehicle_rows:
+            if rows and rows[0] < oldest:
+                del rows[:bisect_left(rows, oldest)]
+        self.next_trim = self.rows_written + self.row_capacity
+
+    def get_oldest_row(self):
+        """ Returns the absolute number of the oldest vehicle row still in the ring. """
+        return max(0, self.rows_written - self.row_capacity)
+
+    def get_step_range(self):
+        """ Returns (first, last) step of the step ring, or (None, None) before the first record. """
+        if not self.step_size:
+            return None, None
+        last = (self.step_head + self.step_size - 1) % self.step_capacity
+        return int(self._steps[self.step_head]), int(self._steps[last])
+
+    def get_window(self, steps):
+        """ Returns (start, end) covering the last given number of steps, for the query methods. """
+        _, last = self.get_step_range()
+        if last is None:
+            return 0, -1
+        return last - steps + 1, last
+
+    def _find_step(self, step, side="left"):
+        """ Returns the logical index of the first kept step >= step ("left") or > step ("right"). O(log n). """
+        first = self._steps[self.step_head:self.step_head + self.step_size]
+        second = self._steps[:self.step_size - len(first)]  # the part that wrapped around
+        index = int(np.searchsorted(first, step, side))
+        if index == len(first):
+            index += int(np.searchsorted(second, step, side))
+        return index
+
+    def _step_slots(self, start, end):
+        """ Returns the step ring slots of the kept steps between start and end (inclusive, None = unbounded). """
+        lower = self._find_step(start) if start is not None else 0
+        upper = self._find_step(end, "right") if end is not None else self.step_size
+        return _ring_positions(self.step_head, self.step_capacity, lower, max(lower, upper))
+
+    def _row_bounds(self, start, end):
+        """ Returns the absolute (first, stop) vehicle rows of the steps between start and end, clipped to the ring. """
+        lower = self._find_step(start) if start is not None else 0
+        upper = self._find_step(end, "right") if end is not None else self.step_size
+        first = self._row_starts[(self.step_head + lower) % self.step_capacity] if lower < self.step_size else self.rows_written
+        stop = self._row_starts[(self.step_head + upper) % self.step_capacity] if upper < self.step_size else self.rows_written
+        return max(int(first), self.get_oldest_row()), int(stop)
+
+    def _vehicle_slots(self, vehicle_id, start, end):
+        """ Returns the vehicle ring slots of a vehicle's rows between the start and end steps. O(log n) plus the rows. """
+        vehicle = self.step_state.vehicle_table.index.get(vehicle_id)
+        if vehicle is None or vehicle >= len(self._vehicle_rows):
+            return np.zeros(0, dtype=np.int64)
+        rows = self._vehicle_rows[vehicle]
+        first, stop = self._row_bounds(start, end)
+        rows = rows[bisect_left(rows, first):bisect_left(rows, stop)]
+        return np.frombuffer(rows, dtype=np.int64) % self.row_capacity if rows else np.zeros(0, dtype=np.int64)
+
+    def get_vehicle_history(self, vehicle_id, start=None, end=None):
+        """
+        Returns the recorded state of a vehicle between two steps (inclusive, None = unbounded).
+
+        :return: Dict of arrays: step, x, y, speed, lane and edge (interned, see StepState.edge_table), one entry
+                 per step the vehicle was on the road, oldest first. Empty when nothing is kept for the vehicle.
+        """
+        slots = self._vehicle_slots(vehicle_id, start, end)
+        positions = self._row_positions[slots]
+        return {"step": self._row_steps[slots], "x": positions[:, 0], "y": positions[:, 1],
+                "speed": self._row_speeds[slots], "lane": self._row_lanes[slots], "edge": self._row_edges[slots]}
+
+    def get_vehicle_mean_speed(self, vehicle_id, start=None, end=None):
+        """ Returns the mean speed (m/s) of a vehicle over the steps it was recorded between start and end, or None. """
+        vehicle = self.step_state.vehicle_table.index.get(vehicle_id)
+        if vehicle is None or vehicle >= len(self._vehicle_rows):
+            return None
+        rows = self._vehicle_rows[vehicle]
+        first, stop = self._row_bounds(start, end)
+        lower, upper = bisect_left(rows, first), bisect_left(rows, stop)
+        if upper <= lower:
+            return None
+        # running totals of the first and last row - the window sum without touching the rows in between
+        first_slot, last_slot = rows[lower] % self.row_capacity, rows[upper - 1] % self.row_capacity
+        total = self._row_speed_totals[last_slot] - self._row_speed_totals[first_slot] + self._row_speeds[first_slot]
+        return float(total) / (upper - lower)
+
+    def get_step_vehicles(self, step):
+        """ Returns the recorded state of every vehicle at one step, as get_vehicle_history() does plus the vehicle IDs. """
+        first, stop = self._row_bounds(step, step)
+        slots = np.arange(first, max(first, stop)) % self.row_capacity
+        positions = self._row_positions[slots]
+        vehicle_ids = self.step_state.vehicle_table.ids
+        return {"vehicle_ids": [vehicle_ids[vehicle] for vehicle in self._row_vehicles[slots].tolist()],
+                "x": positions[:, 0], "y": positions[:, 1], "speed": self._row_speeds[slots],
+                "lane": self._row_lanes[slots], "edge": self._row_edges[slots]}
+
+    def get_junction_history(self, junction_id, start=None, end=None):
+        """ Returns (steps, vehicle counts) of a junction between two steps (inclusive, None = unbounded). """
+        slots = self._step_slots(start, end)
+        return self._steps[slots], self._junction_counts[slots, self.junction_index[junction_id]]
+
+    def get_junction_aggregate(self, junction_id, start=None, end=None):
+        """
+        Returns the vehicle count statistics of a junction over a step window, or None when no step of it is kept.
+
+        :return: Dict with steps, mean, min, max and the trend (count change per step of a least-squares line).
+        """
+        index = self.junction_index[junction_id]
+        slots = self._step_slots(start, end)
+        if not len(slots):
+            return None
+        steps = self._steps[slots]
+        counts = self._junction_counts[slots, index]
+        total = self._junction_totals[slots[-1], index] - self._junction_totals[slots[0], index] + counts[0]
+        trend = float(np.polyfit(steps, counts, 1)[0]) if len(slots) > 1 and steps[-1] > steps[0] else 0.0
+        return {"steps": len(slots), "mean": float(total) / len(slots), "min": int(counts.min()), "max": int(counts.max()),
+                "trend": trend}
+
+    def get_network_history(self, start=None, end=None):
+        """ Returns (steps, vehicle counts, mean speeds) of the whole network between two steps (inclusive, None = unbounded). """
+        slots = self._step_slots(start, end)
+        counts = self._vehicle_counts[slots]
+        sums = self._speed_sums[slots]
+        return self._steps[slots], counts, np.divide(sums, counts, out=np.zeros(len(slots)), where=counts > 0)
+
+    def get_network_aggregate(self, start=None, end=None):
+        """
+        Returns the network-wide statistics over a step window, or None when no step of it is kept.
+
+        :return: Dict with steps, mean vehicle count and mean speed (m/s) over every vehicle of every step.
+        """
+        slots = self._step_slots(start, end)
+        if not len(slots):
+            return None
+        first, last = slots[0], slots[-1]
+        vehicles = int(self._vehicle_totals[last] - self._vehicle_totals[first] + self._vehicle_counts[first])
+        speed = float(self._speed_totals[last] - self._speed_totals[first] + self._speed_sums[first])
+        return {"steps": len(slots), "mean_vehicles": vehicles / len(slots), "mean_speed": speed / vehicles if vehicles else 0.0}
+
+    def get_memory_usage(self):
+        """ Returns the bytes held by the preallocated arrays and the vehicle indices. """
+        arrays = (self._steps, self._row_starts, self._vehicle_counts, self._vehicle_totals, self._speed_sums,
+                  self._speed_totals, self._junction_counts, self._junction_totals, self._row_steps, self._row_vehicles,
+                  self._row_positions, self._row_speeds, self._row_speed_totals, self._row_lanes, self._row_edges,
+                  self._vehicle_speed_totals)
+        return sum(a.nbytes for a in arrays) + sum(rows.itemsize * len(rows) for rows in self._vehicle_rows)
+
+    def log_summary(self, logger):
+        """ Logs how much of the run the history still holds. """
+        first, last = self.get_step_range()
+        kept_rows = self.rows_written - self.get_oldest_row()
+        logger.log("🗂️ History: steps %s-%s kept (%d slots), %d of %d vehicle rows kept (%d slots), %.1f MB",
+                   "INFO", "cyan", class_name="StepHistory", function_name="log_summary",
+                   args=(first, last, self.step_capacity, kept_rows, self.rows_written, self.row_capacity,
+                         self.get_memory_usage() / 1024 ** 2))
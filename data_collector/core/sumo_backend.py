@@ -0,0 +1,132 @@
+import time
+import subprocess
+import traci
+from sumolib.miscutils import getFreeSocketPort
+
+SUMO_BACKENDS = ("traci", "libsumo", "mock")
+
+# Exceptions raised by the started backends, use these in except clauses instead of traci.TraCIException.
+# libsumo is optional and only imported when it is started, which adds its exception here,
+# so read it as sumo_backend.SUMO_ERRORS at the time of the except clause rather than importing the name.
+SUMO_ERRORS = (traci.TraCIException,)
+
+def _import_libsumo():
+    """ Returns the libsumo module (runs SUMO inside this process, no socket round-trips), or None if it is not installed. """
+    global SUMO_ERRORS
+    try:
+        import libsumo
+    except ImportError:
+        return None
+    if libsumo.TraCIException not in SUMO_ERRORS:
+        SUMO_ERRORS = SUMO_ERRORS + (libsumo.TraCIException,)
+    return libsumo
+
+
+class BackendLaunch:
+    """
+    A SUMO backend started in the background, so the process loads the network while Python-side setup goes on.
+
+    For "traci" the SUMO process is spawned immediately and connect() attaches the TraCI connection, polling
+    every few milliseconds instead of the one second back-off of traci.start(). libsumo and mock run inside
+    this process, they are started by connect().
+    """
+
+    # Seconds between connection attempts while SUMO is still loading
+    POLL_INTERVAL = 0.01
+
+    def __init__(self, sumo_cmd, backend="traci", label="default", trace=None):
+        """
+        :param sumo_cmd: SUMO command line, starting with the executable.
+        :param backend: "traci" (socket connection to a SUMO process), "libsumo" (in-process)
+                        or "mock" (no SUMO at all, see core/mock_backend.py).
+        :param label: Label of the TraCI connection (ignored by libsumo and mock).
+        :param trace: Trace driving the mock backend (default: a SyntheticTrace).
+        """
+        if backend not in SUMO_BACKENDS:
+            raise ValueError(f"Unknown SUMO backend '{backend}', expected one of {SUMO_BACKENDS}")
+        self.sumo_cmd = list(sumo_cmd)
+        self.backend = backend
+        self.label = label
+        self.trace = trace
+        self.fallback_reason = None  # why libsumo was replaced by the TraCI socket backend
+        self.process = None
+        self.port = None
+        self.launched_at = time.perf_counter()
+        self.connect_wait = 0.0  # seconds connect() blocked waiting for SUMO
+        self.startup_time = None  # seconds from the launch to a usable handle
+
+        if backend == "libsumo":
+            if sumo_cmd[0].endswith("-gui"):
+                self.fallback_reason = "libsumo cannot drive sumo-gui"
+            elif _import_libsumo() is None:
+                self.fallback_reason = "libsumo is not installed"
+            if self.fallback_reason is not None:
+                self.backend = "traci"
+
+        if self.backend == "traci":
+            self.port = getFreeSocketPort()
+            self.process = subprocess.Popen(self.sumo_cmd + ["--remote-port", str(self.port)])
+
+    def connect(self, logger=None, timeout=60.0):
+        """
+        Waits for the backend to be ready and returns the handle every controller uses for its queries.
+
+        The handle exposes the usual TraCI domains (handle.vehicle, handle.junction, ...) plus
+        simulationStep() and close(), whichever backend is behind it.
+
+        :param logger: Logger receiving the libsumo fallback warning.
+        :param timeout: Seconds to wait for the SUMO process to accept the connection.
+        :return: (handle, name of the backend actually started)
+        """
+        if self.fallback_reason and logger:
+            logger.log(f"⚠️ {self.fallback_reason}, falling back to the TraCI socket backend.", "WARNING", "yellow",
+                       class_name="BackendLaunch", function_name="connect")
+        started = time.perf_counter()
+        if self.backend == "mock":
+            from .mock_backend import MockSumo
+            handle = MockSumo(self.trace)
+        elif self.backend == "libsumo":
+            handle = _import_libsumo()
+            handle.start(self.sumo_cmd)
+        else:
+            handle = self._connect_traci(started + timeout)
+        now = time.perf_counter()
+        self.connect_wait = now - started
+        self.startup_time = now - self.launched_at
+        return handle, self.backend
+
+    def abort(self):
+        """ Kills the launched SUMO process, for a runner whose setup failed before connect(). """
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+    def _connect_traci(self, deadline):
+        """ Attaches the TraCI connection to the launched SUMO process as soon as it listens. """
+        while True:
+            try:
+                # a single attempt without traci's own retry loop (which sleeps and prints between attempts)
+                traci.init(self.port, numRetries=0, label=self.label, proc=self.process)
+                return traci.getConnection(self.label)
+            except traci.TraCIException as e:
+                # SUMO exited before listening, e.g. on an invalid configuration
+                raise traci.FatalTraCIError(f"SUMO exited with code {self.process.returncode} before accepting "
+                                            f"the TraCI connection ({e})") from e
+            except traci.FatalTraCIError:
+                if time.perf_counter() > deadline:
+                    self.process.kill()
+                    raise
+                time.sleep(self.POLL_INTERVAL)
+
+
+def launch_backend(sumo_cmd, backend="traci", label="default", trace=None):
+    """ Starts SUMO in the background and returns the BackendLaunch, call its connect() when the handle is needed. """
+    return BackendLaunch(sumo_cmd, backend, label, trace)
+
+def start_backend(sumo_cmd, backend="traci", label="default", logger=None, trace=None):
+    """
+    Starts SUMO and returns the handle every controller uses for its queries, blocking until it is ready.
+
+    :return: (handle, name of the backend actually started)
+    """
+    return launch_backend(sumo_cmd, backend, label, trace).connect(logger)
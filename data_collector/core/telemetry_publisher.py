@@ -0,0 +1,381 @@
+import os
+import json
+import socket
+import struct
+import threading
+from collections import deque
+import numpy as np
+from .id_table import IdTable
+
+# Every message is a (kind, payload size) header followed by the payload:
+# HELLO (JSON: junction IDs and the delivery mode) once after the handshake, IDS (JSON: vehicle IDs and light
+# states interned since the last IDS message) before any frame that uses them, and FRAME once per published step.
+# A "conflate" subscriber pulls its frames: it sends one REQUEST byte per frame it is ready for and gets the newest
+# one, so no backlog of stale frames can build up in the socket buffers.
+MESSAGE_HEADER = struct.Struct("<cI")
+FRAME_HEADER = struct.Struct("<iII")  # step, vehicles, junctions
+HELLO, IDS, FRAME = b"H", b"I", b"F"
+REQUEST = b"R"
+
+# Per-vehicle and per-junction columns of a frame, in the order they are stored
+VEHICLE_COLUMNS = (("vehicle", np.int32), ("x", np.float32), ("y", np.float32), ("speed", np.float32), ("lane", np.int8))
+JUNCTION_COLUMNS = (("vehicle_count", np.int32), ("light_state", np.int16))
+
+# "conflate" delivers only the latest frame to a subscriber that fell behind, "lossless" delivers every frame
+DELIVERY_MODES = ("conflate", "lossless")
+
+def parse_address(address):
+    """ Returns the socket family and address of "host:port" (TCP), a (host, port) tuple or a Unix socket path. """
+    if isinstance(address, tuple):
+        return socket.AF_INET, address
+    if ":" in address and not address.startswith("/"):
+        host, port = address.rsplit(":", 1)
+        return socket.AF_INET, (host, int(port))
+    return socket.AF_UNIX, address
+
+def _receive_exactly(connection, size):
+    """ Reads exactly size bytes from a socket, raises EOFError if the peer closed it. """
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = connection.recv_into(view[received:])
+        if not count:
+            raise EOFError("Connection closed")
+        received += count
+    return bytes(buffer)
+
+
+class TelemetryPublisher:
+    """
+    Publishes a compact state frame per step (vehicle arrays, junction vehicle counts, light states)
+    to any number of local subscriber processes.
+
+    Frames are encoded once in the simulation thread and handed to one sender thread per subscriber,
+    so stepping never waits for a socket. A subscriber chooses its delivery mode in the handshake:
+    "conflate" is sent the newest frame each time it asks for one, "lossless" queues every frame up to
+    max_pending and is disconnected when a slow consumer exceeds it, instead of slowing down the run.
+    Subscribers only receive the frames published after they connected, start(wait_for=...) holds the
+    run until the expected subscribers are there.
+    """
+
+    def __init__(self, address, junction_controller, step_state, logger=None, max_pending=1000):
+        """
+        :param address: "host:port", (host, port) or a Unix socket path to listen on (port 0 picks a free port).
+        :param junction_controller: JunctionController whose vehicle counts were updated for the current step.
+        :param step_state: StepState of the run, loaded before every publish() call.
+        :param max_pending: Frames queued for a lossless subscriber before it is disconnected.
+        """
+        self.family, self.address = parse_address(address)
+        self.junction_controller = junction_controller
+        self.step_state = step_state
+        self.logger = logger
+        self.max_pending = max_pending
+        self.junction_ids = junction_controller.proximity.junction_ids
+        self.light_ids = tuple(j for j in self.junction_ids if junction_controller.topology.has_traffic_light(j))
+        self.light_index = np.array([self.junction_ids.index(j) for j in self.light_ids], dtype=np.int64)
+        self.light_states = IdTable()
+        self.subscribers = []
+        self.all_subscribers = []  # including the disconnected ones, for the summary
+        self.lock = threading.Lock()
+        self.ready = threading.Condition(self.lock)  # notified when a subscriber finished its handshake
+        self.ready_subscribers = 0
+        self.server = None
+        self.accept_thread = None
+        self.published_frames = 0
+        self.connections = 0
+
+    def start(self, wait_for=0, timeout=30.0):
+        """
+        Starts listening for subscribers.
+
+        :param wait_for: Number of subscribers whose handshake is awaited before returning, so they receive the
+                         run from its first frame.
+        :param timeout: Seconds to wait for them, the run starts without the missing ones afterwards.
+        """
+        self.server = socket.socket(self.family, socket.SOCK_STREAM)
+        if self.family == socket.AF_INET:
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(self.address)
+        self.server.listen()
+        self.address = self.server.getsockname()
+        self.accept_thread = threading.Thread(target=self._accept, name="TelemetryPublisher", daemon=True)
+        self.accept_thread.start()
+        if wait_for:
+            with self.ready:
+                ready = self.ready.wait_for(lambda: self.ready_subscribers >= wait_for, timeout)
+            if not ready:
+                self._log(f"⚠️ Only {self.ready_subscribers} of {wait_for} telemetry subscribers connected "
+                          f"within {timeout} s, starting without the others", "WARNING", "yellow", function_name="start")
+
+    def get_address(self):
+        """ Returns the address subscribers connect to, as "host:port" or the Unix socket path. """
+        if self.family == socket.AF_INET:
+            return f"{self.address[0]}:{self.address[1]}"
+        return self.address
+
+    def _accept(self):
+        """ Accept thread: starts a sender thread for every new subscriber. """
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return  # the server socket was closed
+            with self.lock:
+                self.connections += 1
+                subscriber = _Subscriber(self, connection, self.connections)
+                self.subscribers.append(subscriber)
+                self.all_subscribers.append(subscriber)
+            subscriber.start()
+
+    def publish(self, step):
+        """ Encodes the frame of the current step once and queues it for every subscriber. """
+        self.published_frames += 1
+        with self.lock:
+            subscribers = [subscriber for subscriber in self.subscribers if not subscriber.closed]
+            self.subscribers = subscribers
+        if not subscribers:
+            return
+
+        state = self.step_state
+        light_states = np.full(len(self.junction_ids), -1, dtype=np.int16)
+        trafficlight = self.junction_controller.sumo.trafficlight
+        for index, junction_id in zip(self.light_index.tolist(), self.light_ids):
+            light_states[index] = self.light_states.intern(trafficlight.getRedYellowGreenState(junction_id))
+
+        columns = (state.vehicles, state.positions[:, 0], state.positions[:, 1], state.speeds, state.lanes,
+                   self.junction_controller.junction_vehicle_counts, light_states)
+        dtypes = [dtype for _, dtype in VEHICLE_COLUMNS + JUNCTION_COLUMNS]
+        frame = FRAME_HEADER.pack(step, state.size, len(self.junction_ids)) + b"".join(
+            np.ascontiguousarray(column, dtype=dtype).tobytes() for column, dtype in zip(columns, dtypes))
+        # the IDs the frame refers to, sender threads send the ones their subscriber does not know yet
+        id_counts = (len(state.vehicle_table), len(self.light_states))
+        for subscriber in subscribers:
+            subscriber.offer(frame, id_counts)
+
+    def log_summary(self):
+        """ Logs how many frames were published, in total and to every subscriber while it was connected. """
+        self._log(f"📡 Published {self.published_frames} telemetry frames on {self.get_address()}, "
+                  f"{self.connections} subscribers connected during the run", function_name="log_summary")
+        with self.lock:
+            subscribers = list(self.all_subscribers)
+        for subscriber in subscribers:
+            self._log(f"📡 Telemetry subscriber {subscriber.number} ({subscriber.mode or 'no handshake'}): "
+                      f"{subscriber.offered} frames published to it", function_name="log_summary")
+
+    def close(self, drain_timeout=5.0):
+        """
+        Stops accepting subscribers and disconnects the connected ones.
+
+        :param drain_timeout: Seconds the subscribers get to receive their pending frames before they are disconnected.
+        """
+        if self.server:
+            self.server.close()
+            if self.family == socket.AF_UNIX:
+                try:
+                    os.unlink(self.address)
+                except OSError:
+                    pass
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.finish()
+        for subscriber in subscribers:
+            subscriber.join(timeout=drain_timeout)
+            subscriber.close()
+
+    def _log(self, message, level="INFO", color="cyan", function_name="_accept"):
+        """ Logs a subscriber event, if the publisher has a logger. """
+        if self.logger:
+            self.logger.log(message, level, color, class_name="TelemetryPublisher", function_name=function_name)
+
+
+class _Subscriber(threading.Thread):
+    """ Sender thread of one subscriber connection, with its own pending frames. """
+
+    def __init__(self, publisher, connection, number):
+        super().__init__(name="TelemetrySubscriber", daemon=True)
+        self.publisher = publisher
+        self.connection = connection
+        self.number = number
+        self.mode = None  # set by the handshake, frames published during it are queued as in "lossless" mode
+        self.pending = deque()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.finishing = False  # the publisher closes, send the pending frames and stop
+        self.sent_vehicle_ids = 0
+        self.sent_light_states = 0
+        self.offered = 0
+        self.delivered = 0
+        self.conflated = 0
+
+    def offer(self, frame, id_counts):
+        """ Queues a frame according to the delivery mode, without ever blocking the caller. """
+        with self.condition:
+            if self.closed:
+                return
+            self.offered += 1
+            if self.mode == "conflate":
+                self.conflated += len(self.pending)
+                self.pending.clear()
+            elif len(self.pending) >= self.publisher.max_pending:
+                self.publisher._log(f"⚠️ Telemetry subscriber {self.number} fell {len(self.pending)} frames behind, disconnecting it",
+                                    "WARNING", "yellow", function_name="publish")
+                self.closed = True
+                self.condition.notify()
+                return
+            self.pending.append((frame, id_counts))
+            self.condition.notify()
+
+    def run(self):
+        """ Reads the handshake, then sends the queued frames until the subscriber or the publisher disconnects. """
+        try:
+            self.connection.settimeout(5.0)
+            mode = self.connection.makefile("rb").readline().decode("ascii", "replace").strip()
+            if mode not in DELIVERY_MODES:
+                raise ValueError(f"Unknown delivery mode '{mode}', expected one of {DELIVERY_MODES}")
+            self.connection.settimeout(None)
+            self._send(HELLO, json.dumps({"junction_ids": list(self.publisher.junction_ids), "mode": mode}).encode("utf-8"))
+            with self.condition:
+                self.mode = mode
+                if mode == "conflate" and len(self.pending) > 1:
+                    # only the newest of the frames queued during the handshake is kept
+                    self.conflated += len(self.pending) - 1
+                    latest = self.pending.pop()
+                    self.pending.clear()
+                    self.pending.append(latest)
+            with self.publisher.ready:
+                self.publisher.ready_subscribers += 1
+                self.publisher.ready.notify_all()
+            self.publisher._log(f"📡 Telemetry subscriber {self.number} connected ({mode})")
+
+            while True:
+                with self.condition:
+                    while not self.pending and not self.closed and not self.finishing:
+                        self.condition.wait()
+                    if self.closed or not self.pending:
+                        break
+                if mode == "conflate":
+                    # wait for the subscriber to ask, then send the newest frame published meanwhile
+                    if _receive_exactly(self.connection, 1) != REQUEST:
+                        raise ValueError("Unexpected message from a conflate subscriber")
+                with self.condition:
+                    if self.closed:
+                        break
+                    frame, (vehicle_count, light_count) = self.pending.popleft()
+                self._send_new_ids(vehicle_count, light_count)
+                self._send(FRAME, frame)
+                self.delivered += 1
+        except (OSError, EOFError, ValueError) as e:
+            self.publisher._log(f"📡 Telemetry subscriber {self.number} disconnected: {e}", function_name="run")
+        finally:
+            if self.mode:
+                self.publisher._log(f"📡 Telemetry subscriber {self.number} ({self.mode}) received {self.delivered} of "
+                                    f"{self.offered} frames, {self.conflated} conflated", function_name="run")
+            self.close()
+
+    def finish(self):
+        """ Lets the sender thread deliver the pending frames, then stop. """
+        with self.condition:
+            self.finishing = True
+            self.condition.notify()
+
+    def _send_new_ids(self, vehicle_count, light_count):
+        """ Sends the vehicle IDs and light states interned since the last IDS message. """
+        if vehicle_count > self.sent_vehicle_ids or light_count > self.sent_light_states:
+            ids = {
+                "vehicle_start": self.sent_vehicle_ids,
+                "vehicle_ids": self.publisher.step_state.vehicle_table.ids[self.sent_vehicle_ids:vehicle_count],
+                "light_start": self.sent_light_states,
+                "light_states": self.publisher.light_states.ids[self.sent_light_states:light_count],
+            }
+            self._send(IDS, json.dumps(ids).encode("utf-8"))
+            self.sent_vehicle_ids = vehicle_count
+            self.sent_light_states = light_count
+
+    def _send(self, kind, payload):
+        self.connection.sendall(MESSAGE_HEADER.pack(kind, len(payload)) + payload)
+
+    def close(self):
+        """ Stops the sender thread and closes the connection. """
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.connection.close()
+
+
+class TelemetrySubscriber:
+    """ Connects to a TelemetryPublisher and decodes its frames. """
+
+    def __init__(self, address, mode="conflate", timeout=10.0):
+        """
+        :param address: Address the publisher listens on ("host:port" or a Unix socket path).
+        :param mode: "conflate" (the newest frame whenever the previous one was consumed) or "lossless" (every frame).
+        :param timeout: Seconds to wait for the publisher when connecting.
+        """
+        if mode not in DELIVERY_MODES:
+            raise ValueError(f"Unknown delivery mode '{mode}', expected one of {DELIVERY_MODES}")
+        family, address = parse_address(address)
+        self.connection = socket.create_connection(address, timeout) if family == socket.AF_INET else socket.socket(family)
+        if family == socket.AF_UNIX:
+            self.connection.settimeout(timeout)
+            self.connection.connect(address)
+        self.connection.sendall(mode.encode("ascii") + b"\n")
+        self.connection.settimeout(None)
+        kind, payload = self._receive()
+        hello = json.loads(payload)
+        self.mode = hello["mode"]
+        self.junction_ids = tuple(hello["junction_ids"])
+        self.vehicle_ids = []
+        self.light_states = []
+
+    def _receive(self):
+        """ Returns the (kind, payload) of the next message. """
+        kind, size = MESSAGE_HEADER.unpack(_receive_exactly(self.connection, MESSAGE_HEADER.size))
+        return kind, _receive_exactly(self.connection, size)
+
+    def frames(self):
+        """
+        Yields the published frames until the publisher closes the connection.
+
+        :return: Generator of dicts {"step", "vehicle_ids", "x", "y", "speed", "lane", "vehicle_count", "light_state"}:
+                 vehicle columns are NumPy arrays in vehicle_ids order, junction columns in junction_ids order
+                 ("light_state" holds the state strings, "" for junctions without a traffic light).
+        """
+        while True:
+            try:
+                if self.mode == "conflate":
+                    # ask for the next frame only now that the previous one was consumed
+                    self.connection.sendall(REQUEST)
+                kind, payload = self._receive()
+                while kind != FRAME:
+                    if kind == IDS:
+                        ids = json.loads(payload)
+                        del self.vehicle_ids[ids["vehicle_start"]:]
+                        self.vehicle_ids.extend(ids["vehicle_ids"])
+                        del self.light_states[ids["light_start"]:]
+                        self.light_states.extend(ids["light_states"])
+                    kind, payload = self._receive()
+            except (EOFError, OSError):
+                return
+            yield self._decode_frame(payload)
+
+    def _decode_frame(self, payload):
+        """ Decodes a FRAME payload into NumPy columns. """
+        step, vehicle_count, junction_count = FRAME_HEADER.unpack_from(payload)
+        frame = {"step": step}
+        offset = FRAME_HEADER.size
+        for columns, count in ((VEHICLE_COLUMNS, vehicle_count), (JUNCTION_COLUMNS, junction_count)):
+            for name, dtype in columns:
+                frame[name] = np.frombuffer(payload, dtype=dtype, count=count, offset=offset)
+                offset += count * np.dtype(dtype).itemsize
+        frame["vehicle_ids"] = [self.vehicle_ids[index] for index in frame.pop("vehicle").tolist()]
+        frame["light_state"] = [self.light_states[index] if index >= 0 else "" for index in frame["light_state"].tolist()]
+        return frame
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,149 @@
+import os
+import glob
+import json
+from array import array
+import numpy as np
+import traci.constants as tc
+from .id_table import IdTable
+
+def _import_pyarrow():
+    """
+    Returns (pyarrow, pyarrow.parquet), or (None, None) when pyarrow is not installed.
+    Imported on first use, so runs without telemetry do not pay for loading pyarrow.
+    Parquet output is used when pyarrow is installed, otherwise chunks are written as .npz.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None, None
+    return pa, pq
+
+TELEMETRY_FORMATS = ("auto", "npz", "parquet")
+
+class TelemetryWriter:
+    """ Writes per-step vehicle and junction state as chunked columnar files with interned IDs. """
+
+    def __init__(self, output_dir, chunk_steps=500, file_format="auto"):
+        """
+        :param output_dir: Directory receiving the chunk files and the ID index.
+        :param chunk_steps: Number of simulation steps buffered in memory before a chunk is written.
+        :param file_format: "npz", "parquet" or "auto" (parquet when pyarrow is available).
+        """
+        if file_format not in TELEMETRY_FORMATS:
+            raise ValueError(f"Unknown telemetry format '{file_format}', expected one of {TELEMETRY_FORMATS}")
+        self.pa, self.pq = _import_pyarrow() if file_format != "npz" else (None, None)
+        if file_format == "parquet" and self.pa is None:
+            raise ImportError("Parquet telemetry requires pyarrow (pip install pyarrow)")
+
+        self.output_dir = output_dir
+        self.chunk_steps = chunk_steps
+        self.file_format = "parquet" if file_format == "parquet" or (file_format == "auto" and self.pa is not None) else "npz"
+        os.makedirs(output_dir, exist_ok=True)
+
+        self.vehicle_ids = IdTable()
+        self.junction_ids = IdTable()
+        self.light_states = IdTable()
+        self.chunk_index = 0
+        self.buffered_steps = 0
+        self._reset_buffers()
+
+    def _reset_buffers(self):
+        """ Starts a new in-memory chunk. """
+        self.vehicle_columns = {
+            "step": array("i"), "vehicle": array("i"), "x": array("f"), "y": array("f"),
+            "speed": array("f"), "lane": array("h"),
+        }
+        self.junction_columns = {
+            "step": array("i"), "junction": array("i"), "vehicle_count": array("i"), "light_state": array("i"),
+        }
+
+    def record_step(self, step, vehicle_snapshot, junction_states=()):
+        """
+        Appends one simulation step.
+
+        :param vehicle_snapshot: Dict of vehicle ID -> subscription results (see VehicleStateCache.snapshot).
+        :param junction_states: Iterable of (junction ID, vehicle count, light state) tuples.
+        """
+        columns = self.vehicle_columns
+        intern = self.vehicle_ids.intern
+        for v_id, state in vehicle_snapshot.items():
+            x, y = state[tc.VAR_POSITION]
+            columns["step"].append(step)
+            columns["vehicle"].append(intern(v_id))
+            columns["x"].append(x)
+            columns["y"].append(y)
+            columns["speed"].append(state[tc.VAR_SPEED])
+            columns["lane"].append(state[tc.VAR_LANE_INDEX])
+
+        columns = self.junction_columns
+        for junction_id, vehicle_count, light_state in junction_states:
+            columns["step"].append(step)
+            columns["junction"].append(self.junction_ids.intern(junction_id))
+            columns["vehicle_count"].append(vehicle_count)
+            columns["light_state"].append(self.light_states.intern(light_state))
+
+        self.buffered_steps += 1
+        if self.buffered_steps >= self.chunk_steps:
+            self.flush()
+
+    def flush(self):
+        """ Writes the buffered steps as one vehicle chunk and one junction chunk. """
+        if not self.buffered_steps:
+            return
+        self._write_chunk("vehicles", self.vehicle_columns)
+        self._write_chunk("junctions", self.junction_columns)
+        self.chunk_index += 1
+        self.buffered_steps = 0
+        self._reset_buffers()
+
+    def _write_chunk(self, table_name, columns):
+        """ Writes one table chunk in the configured format. """
+        arrays = {name: np.frombuffer(column, dtype=column.typecode) if len(column) else np.array([], dtype=column.typecode)
+                  for name, column in columns.items()}
+        chunk_path = os.path.join(self.output_dir, f"{table_name}_{self.chunk_index:05d}")
+        if self.file_format == "parquet":
+            self.pq.write_table(self.pa.table(arrays), chunk_path + ".parquet")
+        else:
+            np.savez(chunk_path + ".npz", **arrays)
+
+    def close(self):
+        """ Writes the remaining steps and the ID index that maps the interned integers back to IDs. """
+        self.flush()
+        index = {
+            "format": self.file_format,
+            "chunks": self.chunk_index,
+            "vehicle_ids": self.vehicle_ids.ids,
+            "junction_ids": self.junction_ids.ids,
+            "light_states": self.light_states.ids,
+        }
+        with open(os.path.join(self.output_dir, "ids.json"), "w", encoding="utf-8") as index_file:
+            json.dump(index, index_file)
+
+
+def load_telemetry(output_dir):
+    """
+    Loads a telemetry directory written by TelemetryWriter.
+
+    :return: (vehicle columns, junction columns, ID index), columns are dicts of name -> NumPy array.
+    """
+    with open(os.path.join(output_dir, "ids.json"), encoding="utf-8") as index_file:
+        index = json.load(index_file)
+    _, pq = _import_pyarrow() if index["format"] == "parquet" else (None, None)
+    if index["format"] == "parquet" and pq is None:
+        raise ImportError("Reading parquet telemetry requires pyarrow (pip install pyarrow)")
+
+    tables = []
+    for table_name in ("vehicles", "junctions"):
+        chunk_paths = sorted(glob.glob(os.path.join(output_dir, f"{table_name}_*.{index['format']}")))
+        chunks = []
+        for chunk_path in chunk_paths:
+            if index["format"] == "parquet":
+                table = pq.read_table(chunk_path)
+                chunks.append({name: table.column(name).to_numpy() for name in table.column_names})
+            else:
+                with np.load(chunk_path) as chunk:
+                    chunks.append({name: chunk[name] for name in chunk.files})
+        tables.append({name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]} if chunks else {})
+
+    return tables[0], tables[1], index
@@ -0,0 +1,262 @@
+import json
+import zlib
+import struct
+import numpy as np
+import traci.constants as tc
+from .id_table import IdTable
+
+# Binary trace layout: MAGIC, a network record, one frame record per step, an index record and
+# the offset of the index record. Every record is a (kind, step, payload size) header followed by
+# a zlib-compressed payload.
+MAGIC = b"SUMOTRACE1\n"
+RECORD_HEADER = struct.Struct("<ciI")
+FRAME_HEADER = struct.Struct("<IIIII")  # active, entered, left, departed, arrived
+INDEX_OFFSET = struct.Struct("<Q")
+NETWORK, KEYFRAME, DELTA, INDEX = b"N", b"K", b"D", b"I"
+
+# Per-vehicle columns of a frame, in the order they are stored (sorted by vehicle index)
+FRAME_COLUMNS = (("x", np.float32), ("y", np.float32), ("speed", np.float32), ("lane_position", np.float32),
+                 ("edge", np.int32), ("route_index", np.int32), ("lane", np.int8))
+
+class TraceRecorder:
+    """
+    Records the per-step state the controllers consume into a compact binary trace for ReplayTrace.
+
+    Frames store the vehicle columns of every step plus the vehicles that entered or left the road since
+    the previous frame. Every keyframe_interval steps a keyframe stores the complete set of vehicles
+    instead, so a replay can seek to any step by reading from the keyframe before it.
+    """
+
+    def __init__(self, path, sumo, vehicle_state, step_state, keyframe_interval=100):
+        """
+        :param path: File receiving the trace.
+        :param vehicle_state: VehicleStateCache of the run (snapshot, departures and arrivals).
+        :param step_state: StepState of the run, loaded before every record_step() call.
+        :param keyframe_interval: Steps between keyframes.
+        """
+        self.path = path
+        self.sumo = sumo
+        self.vehicle_state = vehicle_state
+        self.step_state = step_state
+        self.keyframe_interval = keyframe_interval
+        self.file = open(path, "wb")
+        self.keyframes = []  # (step, file offset)
+        self.steps = []
+        self.active = np.empty(0, dtype=np.int32)
+        self.vehicle_routes = []
+        self.vehicle_max_speeds = []
+        self.routes = {"": ()}
+        self.edge_map = np.empty(0, dtype=np.int32)  # step_state edge index -> trace edge index
+
+    def _write_record(self, kind, step, payload):
+        """ Writes one compressed record and returns its file offset. """
+        offset = self.file.tell()
+        payload = zlib.compress(payload, 1)
+        self.file.write(RECORD_HEADER.pack(kind, step, len(payload)))
+        self.file.write(payload)
+        return offset
+
+    def start(self):
+        """ Writes the static network: junctions, edges (internal ones included) and traffic lights. """
+        sumo = self.sumo
+        self.junction_ids = list(sumo.junction.getIDList())
+        junction_index = {junction_id: index for index, junction_id in enumerate(self.junction_ids)}
+        self.edge_ids = list(sumo.edge.getIDList())
+        self.edge_index = {edge_id: index for index, edge_id in enumerate(self.edge_ids)}
+        self.traffic_lights = list(sumo.trafficlight.getIDList())
+        self.light_states = {tl_id: IdTable() for tl_id in self.traffic_lights}
+        network = {
+            "step_length": sumo.simulation.getDeltaT(),
+            "junction_ids": self.junction_ids,
+            "junction_positions": [list(sumo.junction.getPosition(junction_id)) for junction_id in self.junction_ids],
+            "edge_ids": self.edge_ids,
+            "edge_from": [junction_index[sumo.edge.getFromJunction(edge_id)] for edge_id in self.edge_ids],
+            "edge_to": [junction_index[sumo.edge.getToJunction(edge_id)] for edge_id in self.edge_ids],
+            "edge_lengths": [sumo.lane.getLength(f"{edge_id}_0") for edge_id in self.edge_ids],
+            "edge_speeds": [sumo.lane.getMaxSpeed(f"{edge_id}_0") for edge_id in self.edge_ids],
+            "edge_lanes": [sumo.edge.getLaneNumber(edge_id) for edge_id in self.edge_ids],
+            "traffic_lights": self.traffic_lights,
+        }
+        self.file.write(MAGIC)
+        self._write_record(NETWORK, -1, json.dumps(network).encode("utf-8"))
+
+    def _intern_vehicle(self, vehicle_id):
+        """ Returns the trace index of a vehicle (the step_state index), registering its route on first sight. """
+        index = self.step_state.vehicle_table.intern(vehicle_id)
+        while len(self.vehicle_routes) <= index:
+            self.vehicle_routes.append("")
+            self.vehicle_max_speeds.append(0.0)
+        return index
+
+    def record_step(self, step):
+        """ Appends the current step, call once per step after the state refresh and step_state.load(). """
+        step_state = self.step_state
+        snapshot = self.vehicle_state.snapshot
+        size = step_state.size
+        vehicles = step_state.vehicles.astype(np.int32)
+        for vehicle_id in self.vehicle_state.departed + self.vehicle_state.arrived:
+            self._intern_vehicle(vehicle_id)
+        if len(self.edge_map) < len(step_state.edge_table):
+            self.edge_map = np.array([self.edge_index[edge_id] for edge_id in step_state.edge_table.ids], dtype=np.int32)
+
+        order = np.argsort(vehicles, kind="stable")
+        active = vehicles[order]
+        entered = np.setdiff1d(active, self.active, assume_unique=True)
+        left = np.setdiff1d(self.active, active, assume_unique=True)
+        self.active = active
+        # new vehicles: route and maximum speed, fetched once per vehicle
+        for index in entered.tolist():
+            vehicle_id = step_state.vehicle_table.ids[index]
+            self._intern_vehicle(vehicle_id)
+            route_id = snapshot[vehicle_id][tc.VAR_ROUTE_ID]
+            if route_id not in self.routes:
+                self.routes[route_id] = tuple(self.edge_index[edge_id] for edge_id in self.sumo.route.getEdges(route_id))
+            self.vehicle_routes[index] = route_id
+            self.vehicle_max_speeds[index] = self.sumo.vehicle.getMaxSpeed(vehicle_id)
+
+        states = snapshot.values()
+        columns = {
+            "x": step_state.positions[:, 0],
+            "y": step_state.positions[:, 1],
+            "speed": step_state.speeds,
+            "lane_position": np.fromiter((state[tc.VAR_LANEPOSITION] for state in states), dtype=np.float64, count=size),
+            "edge": self.edge_map[step_state.edges],
+            "route_index": np.fromiter((state[tc.VAR_ROUTE_INDEX] for state in states), dtype=np.int64, count=size),
+            "lane": step_state.lanes,
+        }
+        lights = np.array([self.light_states[tl_id].intern(self.sumo.trafficlight.getRedYellowGreenState(tl_id))
+                           for tl_id in self.traffic_lights], dtype=np.int16)
+
+        keyframe = not self.steps or step % self.keyframe_interval == 0
+        if keyframe:
+            entered, left = active, np.empty(0, dtype=np.int32)
+        departed = np.array([self.step_state.vehicle_table.index[v] for v in self.vehicle_state.departed], dtype=np.int32)
+        arrived = np.array([self.step_state.vehicle_table.index[v] for v in self.vehicle_state.arrived], dtype=np.int32)
+        payload = [FRAME_HEADER.pack(size, len(entered), len(left), len(departed), len(arrived)),
+                   entered.tobytes(), left.tobytes(), departed.tobytes(), arrived.tobytes(), lights.tobytes()]
+        payload += [columns[name][order].astype(dtype).tobytes() for name, dtype in FRAME_COLUMNS]
+        offset = self._write_record(KEYFRAME if keyframe else DELTA, step, b"".join(payload))
+        if keyframe:
+            self.keyframes.append((step, offset))
+        self.steps.append(step)
+
+    def close(self):
+        """ Writes the index (IDs, routes, light states, keyframes) and closes the file. """
+        if self.file.closed:
+            return
+        index = {
+            "steps": len(self.steps),
+            "first_step": self.steps[0] if self.steps else 0,
+            "keyframes": self.keyframes,
+            "vehicle_ids": self.step_state.vehicle_table.ids[:len(self.vehicle_routes)],
+            "vehicle_routes": self.vehicle_routes,
+            "vehicle_max_speeds": self.vehicle_max_speeds,
+            "routes": self.routes,
+            "light_states": {tl_id: table.ids for tl_id, table in self.light_states.items()},
+        }
+        offset = self._write_record(INDEX, -1, json.dumps(index).encode("utf-8"))
+        self.file.write(INDEX_OFFSET.pack(offset))
+        self.file.close()
+
+
+class ReplayTrace:
+    """
+    Plays a trace written by TraceRecorder back through MockSumo (backend="mock"), without SUMO.
+
+    Implements the trace interface of SyntheticTrace. The recorded trajectories are fixed, so
+    set_speed() has no effect, and traffic light phases are indices into the recorded light states.
+    """
+
+    def __init__(self, path, start_step=None):
+        """
+        :param path: Trace file written by TraceRecorder.
+        :param start_step: First recorded step played by advance() (default: the first one).
+        """
+        self.file = open(path, "rb")
+        if self.file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a simulation trace")
+        _, _, network = self._read_record()
+        network = json.loads(network)
+        self.file.seek(-INDEX_OFFSET.size, 2)
+        self.file.seek(INDEX_OFFSET.unpack(self.file.read(INDEX_OFFSET.size))[0])
+        _, _, index = self._read_record()
+        index = json.loads(index)
+
+        self.step_length = network["step_length"]
+        self.junction_ids = network["junction_ids"]
+        self.junction_positions = np.array(network["junction_positions"], dtype=np.float64)
+        self.edge_ids = network["edge_ids"]
+        self.edge_from = np.array(network["edge_from"], dtype=np.int64)
+        self.edge_to = np.array(network["edge_to"], dtype=np.int64)
+        self.edge_lengths = np.array(network["edge_lengths"], dtype=np.float64)
+        self.edge_speeds = np.array(network["edge_speeds"], dtype=np.float64)
+        self.edge_lanes = np.array(network["edge_lanes"], dtype=np.int64)
+        self.light_ids = network["traffic_lights"]
+        self.traffic_lights = {tl_id: index["light_states"][tl_id] for tl_id in self.light_ids}
+        self.light_phases = {}
+
+        self.vehicle_ids = index["vehicle_ids"]
+        self.route_ids = index["vehicle_routes"]
+        self.routes = {route_id: tuple(route) for route_id, route in index["routes"].items()}
+        self.vehicle_max_speeds = np.array(index["vehicle_max_speeds"], dtype=np.float64)
+        self.keyframes = index["keyframes"]
+        self.first_step = index["first_step"]
+        self.last_step = self.first_step + index["steps"] - 1
+
+        num_vehicles = len(self.vehicle_ids)
+        self.status = np.zeros(num_vehicles, dtype=np.int8)  # 0 not on the road, 1 driving, 2 arrived
+        for name, _ in FRAME_COLUMNS:
+            setattr(self, name, np.zeros(num_vehicles, dtype=np.int64 if name in ("edge", "route_index", "lane") else np.float64))
+        self.active = np.empty(0, dtype=np.int64)
+        self.current_step = self.first_step - 1
+        self.seek(self.first_step if start_step is None else start_step)
+
+    def _read_record(self):
+        """ Reads the record at the current file position, returns (kind, step, payload). """
+        kind, step, size = RECORD_HEADER.unpack(self.file.read(RECORD_HEADER.size))
+        return kind, step, zlib.decompress(self.file.read(size))
+
+    def seek(self, step):
+        """ Positions the replay so that the next advance() plays the given step (read from the keyframe before it). """
+        if not self.first_step <= step <= self.last_step:
+            raise ValueError(f"Step {step} is outside the recorded steps {self.first_step}-{self.last_step}")
+        keyframe_step, offset = max(keyframe for keyframe in self.keyframes if keyframe[0] <= step)
+        self.file.seek(offset)
+        self.status[:] = 0
+        self.current_step = keyframe_step - 1
+        while self.current_step < step - 1:
+            self.advance()
+
+    def advance(self):
+        """ Plays the next recorded step and returns the (departed, arrived) vehicle indices. """
+        if self.current_step >= self.last_step:
+            raise EOFError(f"Replay trace ended after step {self.last_step}")
+        kind, step, payload = self._read_record()
+        active, entered, left, departed, arrived = FRAME_HEADER.unpack_from(payload)
+        arrays = []
+        offset = FRAME_HEADER.size
+        for count, dtype in ((entered, np.int32), (left, np.int32), (departed, np.int32), (arrived, np.int32),
+                             (len(self.light_ids), np.int16)) + tuple((active, dtype) for _, dtype in FRAME_COLUMNS):
+            arrays.append(np.frombuffer(payload, dtype=dtype, count=count, offset=offset))
+            offset += count * np.dtype(dtype).itemsize
+        entered, left, departed, arrived, lights = arrays[:5]
+
+        if kind == KEYFRAME:
+            self.status[self.status == 1] = 0
+            self.active = entered.astype(np.int64)
+        else:
+            self.active = np.union1d(np.setdiff1d(self.active, left, assume_unique=True), entered)
+        self.status[left] = 0
+        self.status[arrived] = 2
+        self.status[self.active] = 1
+        for (name, _), column in zip(FRAME_COLUMNS, arrays[5:]):
+            getattr(self, name)[self.active] = column
+        self.light_phases = dict(zip(self.light_ids, lights.tolist()))
+        self.current_step = step
+        return departed, arrived
+
+    def set_speed(self, vehicle_index, speed):
+        """ Recorded trajectories cannot be changed, speed commands are ignored. """
+
+    def close(self):
+        self.file.close()
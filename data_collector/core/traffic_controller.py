@@ -1,11 +1,12 @@
-import traci
+from . import sumo_backend
 
 class TrafficController:
     """ Controls traffic lights in the SUMO simulation. """
-    def __init__(self, logger):
+    def __init__(self, logger, sumo):
         self.logger = logger
+        self.sumo = sumo
         # Retrieve the list of all traffic lights
-        self.traffic_lights = traci.trafficlight.getIDList()
+        self.traffic_lights = self.sumo.trafficlight.getIDList()
         self.logger.log(f"Detected Traffic Lights: {self.traffic_lights}", "INFO", "yellow",
                         class_name="TrafficController", function_name="__init__")
 
@@ -16,14 +17,14 @@ class TrafficController:
             for tl_id in self.traffic_lights:
                 try:
                     # Get the current phase and switch to the next one
-                    current_phase = traci.trafficlight.getPhase(tl_id)
+                    current_phase = self.sumo.trafficlight.getPhase(tl_id)
                     new_phase = (current_phase + 1) % 4
-                    traci.trafficlight.setPhase(tl_id, new_phase)
+                    self.sumo.trafficlight.setPhase(tl_id, new_phase)
 
                     # Log the phase change
                     self.logger.log(f"🚦 Traffic light {tl_id} changed to phase {new_phase}", "INFO", "cyan",
                                     class_name="TrafficController", function_name="update_traffic_light")
 
-                except traci.TraCIException as e:
+                except sumo_backend.SUMO_ERRORS as e:
                     self.logger.log(f"⚠️ Error updating traffic light {tl_id}: {e}", "ERROR", "red",
                                     class_name="TrafficController", function_name="update_traffic_light")
@@ -1,25 +1,28 @@
-import traci
 import random
+from . import sumo_backend
 
 class VehicleController:
     """ Controls vehicles in the SUMO simulation. """
-    def __init__(self, logger):
+    def __init__(self, logger, sumo, vehicle_state, step_state):
         self.logger = logger
+        self.sumo = sumo
+        self.vehicle_state = vehicle_state
+        self.step_state = step_state
         self.fastest_vehicle = None
         self.fastest_speed = 0
         self.fastest_step = 0
 
     def get_active_vehicles(self):
         """ Retrieves the list of all active vehicles in the simulation. """
-        return traci.vehicle.getIDList()
+        return self.vehicle_state.get_vehicle_ids()
 
     def update_vehicle_speed(self, vehicle_id, speed):
         """ Updates the speed of a specific vehicle. """
         try:
-            traci.vehicle.setSpeed(vehicle_id, speed)
+            self.sumo.vehicle.setSpeed(vehicle_id, speed)
             self.logger.log(f"🚗 Vehicle {vehicle_id} speed set to {speed} m/s", "INFO", "blue",
                             class_name="VehicleController", function_name="update_vehicle_speed")
-        except traci.TraCIException:
+        except sumo_backend.SUMO_ERRORS:
             self.logger.log(f"⚠️ Error: Unable to update speed for vehicle {vehicle_id}", "ERROR", "red",
                             class_name="VehicleController", function_name="update_vehicle_speed")
 
@@ -27,37 +30,31 @@ class VehicleController:
         """ Moves vehicle to another lane after 50 steps. """
         if vehicle_id and step == 50:
             try:
-                traci.vehicle.changeLane(vehicle_id, 1, 5)
+                self.sumo.vehicle.changeLane(vehicle_id, 1, 5)
                 self.logger.log(f"🔄 Vehicle {vehicle_id} changed to lane 1", "INFO", "magenta",
                                 class_name="VehicleController", function_name="change_vehicle_lane")
-            except traci.TraCIException:
+            except sumo_backend.SUMO_ERRORS:
                 self.logger.log(f"⚠️ Error: Unable to change lane for vehicle {vehicle_id}", "ERROR", "red",
                                 class_name="VehicleController", function_name="change_vehicle_lane")
 
     def log_vehicle_info(self):
         """ Logs detailed vehicle info. """
-        vehicles = traci.vehicle.getIDList()
-        if vehicles:
-            for v_id in vehicles:
-                position = traci.vehicle.getPosition(v_id)
-                speed = traci.vehicle.getSpeed(v_id)
-                lane = traci.vehicle.getLaneIndex(v_id)
-                self.logger.log(f"🚙 Vehicle {v_id}: Position ({position[0]:.3f}, {position[1]:.3f}), Speed {speed:.3f} m/s, Lane {lane}", "INFO",
-                                class_name="VehicleController", function_name="log_vehicle_info")
+        state = self.step_state
+        if state.size:
+            if not self.logger.is_enabled("INFO"):
+                return
+            # one bulk conversion per column instead of one dict lookup per vehicle and variable
+            for v_id, (x, y), speed, lane in zip(state.vehicle_ids, state.positions.tolist(), state.speeds.tolist(), state.lanes.tolist()):
+                self.logger.log("🚙 Vehicle %s: Position (%.3f, %.3f), Speed %.3f m/s, Lane %d", "INFO",
+                                class_name="VehicleController", function_name="log_vehicle_info",
+                                args=(v_id, x, y, speed, lane))
         else:
             self.logger.log("⚠️ No vehicles detected in the simulation!", "WARNING", "red",
                             class_name="VehicleController", function_name="log_vehicle_info")
 
     def track_fastest_vehicle(self, step):
         """ Tracks the fastest vehicle in the simulation for each step. """
-        vehicles = self.get_active_vehicles()
-        current_fastest_vehicle = None
-        current_fastest_speed = 0
-        for v_id in vehicles:
-            speed = traci.vehicle.getSpeed(v_id)
-            if speed > current_fastest_speed:
-                current_fastest_speed = speed
-                current_fastest_vehicle = v_id
+        current_fastest_vehicle, current_fastest_speed = self.step_state.get_fastest_vehicle()
 
         # Check if this step has a faster vehicle than previously recorded
         if current_fastest_speed > self.fastest_speed:
@@ -67,4 +64,4 @@ class VehicleController:
 
     def get_fastest_vehicle_summary(self):
         """ Returns the summary of the fastest vehicle recorded. """
-        return self.fastest_vehicle, self.fastest_speed, self.fastest_step
\ No newline at end of file
+        return self.fastest_vehicle, self.fastest_speed, self.fastest_step
@@ -0,0 +1,79 @@
+import traci.constants as tc
+from . import sumo_backend
+
+class VehicleStateCache:
+    """ Keeps a subscription-backed snapshot of every active vehicle, refreshed once per simulation step. """
+
+    # Variables every controller and plugin may read from the snapshot
+    DEFAULT_VARIABLES = (
+        tc.VAR_POSITION,
+        tc.VAR_SPEED,
+        tc.VAR_LANE_INDEX,
+        tc.VAR_ROAD_ID,
+        tc.VAR_LANEPOSITION,
+        tc.VAR_ROUTE_ID,
+        tc.VAR_ROUTE_INDEX,
+    )
+
+    def __init__(self, logger, sumo, variables=DEFAULT_VARIABLES):
+        self.logger = logger
+        self.sumo = sumo
+        self.variables = tuple(variables)
+        self.subscribed = set()
+        self.snapshot = {}
+        self.departed = ()
+        self.arrived = ()
+
+    def require(self, variables):
+        """ Adds variables to the subscription (e.g. the ones declared by plugins). Call before start(). """
+        self.variables = tuple(dict.fromkeys(self.variables + tuple(variables)))
+
+    def start(self):
+        """ Subscribes the departure/arrival lists and every vehicle that is already on the road. """
+        self.sumo.simulation.subscribe((tc.VAR_DEPARTED_VEHICLES_IDS, tc.VAR_ARRIVED_VEHICLES_IDS))
+        for v_id in self.sumo.vehicle.getIDList():
+            self.subscribe_vehicle(v_id)
+        self.snapshot = self.sumo.vehicle.getAllSubscriptionResults()
+        self.logger.log(f"📡 Vehicle state subscriptions started for {len(self.subscribed)} vehicles", "INFO", "cyan",
+                        class_name="VehicleStateCache", function_name="start")
+
+    def subscribe_vehicle(self, vehicle_id):
+        """ Subscribes a single vehicle to the tracked state variables. """
+        try:
+            self.sumo.vehicle.subscribe(vehicle_id, self.variables)
+            self.subscribed.add(vehicle_id)
+        except sumo_backend.SUMO_ERRORS:
+            self.logger.log(f"⚠️ Error: Unable to subscribe vehicle {vehicle_id}", "ERROR", "red",
+                            class_name="VehicleStateCache", function_name="subscribe_vehicle")
+
+    def refresh(self):
+        """
+        Updates the subscriptions after a simulation step and returns the new snapshot.
+
+        The departure/arrival lists arrive with the step response itself, so the only extra
+        round-trips are one subscribe call per newly departed vehicle.
+        The returned dict is owned by TraCI and is only valid until the next simulation step.
+        """
+        results = self.sumo.simulation.getSubscriptionResults()
+        self.departed = results.get(tc.VAR_DEPARTED_VEHICLES_IDS, ())
+        self.arrived = results.get(tc.VAR_ARRIVED_VEHICLES_IDS, ())
+
+        # SUMO drops the subscription of an arrived vehicle itself, only the local bookkeeping is left
+        for v_id in self.arrived:
+            self.subscribed.discard(v_id)
+
+        arrived = set(self.arrived)
+        for v_id in self.departed:
+            if v_id not in arrived:
+                self.subscribe_vehicle(v_id)
+
+        self.snapshot = self.sumo.vehicle.getAllSubscriptionResults()
+        return self.snapshot
+
+    def get_vehicle_ids(self):
+        """ Returns the IDs of all vehicles present in the current snapshot. """
+        return tuple(self.snapshot)
+
+    def get_vehicle_count(self):
+        """ Returns the number of vehicles present in the current snapshot. """
+        return len(self.snapshot)
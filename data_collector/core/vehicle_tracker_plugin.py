@@ -1,7 +1,8 @@
-from abc import ABC, abstractmethod
+from abc import abstractmethod
+from .plugin_scheduler import StepPlugin
 
-class VehicleTrackerPlugin(ABC):
-    """ Abstract base class for vehicle tracking plugins. """
+class VehicleTrackerPlugin(StepPlugin):
+    """ Abstract base class for vehicle tracking plugins, run by the PluginScheduler every step by default. """
 
     @abstractmethod
     def track_vehicle(self, step):
@@ -12,3 +13,6 @@ class VehicleTrackerPlugin(ABC):
     def get_summary(self):
         """ Returns a summary of the tracked vehicle's journey. """
         pass
+
+    def run(self, context):
+        self.track_vehicle(context.step)
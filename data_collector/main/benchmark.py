@@ -0,0 +1,27 @@
+import sys
+import argparse
+from core.benchmark import BenchmarkSuite, DEFAULT_CASES
+
+# Usage (from data_collector/): python -m main.benchmark [--cases grid_bare study_eta] [--baseline main/benchmark_baseline.json]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the 3x3 grid and StudyArea simulations headless.")
+    parser.add_argument("--cases", nargs="*", help="Names of the cases to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case, the median is reported")
+    parser.add_argument("--backend", default="traci", choices=("traci", "libsumo"))
+    parser.add_argument("--output", default="main/benchmark_results.json", help="Where the results are written")
+    parser.add_argument("--baseline", help="Results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change counted as a regression")
+    args = parser.parse_args()
+
+    cases = [case for case in DEFAULT_CASES if not args.cases or case["name"] in args.cases]
+    document = BenchmarkSuite(cases, repeat=args.repeat, backend=args.backend).run()
+    BenchmarkSuite.save(document, args.output)
+    print(f"📊 Benchmark results written to {args.output}")
+
+    if args.baseline:
+        regressions = BenchmarkSuite.compare(document, BenchmarkSuite.load(args.baseline), args.threshold)
+        for name, metric, before, after, change in regressions:
+            print(f"❌ {name}: {metric} {before:.2f} -> {after:.2f} ({change:+.1%})")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.threshold:.0%} against {args.baseline}")
@@ -0,0 +1,54 @@
+import os
+import sys
+import json
+import time
+import shutil
+import resource
+import tempfile
+from core.simulation_runner import SimulationRunner
+from core.mock_backend import SyntheticTrace
+
+# Runs one benchmark case of the 3x3 grid and prints its measurements as a JSON line (see core/benchmark.py)
+if __name__ == "__main__":
+    case = json.loads(sys.argv[1])
+    output_dir = tempfile.mkdtemp(prefix="benchmark_")
+    try:
+        trace = None
+        if case.get("backend") == "mock":
+            trace = SyntheticTrace(num_vehicles=case.get("vehicles", 1000), grid_size=case.get("grid_size", 30),
+                                   depart_rate=case.get("depart_rate"), seed=case.get("seed") or 0)
+
+        started = time.perf_counter()
+        simulation = SimulationRunner(
+            0, case["steps"],
+            log_level="INFO" if case.get("logging", True) else "CRITICAL",
+            node_log_level="INFO" if case.get("node_logging", True) else "CRITICAL",
+            graph_export_interval=10 if case.get("graph_export", True) else 0,
+            backend=case.get("backend", "traci"),
+            run_mode="headless",
+            seed=case.get("seed"),
+            profile=True,
+            log_dir=output_dir,
+            graph_dir=output_dir,
+            trace=trace,
+        )
+        setup_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        simulation.run_simulation()
+        run_time = time.perf_counter() - started
+
+        profile = simulation.profiler.get_summary()
+        log_bytes = sum(os.path.getsize(os.path.join(output_dir, name)) for name in os.listdir(output_dir) if name.endswith(".log"))
+        print(json.dumps({
+            "steps": profile["steps"],
+            "setup_time": setup_time,
+            "run_time": run_time,
+            "steps_per_sec": profile["steps"] / run_time if run_time else 0.0,
+            "calls_per_step": profile["calls_per_step"],
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "children_peak_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+            "log_bytes": log_bytes,
+        }))
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
@@ -0,0 +1,40 @@
+import os
+import argparse
+import time
+from core.demand_generator import DemandGenerator, DEPARTURE_PROFILES, OD_DISTRIBUTIONS, write_sumo_config
+
+# Networks of the two simulations, by name (paths from data_collector/)
+NETWORKS = {
+    "grid": "sumo_config/my_3x3_simulation.sumocfg",
+    "study": "../sumo_running_simulation/sumo_config/StudyArea.sumocfg",
+}
+
+# Usage (from data_collector/): python -m main.generate_demand grid --vehicles 10000 [--profile peak] [--od fringe] [--seed 1]
+# Writes <network>_<vehicles>.rou.xml and a .sumocfg loading it next to the network's configuration,
+# run it with SimulationRunner(sumo_config=...) in either package.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic demand for the 3x3 grid or StudyArea network.")
+    parser.add_argument("network", help=f"Network name ({', '.join(NETWORKS)}) or path of a .sumocfg configuration")
+    parser.add_argument("--vehicles", type=int, default=1000, help="Number of vehicles")
+    parser.add_argument("--begin", type=float, default=0.0, help="First departure time (s)")
+    parser.add_argument("--end", type=float, default=3600.0, help="Last departure time (s)")
+    parser.add_argument("--profile", default="uniform", choices=DEPARTURE_PROFILES, help="Departure profile")
+    parser.add_argument("--od", default="uniform", choices=OD_DISTRIBUTIONS, help="Origin-destination distribution")
+    parser.add_argument("--seed", type=int, default=None, help="Seed, the same seed writes the same file")
+    parser.add_argument("--output", help="Route file to write (default: next to the configuration)")
+    args = parser.parse_args()
+
+    source_config = NETWORKS.get(args.network, args.network)
+    name = args.network if args.network in NETWORKS else os.path.splitext(os.path.basename(source_config))[0]
+    route_path = args.output or os.path.join(os.path.dirname(source_config), f"synthetic_{name}_{args.vehicles}.rou.xml")
+    config_path = os.path.splitext(os.path.splitext(route_path)[0])[0] + ".sumocfg"
+
+    started = time.perf_counter()
+    generator = DemandGenerator(source_config, vehicles=args.vehicles, begin=args.begin, end=args.end,
+                                departure_profile=args.profile, od_distribution=args.od, seed=args.seed)
+    written = generator.write(route_path)
+    # let the simulation run until well after the last departure
+    write_sumo_config(source_config, route_path, config_path, end=max(args.end * 2, args.end + 3600))
+    print(f"🚗 {written['vehicles']} vehicles on {written['routes']} distinct routes written to {route_path} "
+          f"in {time.perf_counter() - started:.1f} s")
+    print(f"⚙️ Configuration written to {config_path}")
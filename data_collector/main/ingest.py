@@ -0,0 +1,16 @@
+import argparse
+from core.log_ingest import ingest_logs
+
+# Usage (from data_collector/): python -m main.ingest main/simulation_log.log main/nodes_log.log [--output-dir main/tables]
+# Load the result with core.log_ingest.load_ingested("main/tables/simulation_log")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert simulation, nodes and ETA text logs into columnar tables.")
+    parser.add_argument("logs", nargs="+", help="Log files to convert, each into its own table directory")
+    parser.add_argument("--output-dir", default="main/tables", help="Directory receiving one table directory per log file")
+    parser.add_argument("--workers", type=int, help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument("--format", default="auto", choices=("auto", "npz", "parquet"), help="Chunk file format")
+    args = parser.parse_args()
+
+    for summary in ingest_logs(args.logs, args.output_dir, max_workers=args.workers, file_format=args.format):
+        rows = ", ".join(f"{table}: {count}" for table, count in summary["rows"].items() if count)
+        print(f"📥 {summary['source']} -> {summary['output_dir']} ({summary['bytes'] / 1e6:.1f} MB in {summary['wall_time']:.2f} s) {rows or 'no rows'}")
@@ -1,7 +1,15 @@
 from core.simulation_runner import SimulationRunner
 
 if __name__ == "__main__":
-    delay = 0 # Add delay to slow down the simulation speed for better visualization
+    delay = 0 # Add delay to slow down the simulation speed for better visualization (gui/realtime modes only)
     num_of_steps = 100
-    simulation = SimulationRunner(delay, num_of_steps)
+    run_mode = "headless" # "headless" (max speed, no GUI/console), "gui" (sumo-gui) or "realtime" (paced to wall-clock time)
+    profile = False # True to log per-phase step times and SUMO calls per step at the end of the run
+    nodes_log_mode = "full" # "delta" writes the junction topology once and then only the per-step changes to nodes_log.log
+    publish_address = None # e.g. "127.0.0.1:8765" to stream live step frames to subscribers (python -m main.subscribe 127.0.0.1:8765)
+    publish_wait_for = 0 # subscribers to wait for before the first step, so they receive the run from step 0
+    history_memory = None # e.g. 64 * 1024 ** 2 to keep 64 MB of rolling per-step history that plugins can query as context.history
+    simulation = SimulationRunner(delay, num_of_steps, run_mode=run_mode, profile=profile, nodes_log_mode=nodes_log_mode,
+                                  publish_address=publish_address, publish_wait_for=publish_wait_for,
+                                  history_memory=history_memory)
     simulation.run_simulation()
@@ -0,0 +1,23 @@
+import argparse
+from core.simulation_runner import SimulationRunner
+from core.trace_replay import ReplayTrace
+
+# Usage (from data_collector/): python -m main.replay main/run.trace [--start 500] [--steps 200]
+# Record the trace first with SimulationRunner(..., record_path="main/run.trace")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded simulation trace through the controllers, without SUMO.")
+    parser.add_argument("trace", help="Trace file written by the recorder")
+    parser.add_argument("--start", type=int, help="First recorded step to replay (default: the first one)")
+    parser.add_argument("--steps", type=int, help="Number of steps to replay (default: up to the end of the trace)")
+    parser.add_argument("--log-dir", default="main/replay", help="Directory receiving the replay logs")
+    parser.add_argument("--graph-export-interval", type=int, default=0, help="Steps between network graph exports (0 disables)")
+    args = parser.parse_args()
+
+    trace = ReplayTrace(args.trace, args.start)
+    available = trace.last_step - trace.current_step
+    num_of_steps = min(args.steps, available) if args.steps else available
+    print(f"⏯️ Replaying steps {trace.current_step + 1}-{trace.current_step + num_of_steps} of {args.trace}")
+    simulation = SimulationRunner(0, num_of_steps, backend="mock", trace=trace, run_mode="headless",
+                                  log_dir=args.log_dir, graph_dir=args.log_dir, graph_export_interval=args.graph_export_interval)
+    simulation.run_simulation()
+    trace.close()
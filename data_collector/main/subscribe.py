@@ -0,0 +1,44 @@
+import argparse
+import time
+from core.telemetry_publisher import TelemetrySubscriber, DELIVERY_MODES
+
+# Usage (from data_collector/): python -m main.subscribe 127.0.0.1:8765 [--mode lossless] [--delay 0.05]
+# Start the run with SimulationRunner(..., publish_address="127.0.0.1:8765") (publish_address in main/main.py),
+# with publish_wait_for=1 the run waits for this subscriber and it receives every frame from step 0
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the live state frames published by a running simulation.")
+    parser.add_argument("address", help="Address the simulation publishes on (host:port or Unix socket path)")
+    parser.add_argument("--mode", default="conflate", choices=DELIVERY_MODES, help="Latest frame only, or every frame")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds spent per frame, to simulate a slow consumer")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait for the simulation to start")
+    args = parser.parse_args()
+
+    # the subscriber may be started before the simulation, retry until the publisher listens
+    deadline = time.monotonic() + args.timeout
+    while True:
+        try:
+            subscriber = TelemetrySubscriber(args.address, args.mode)
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.005)
+    print(f"📡 Subscribed to {args.address} ({subscriber.mode}), {len(subscriber.junction_ids)} junctions")
+
+    frames = 0
+    skipped = 0
+    last_step = None
+    for frame in subscriber.frames():
+        if last_step is not None:
+            skipped += frame["step"] - last_step - 1
+        last_step = frame["step"]
+        frames += 1
+        mean_speed = frame["speed"].mean() if len(frame["speed"]) else 0.0
+        busiest = int(frame["vehicle_count"].argmax()) if len(frame["vehicle_count"]) else None
+        busiest_text = f"{subscriber.junction_ids[busiest]} ({frame['vehicle_count'][busiest]})" if busiest is not None else "-"
+        print(f"🔹 Step {frame['step']}: {len(frame['vehicle_ids'])} vehicles, mean speed {mean_speed:.2f} m/s, "
+              f"busiest junction {busiest_text}")
+        if args.delay:
+            time.sleep(args.delay)
+    subscriber.close()
+    print(f"✅ Received {frames} frames, {skipped} steps skipped by conflation")
@@ -0,0 +1,116 @@
+import time
+import threading
+from types import SimpleNamespace
+import numpy as np
+from core.id_table import IdTable
+from core.telemetry_publisher import TelemetryPublisher, TelemetrySubscriber
+
+# Usage (from data_collector/): python -m pytest -q tests
+
+JUNCTION_IDS = ("J0", "J1", "J2")
+
+
+class FakeStepState:
+    """ Step state with a few vehicles whose positions change every step, without SUMO. """
+
+    def __init__(self, vehicles=5):
+        self.vehicle_table = IdTable(f"veh_{index}" for index in range(vehicles))
+        self.size = vehicles
+        self.vehicles = np.arange(vehicles, dtype=np.int64)
+        self.positions = np.zeros((vehicles, 2))
+        self.speeds = np.ones(vehicles)
+        self.lanes = np.zeros(vehicles, dtype=np.int32)
+
+    def load(self, step):
+        self.positions[:, 0] = step
+
+
+def create_publisher(address):
+    junction_controller = SimpleNamespace(proximity=SimpleNamespace(junction_ids=JUNCTION_IDS),
+                                          topology=SimpleNamespace(has_traffic_light=lambda junction_id: False),
+                                          sumo=SimpleNamespace(trafficlight=None),
+                                          junction_vehicle_counts=np.zeros(len(JUNCTION_IDS), dtype=np.int64))
+    return TelemetryPublisher(address, junction_controller, FakeStepState())
+
+
+def connect(address, mode, timeout=10.0):
+    """ Connects a subscriber, retrying until the publisher listens. """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return TelemetrySubscriber(address, mode)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.005)
+
+
+def test_published_frames_counts_steps_without_subscribers(tmp_path):
+    publisher = create_publisher(str(tmp_path / "telemetry.sock"))
+    publisher.start()
+    for step in range(5):
+        publisher.publish(step)
+    publisher.close()
+    assert publisher.published_frames == 5
+
+
+def test_awaited_lossless_subscriber_receives_every_frame(tmp_path):
+    address = str(tmp_path / "telemetry.sock")
+    received = []
+
+    def consume():
+        subscriber = connect(address, "lossless")
+        received.extend(frame["step"] for frame in subscriber.frames())
+        subscriber.close()
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    publisher = create_publisher(address)
+    try:
+        publisher.start(wait_for=1, timeout=10.0)
+        for step in range(200):
+            publisher.step_state.load(step)
+            publisher.publish(step)
+    finally:
+        publisher.close()
+        consumer.join(timeout=10.0)
+
+    assert received == list(range(200))
+    assert publisher.published_frames == 200
+
+
+def test_slow_conflate_subscriber_stays_current(tmp_path):
+    address = str(tmp_path / "telemetry.sock")
+    published_step = [-1]
+    lags = []
+    steps = []
+    positions = []
+
+    def consume():
+        subscriber = connect(address, "conflate")
+        for frame in subscriber.frames():
+            lags.append(published_step[0] - frame["step"])
+            steps.append(frame["step"])
+            positions.append(frame["x"][0])
+            time.sleep(0.02)  # a slow dashboard
+        subscriber.close()
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    publisher = create_publisher(address)
+    try:
+        publisher.start(wait_for=1, timeout=10.0)
+        for step in range(600):
+            publisher.step_state.load(step)
+            published_step[0] = step
+            publisher.publish(step)
+            time.sleep(0.002)
+    finally:
+        publisher.close()
+        consumer.join(timeout=10.0)
+
+    # frames are skipped rather than queued, so what the subscriber shows is never more than a few steps old
+    assert len(steps) < 600
+    assert steps == sorted(steps)
+    assert positions == steps
+    assert max(lags) <= 5, max(lags)
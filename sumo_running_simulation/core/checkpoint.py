@@ -0,0 +1,86 @@
+import os
+import json
+import pickle
+
+class CheckpointManager:
+    """
+    Saves and restores checkpoints of a run: the SUMO state (saveState/loadState) plus a pickle of the
+    Python-side state (trackers, counters, random generator) handed in by the runner.
+
+    Checkpoint <name> is stored as <name>.xml.gz (SUMO) and <name>.pkl (Python) in the checkpoint
+    directory, and latest.json points to the most recent complete one, so a crashed run can resume from it.
+    SUMO does not restore every internal timer (e.g. of traffic lights switched through TraCI), so a resumed
+    run matches the original in its state at the checkpoint but may drift from it afterwards.
+    """
+
+    def __init__(self, logger, sumo, checkpoint_dir, interval=None, steps=()):
+        """
+        :param checkpoint_dir: Directory receiving the checkpoint files.
+        :param interval: Steps between automatic checkpoints (None disables them).
+        :param steps: Additional steps after which a checkpoint is saved (e.g. the end of the warm-up).
+        """
+        self.logger = logger
+        self.sumo = sumo
+        self.checkpoint_dir = checkpoint_dir
+        self.interval = interval
+        self.steps = frozenset(steps)
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def get_paths(self, name):
+        """ Returns the (SUMO state, Python state) file paths of a checkpoint. """
+        base = os.path.join(self.checkpoint_dir, name)
+        return f"{base}.xml.gz", f"{base}.pkl"
+
+    def should_save(self, step):
+        """ Returns whether a checkpoint is due after the given step. """
+        return step in self.steps or bool(self.interval and (step + 1) % self.interval == 0)
+
+    def save(self, step, state, name=None):
+        """
+        Saves a checkpoint after a completed step.
+
+        :param state: Picklable Python-side state of the run.
+        :param name: Name of the checkpoint (default: step_<step>).
+        """
+        name = name or f"step_{step}"
+        sumo_path, state_path = self.get_paths(name)
+        self.sumo.simulation.saveState(sumo_path)
+        # the Python state and the latest pointer are replaced atomically, a crash mid-save keeps the previous checkpoint
+        with open(state_path + ".tmp", "wb") as state_file:
+            pickle.dump({"step": step, "state": state}, state_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(state_path + ".tmp", state_path)
+        latest_path = os.path.join(self.checkpoint_dir, "latest.json")
+        with open(latest_path + ".tmp", "w", encoding="utf-8") as latest_file:
+            json.dump({"name": name, "step": step}, latest_file)
+        os.replace(latest_path + ".tmp", latest_path)
+        self.logger.log(f"💾 Checkpoint {name} saved after step {step}", "INFO", "cyan",
+                        class_name="CheckpointManager", function_name="save")
+
+    def get_latest(self):
+        """ Returns the name of the most recent checkpoint, or None if none was saved. """
+        latest_path = os.path.join(self.checkpoint_dir, "latest.json")
+        if not os.path.exists(latest_path):
+            return None
+        with open(latest_path, encoding="utf-8") as latest_file:
+            return json.load(latest_file)["name"]
+
+    def load(self, name="latest"):
+        """
+        Loads a checkpoint into the running simulation.
+
+        Vehicle subscriptions are not part of the SUMO state, the caller has to subscribe again afterwards.
+
+        :param name: Name of the checkpoint, or "latest" for the most recent one.
+        :return: (step the checkpoint was saved after, Python-side state)
+        """
+        if name == "latest":
+            name = self.get_latest()
+            if name is None:
+                raise FileNotFoundError(f"No checkpoint found in {self.checkpoint_dir}")
+        sumo_path, state_path = self.get_paths(name)
+        with open(state_path, "rb") as state_file:
+            checkpoint = pickle.load(state_file)
+        self.sumo.simulation.loadState(sumo_path)
+        self.logger.log(f"📂 Checkpoint {name} loaded, resuming after step {checkpoint['step']}", "INFO", "cyan",
+                        class_name="CheckpointManager", function_name="load")
+        return checkpoint["step"], checkpoint["state"]
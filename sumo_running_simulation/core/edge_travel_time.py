@@ -0,0 +1,106 @@
+from array import array
+import traci.constants as tc
+
+# "travel_time": sum of learned per-edge travel times over the remaining route
+# "speed": remaining driving distance divided by the current speed
+ETA_PREDICTORS = ("travel_time", "speed")
+
+class EdgeTravelTimeModel:
+    """
+    Learns the travel time of every edge from the traffic itself and predicts ETAs from it.
+
+    Each edge's estimate starts at its free-flow time (length / speed limit) and follows an
+    exponentially weighted moving average (EWMA) of the observed traversals. The estimates live
+    in a dense array indexed by edge, so a prediction is a sum over the remaining route edges.
+    """
+
+    def __init__(self, logger, sumo, vehicle_state, alpha=0.2):
+        """
+        :param alpha: Weight of the newest traversal in the moving average (0-1).
+        """
+        self.logger = logger
+        self.sumo = sumo
+        self.vehicle_state = vehicle_state
+        self.alpha = alpha
+        self.step_length = self.sumo.simulation.getDeltaT()
+
+        # dense per-edge tables, internal (junction) edges are left out - their time counts towards the edge before them
+        self.edge_index = {}
+        self.edge_lengths = array("d")
+        self.travel_times = array("d")
+        self.traversals = array("l")
+        for edge_id in self.sumo.edge.getIDList():
+            if edge_id.startswith(":"):
+                continue
+            length = self.sumo.lane.getLength(f"{edge_id}_0")
+            max_speed = self.sumo.lane.getMaxSpeed(f"{edge_id}_0")
+            self.edge_index[edge_id] = len(self.edge_lengths)
+            self.edge_lengths.append(length)
+            self.travel_times.append(length / max_speed if max_speed > 0 else 0.0)
+            self.traversals.append(0)
+
+        self.routes = {}  # route ID -> edge indices of the route
+        self.current_edges = {}  # vehicle ID -> (edge index, step the edge was entered or None if entered mid-way)
+
+        self.logger.log(f"📈 Edge travel time model initialized for {len(self.edge_index)} edges (alpha={alpha})", "INFO", "cyan",
+                        class_name="EdgeTravelTimeModel", function_name="__init__")
+
+    def get_route(self, route_id):
+        """ Returns the edge indices of a route, querying SUMO only once per route. """
+        route = self.routes.get(route_id)
+        if route is None:
+            route = tuple(self.edge_index[edge] for edge in self.sumo.route.getEdges(route_id))
+            self.routes[route_id] = route
+        return route
+
+    def update(self, step):
+        """ Observes every vehicle that entered a new edge during the last step. Call once per step after the vehicle state refresh. """
+        for vehicle_id in self.vehicle_state.arrived:
+            # the last edge ends at the arrival position, not at the end of the edge - it is not observed
+            self.current_edges.pop(vehicle_id, None)
+
+        for vehicle_id, state in self.vehicle_state.snapshot.items():
+            index = self.edge_index.get(state[tc.VAR_ROAD_ID])
+            if index is None:
+                continue
+            current = self.current_edges.get(vehicle_id)
+            if current is None:
+                # the first edge is entered mid-way at departure - it is not observed
+                self.current_edges[vehicle_id] = (index, None)
+            elif current[0] != index:
+                if current[1] is not None:
+                    self.observe(current[0], (step - current[1]) * self.step_length)
+                self.current_edges[vehicle_id] = (index, step)
+
+    def observe(self, edge_index, travel_time):
+        """ Folds one observed traversal (seconds) into the edge's moving average. """
+        self.travel_times[edge_index] += self.alpha * (travel_time - self.travel_times[edge_index])
+        self.traversals[edge_index] += 1
+
+    def predict_eta(self, state):
+        """ Returns the predicted time (seconds) until a vehicle reaches the end of its route, from its snapshot state. """
+        route = self.get_route(state[tc.VAR_ROUTE_ID])
+        route_index = state[tc.VAR_ROUTE_INDEX]
+        eta = 0.0
+        if not state[tc.VAR_ROAD_ID].startswith(":"):
+            # remaining share of the current edge
+            edge = route[route_index]
+            eta = self.travel_times[edge] * max(1.0 - state[tc.VAR_LANEPOSITION] / self.edge_lengths[edge], 0.0)
+        for edge in route[route_index + 1:]:
+            eta += self.travel_times[edge]
+        return eta
+
+    def get_state(self):
+        """ Returns the learned travel times and the vehicles on their current edge, for checkpoints. """
+        return {"travel_times": self.travel_times, "traversals": self.traversals, "current_edges": self.current_edges}
+
+    def set_state(self, state):
+        """ Restores the state saved by get_state(). """
+        self.travel_times = array("d", state["travel_times"])
+        self.traversals = array("l", state["traversals"])
+        self.current_edges = state["current_edges"]
+
+    def get_summary(self):
+        """ Returns the summary of what the model has learned. """
+        observed_edges = sum(1 for count in self.traversals if count)
+        return f"Edge travel time model: {sum(self.traversals)} traversals observed on {observed_edges}/{len(self.traversals)} edges."
@@ -0,0 +1,165 @@
+import csv
+import fnmatch
+import traci.constants as tc
+from . import sumo_backend
+from .eta_vehicle_tracker import MIN_ETA_SPEED
+
+# Columns of the per-step ETA table, in order
+ETA_TABLE_COLUMNS = ("step", "vehicle", "road", "route_index", "distance_remaining", "speed", "eta")
+
+class ETAEngine:
+    """
+    Tracks the estimated time of arrival (ETA) of many vehicles at once.
+
+    Remaining distances come from the subscribed route index and lane position plus cached
+    cumulative distances per route, so no distance query is sent per vehicle per step.
+    """
+
+    def __init__(self, eta_logger, sumo, vehicle_state, vehicle_ids=None, pattern=None, table_path=None, travel_time_model=None):
+        """
+        :param vehicle_ids: IDs of the vehicles to track.
+        :param pattern: Shell-style pattern (e.g. "flow_4*") - every departing vehicle matching it is tracked as well.
+        :param table_path: CSV file receiving one row per tracked vehicle per step (optional).
+        :param travel_time_model: EdgeTravelTimeModel predicting the ETA from learned edge travel times.
+                                  Without it the ETA is the remaining driving distance divided by the current speed.
+        """
+        self.logger = eta_logger
+        self.sumo = sumo
+        self.vehicle_state = vehicle_state
+        self.travel_time_model = travel_time_model
+        self.vehicle_ids = set(vehicle_ids or ())
+        self.pattern = pattern
+        self.tracked = set()
+        self.step_length = self.sumo.simulation.getDeltaT()
+
+        self.edge_lengths = {}  # edge ID -> length (m)
+        self.routes = {}  # route ID -> (edges, cumulative distance before each edge, total distance)
+
+        self.predictions = {}  # vehicle ID -> [(step, ETA in seconds)], until the vehicle arrives
+        self.eta_errors = {}  # vehicle ID -> mean absolute ETA error (s) of arrived vehicles
+
+        self.table_file = open(table_path, "w", newline="", encoding="utf-8") if table_path else None
+        self.table_writer = csv.writer(self.table_file) if self.table_file else None
+        if self.table_writer:
+            self.table_writer.writerow(ETA_TABLE_COLUMNS)
+
+        self.logger.log(f"Tracking ETA of vehicles {sorted(self.vehicle_ids)} and pattern {self.pattern}.", "INFO", "cyan",
+                        class_name="ETAEngine", function_name="__init__")
+
+    def is_tracked_id(self, vehicle_id):
+        """ Returns whether a vehicle ID is selected by the ID set or the pattern. """
+        return vehicle_id in self.vehicle_ids or (self.pattern is not None and fnmatch.fnmatchcase(vehicle_id, self.pattern))
+
+    def get_route(self, route_id):
+        """ Returns (edges, cumulative distance before each edge, total distance) of a route, querying SUMO only once per route. """
+        route = self.routes.get(route_id)
+        if route is None:
+            edges = self.sumo.route.getEdges(route_id)
+            destination, destination_length = edges[-1], self.get_edge_length(edges[-1])
+            # driving distances include the internal lanes through junctions, plain edge lengths would not
+            remaining = [self.sumo.simulation.getDistanceRoad(edge, 0, destination, destination_length, True) for edge in edges]
+            total = remaining[0]
+            route = (edges, [total - distance for distance in remaining], total)
+            self.routes[route_id] = route
+        return route
+
+    def get_edge_length(self, edge_id):
+        """ Returns the length of an edge (its first lane), querying SUMO only once per edge. """
+        length = self.edge_lengths.get(edge_id)
+        if length is None:
+            length = self.sumo.lane.getLength(f"{edge_id}_0")
+            self.edge_lengths[edge_id] = length
+        return length
+
+    def get_distance_remaining(self, state):
+        """ Returns the driving distance (m) left until the end of the vehicle's route. """
+        _, cumulative, total = self.get_route(state[tc.VAR_ROUTE_ID])
+        route_index = state[tc.VAR_ROUTE_INDEX]
+        if state[tc.VAR_ROAD_ID].startswith(":"):
+            # inside a junction: the route index still points at the edge just left
+            return max(total - cumulative[route_index + 1], 0.0) if route_index + 1 < len(cumulative) else 0.0
+        return max(total - cumulative[route_index] - state[tc.VAR_LANEPOSITION], 0.0)
+
+    def start(self):
+        """ Starts tracking the matching vehicles that are already on the road. Call after the vehicle state has started. """
+        self.tracked.update(v_id for v_id in self.vehicle_state.snapshot if self.is_tracked_id(v_id))
+
+    def update(self, step):
+        """ Computes the ETA of every tracked vehicle on the road and appends them to the ETA table. """
+        for vehicle_id in self.vehicle_state.departed:
+            if self.is_tracked_id(vehicle_id):
+                self.tracked.add(vehicle_id)
+
+        for vehicle_id in self.vehicle_state.arrived:
+            if vehicle_id in self.tracked:
+                self.record_arrival(vehicle_id, step)
+
+        snapshot = self.vehicle_state.snapshot
+        rows = []
+        for vehicle_id in self.tracked:
+            state = snapshot.get(vehicle_id)
+            if state is None:
+                continue
+            try:
+                distance_remaining = self.get_distance_remaining(state)
+            except sumo_backend.SUMO_ERRORS as e:
+                self.logger.log(f"TraCIException occurred for vehicle {vehicle_id}: {e}", "ERROR", "red",
+                                class_name="ETAEngine", function_name="update")
+                continue
+
+            speed = state[tc.VAR_SPEED]
+            if self.travel_time_model:
+                eta = self.travel_time_model.predict_eta(state)
+            else:
+                eta = distance_remaining / speed if speed > MIN_ETA_SPEED else float("inf")
+            if eta != float("inf"):
+                self.predictions.setdefault(vehicle_id, []).append((step, eta))
+            rows.append((step, vehicle_id, state[tc.VAR_ROAD_ID], state[tc.VAR_ROUTE_INDEX],
+                         round(distance_remaining, 2), round(speed, 2), round(eta, 2)))
+
+        if self.table_writer and rows:
+            self.table_writer.writerows(rows)
+
+        self.logger.log("Step %d | ETA computed for %d tracked vehicles", "INFO", "green",
+                        class_name="ETAEngine", function_name="update", args=(step, len(rows)))
+
+    def record_arrival(self, vehicle_id, step):
+        """ Stores how far off the ETA predictions of an arrived vehicle were and stops tracking it. """
+        self.tracked.discard(vehicle_id)
+        predictions = self.predictions.pop(vehicle_id, None)
+        if not predictions:
+            return
+        arrival_time = step * self.step_length
+        errors = [abs(prediction_step * self.step_length + eta - arrival_time) for prediction_step, eta in predictions]
+        self.eta_errors[vehicle_id] = sum(errors) / len(errors)
+        self.logger.log("Vehicle %s arrived at step %d. Mean ETA error: %.2f s over %d predictions.", "INFO", "green",
+                        class_name="ETAEngine", function_name="record_arrival",
+                        args=(vehicle_id, step, self.eta_errors[vehicle_id], len(predictions)))
+
+    def get_mean_eta_error(self):
+        """ Returns the mean ETA error (seconds) over all arrived tracked vehicles, or None if none arrived yet. """
+        if not self.eta_errors:
+            return None
+        return sum(self.eta_errors.values()) / len(self.eta_errors)
+
+    def get_summary(self):
+        """ Returns the summary of the ETA engine's run. """
+        mean_error = self.get_mean_eta_error()
+        return f"ETA engine: {len(self.eta_errors)} tracked vehicles arrived, {len(self.tracked)} still on the road, " \
+               f"mean ETA error: {f'{mean_error:.2f} s' if mean_error is not None else 'n/a'}."
+
+    def get_state(self):
+        """ Returns the tracked vehicles, pending predictions and ETA errors, for checkpoints. """
+        return {"tracked": self.tracked, "predictions": self.predictions, "eta_errors": self.eta_errors}
+
+    def set_state(self, state):
+        """ Restores the state saved by get_state(). Call before start(). """
+        self.tracked = set(state["tracked"])
+        self.predictions = state["predictions"]
+        self.eta_errors = state["eta_errors"]
+
+    def close(self):
+        """ Flushes and closes the ETA table. """
+        if self.table_file:
+            self.table_file.close()
+            self.table_file = None
@@ -1,26 +1,32 @@
 import datetime
-from termcolor import colored
+from .log_writer import AsyncLogWriter, LOG_LEVELS
 
 class ETAFileLogger:
     """ Handles logging specific to ETA tracking in a separate log file. """
     
-    def __init__(self, log_file_path="main/ETA_vehicle_log.log"):
-        self.log_file = open(log_file_path, "w", encoding="utf-8")
+    def __init__(self, log_file_path="main/ETA_vehicle_log.log", level="INFO", overflow_policy="block", console=True):
+        self.level = LOG_LEVELS[level]
+        self.console = console
+        self.timestamp = None
+        self.writer = AsyncLogWriter(log_file_path, overflow_policy=overflow_policy)
         self.log("ETA tracking log file initialized.", "INFO", "cyan", class_name="ETAFileLogger", function_name="__init__")
         
 
-    def log(self, message, level="INFO", color=None, class_name="", function_name=""):
-        """ Logs a message with timestamp, level, and source class/function. """
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"[{timestamp}] [{level}] [{class_name}::{function_name}] {message}"
+    def is_enabled(self, level):
+        """ Returns True if records of the given level are written. """
+        return LOG_LEVELS.get(level, 0) >= self.level
 
-        if color:
-            print(colored(log_entry, color))
-        else:
-            print(log_entry)
+    def refresh_timestamp(self):
+        """ Caches the current time once per simulation step. """
+        self.timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-        self.log_file.write(log_entry + "\n")
+    def log(self, message, level="INFO", color=None, class_name="", function_name="", args=None):
+        """ Logs a message with timestamp, level, and source class/function. When args are given, message is a %-format template. """
+        if LOG_LEVELS.get(level, 0) < self.level:
+            return
+        timestamp = self.timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.writer.submit(timestamp, level, class_name, function_name, message, args, color, self.console)
 
     def close(self):
-        """ Closes the log file. """
-        self.log_file.close()
\ No newline at end of file
+        """ Flushes all queued records and closes the log file. """
+        self.writer.close()
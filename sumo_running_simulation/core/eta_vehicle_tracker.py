@@ -1,28 +1,47 @@
-import traci
+import traci.constants as tc
 from .vehicle_tracker_plugin import VehicleTrackerPlugin
+from . import sumo_backend
+
+# Below this speed (m/s) the vehicle is treated as stopped and no ETA is predicted
+MIN_ETA_SPEED = 0.1
 
 class ETAVehicleTracker(VehicleTrackerPlugin):
     """ Tracks a specific vehicle's estimated time of arrival (ETA). """
 
-    def __init__(self, vehicle_id, eta_logger):
+    name = "eta_tracker"
+    variables = (tc.VAR_POSITION, tc.VAR_SPEED, tc.VAR_ROAD_ID, tc.VAR_LANEPOSITION, tc.VAR_ROUTE_ID, tc.VAR_ROUTE_INDEX)
+
+    def __init__(self, vehicle_id, eta_logger, sumo, vehicle_state, travel_time_model=None):
+        """
+        :param travel_time_model: EdgeTravelTimeModel predicting the ETA from learned edge travel times.
+                                  Without it the ETA is the remaining driving distance divided by the current speed.
+        """
         self.vehicle_id = vehicle_id
         self.logger = eta_logger
+        self.sumo = sumo
+        self.vehicle_state = vehicle_state
+        self.travel_time_model = travel_time_model
         self.initial_position = None
         self.destination = None
         self.max_speed = 0
         self.fastest_step = 0
+        self.destination_length = 0
+        self.step_length = self.sumo.simulation.getDeltaT()
+        self.predictions = []  # (step, ETA in seconds) pairs, compared with the actual arrival
+        self.arrival_step = None
         self.logger.log(f"Tracking vehicle {self.vehicle_id} for ETA calculation.", "INFO", "cyan", 
                         class_name="ETAVehicleTracker", function_name="__init__")
 
     def initialize_tracking(self):
         """ Retrieves initial vehicle info and destination if available. """
         try:
-            self.initial_position = traci.vehicle.getPosition(self.vehicle_id)
-            self.max_speed = traci.vehicle.getMaxSpeed(self.vehicle_id)
-            self.destination = traci.vehicle.getRoute(self.vehicle_id)[-1]  # Last waypoint
+            self.initial_position = self.sumo.vehicle.getPosition(self.vehicle_id)
+            self.max_speed = self.sumo.vehicle.getMaxSpeed(self.vehicle_id)
+            self.destination = self.sumo.vehicle.getRoute(self.vehicle_id)[-1]  # Last waypoint
+            self.destination_length = self.sumo.lane.getLength(f"{self.destination}_0")
             self.logger.log(f"Tracking vehicle {self.vehicle_id}: Start Position: {self.initial_position}, Destination: {self.destination}",
                             "INFO", "cyan", class_name="ETAVehicleTracker", function_name="initialize_tracking")
-        except traci.TraCIException:
+        except sumo_backend.SUMO_ERRORS:
             self.logger.log(f"Vehicle {self.vehicle_id} not found in simulation.", "ERROR", "red", class_name="ETAVehicleTracker", function_name="initialize_tracking")
         except Exception as e:
             self.logger.log(f"Error initializing tracking for vehicle {self.vehicle_id}: {e}", "ERROR", "red", 
@@ -31,33 +50,79 @@ class ETAVehicleTracker(VehicleTrackerPlugin):
     def track_vehicle(self, step):
         """ Tracks vehicle movement and calculates estimated arrival time with detailed logging. """
         try:
-            if self.vehicle_id not in traci.vehicle.getIDList():
-                self.logger.log(f"Vehicle {self.vehicle_id} not found at step {step}.", "ERROR", "red",
-                                class_name="ETAVehicleTracker", function_name="track_vehicle")
+            state = self.vehicle_state.snapshot.get(self.vehicle_id)
+            if state is None:
+                if self.arrival_step is None and self.vehicle_id in self.vehicle_state.arrived:
+                    self.record_arrival(step)
+                    return
+                self.logger.log("Vehicle %s not found at step %d.", "ERROR", "red",
+                                class_name="ETAVehicleTracker", function_name="track_vehicle", args=(self.vehicle_id, step))
                 return
 
-            position = traci.vehicle.getPosition(self.vehicle_id)
-            speed = traci.vehicle.getSpeed(self.vehicle_id)
+            # The vehicle may not have departed yet when tracking was initialized
+            if self.destination is None:
+                self.initialize_tracking()
+
+            position = state[tc.VAR_POSITION]
+            speed = state[tc.VAR_SPEED]
+
+            self.logger.log("Vehicle %s info at step %d: Position=%s, Speed=%.2f m/s", 
+                            "INFO", "cyan", class_name="ETAVehicleTracker", function_name="track_vehicle",
+                            args=(self.vehicle_id, step, position, speed))
 
-            self.logger.log(f"Vehicle {self.vehicle_id} info at step {step}: Position={position}, Speed={speed:.2f} m/s", 
-                            "INFO", "cyan", class_name="ETAVehicleTracker", function_name="track_vehicle")
+            if self.destination and self.travel_time_model:
+                eta = self.travel_time_model.predict_eta(state)
+                self.predictions.append((step, eta))
+                self.logger.log("Step %d | Vehicle %s | Road: %s | ETA (edge travel times): %.2f s",
+                                "INFO", "green", class_name="ETAVehicleTracker", function_name="track_vehicle",
+                                args=(step, self.vehicle_id, state[tc.VAR_ROAD_ID], eta))
 
-            if self.destination:
-                self.logger.log(f"Calculating distance from {position} to destination {self.destination}.", "INFO", "yellow",
-                                class_name="ETAVehicleTracker", function_name="track_vehicle")
-                distance_remaining = traci.simulation.getDistanceRoad(self.vehicle_id, self.destination)
+            elif self.destination:
+                self.logger.log("Calculating distance from %s to destination %s.", "INFO", "yellow",
+                                class_name="ETAVehicleTracker", function_name="track_vehicle",
+                                args=(position, self.destination))
+                distance_remaining = self.sumo.vehicle.getDrivingDistance(self.vehicle_id, self.destination, self.destination_length)
 
-                eta = distance_remaining / speed if speed > 0 else float("inf")
+                eta = distance_remaining / speed if speed > MIN_ETA_SPEED else float("inf")
+                if eta != float("inf"):
+                    self.predictions.append((step, eta))
 
-                self.logger.log(f"Step {step} | Vehicle {self.vehicle_id} | Distance remaining: {distance_remaining:.2f} m | ETA: {eta:.2f} s",
-                                "INFO", "green", class_name="ETAVehicleTracker", function_name="track_vehicle")
+                self.logger.log("Step %d | Vehicle %s | Distance remaining: %.2f m | ETA: %.2f s",
+                                "INFO", "green", class_name="ETAVehicleTracker", function_name="track_vehicle",
+                                args=(step, self.vehicle_id, distance_remaining, eta))
 
-        except traci.TraCIException as e:
+        except sumo_backend.SUMO_ERRORS as e:
             self.logger.log(f"TraCIException occurred: {e}", "ERROR", "red", class_name="ETAVehicleTracker", function_name="track_vehicle")
         except Exception as e:
             self.logger.log(f"Unexpected error tracking vehicle {self.vehicle_id} at step {step}: {e}", "ERROR", "red",
                             class_name="ETAVehicleTracker", function_name="track_vehicle")
 
+    def record_arrival(self, step):
+        """ Stores the arrival step and logs how far off the ETA predictions were. """
+        self.arrival_step = step
+        mean_error = self.get_mean_eta_error()
+        self.logger.log(f"Vehicle {self.vehicle_id} arrived at step {step}. Mean ETA error: {mean_error} s "
+                        f"over {len(self.predictions)} predictions.", "INFO", "green",
+                        class_name="ETAVehicleTracker", function_name="record_arrival")
+
+    def get_mean_eta_error(self):
+        """ Returns the mean absolute difference (seconds) between predicted and actual arrival, or None before arrival. """
+        if self.arrival_step is None or not self.predictions:
+            return None
+        arrival_time = self.arrival_step * self.step_length
+        errors = [abs(step * self.step_length + eta - arrival_time) for step, eta in self.predictions]
+        return sum(errors) / len(errors)
+
+    def get_state(self):
+        """ Returns the tracking state (destination, predictions, arrival), for checkpoints. """
+        return {"initial_position": self.initial_position, "destination": self.destination, "max_speed": self.max_speed,
+                "destination_length": self.destination_length, "predictions": self.predictions, "arrival_step": self.arrival_step}
+
+    def set_state(self, state):
+        """ Restores the tracking state saved by get_state(). """
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def get_summary(self):
         """ Returns the summary of the tracked vehicle's journey. """
         return f"Vehicle {self.vehicle_id} started at {self.initial_position} with destination {self.destination} and max speed {self.max_speed} m/s."
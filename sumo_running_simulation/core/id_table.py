@@ -0,0 +1,27 @@
+class IdTable:
+    """ Interns string IDs (vehicles, junctions, edges, ...) as dense integer indices. """
+
+    def __init__(self, ids=()):
+        self.index = {}
+        self.ids = []
+        for id_ in ids:
+            self.intern(id_)
+
+    def intern(self, id_):
+        """ Returns the index of an ID, assigning the next free index on first sight. """
+        idx = self.index.get(id_)
+        if idx is None:
+            idx = len(self.ids)
+            self.index[id_] = idx
+            self.ids.append(id_)
+        return idx
+
+    def lookup(self, idx):
+        """ Returns the ID stored at an index. """
+        return self.ids[idx]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, id_):
+        return id_ in self.index
@@ -0,0 +1,116 @@
+import sys
+import atexit
+import queue
+import datetime
+import threading
+from termcolor import colored
+
+# Numeric severity of every log level, records below the active level are dropped before formatting
+LOG_LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+OVERFLOW_POLICIES = ("block", "drop")
+
+_STOP = object()
+
+class AsyncLogWriter:
+    """ Formats and writes log records on a background thread, so the simulation loop never waits on disk I/O. """
+
+    def __init__(self, log_file_path, max_queue_size=100000, batch_size=512, overflow_policy="block"):
+        """
+        :param log_file_path: Path of the log file to (over)write.
+        :param max_queue_size: Maximum number of records waiting for the writer thread.
+        :param batch_size: Maximum number of records written (and flushed) together.
+        :param overflow_policy: "block" waits for room in a full queue, "drop" discards the record and counts it.
+        """
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow_policy}', expected one of {OVERFLOW_POLICIES}")
+
+        self.log_file = open(log_file_path, "w", encoding="utf-8", buffering=1 << 16)
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.batch_size = batch_size
+        self.overflow_policy = overflow_policy
+        self.dropped_records = 0
+        self.failed_writes = 0
+        self.closed = False
+
+        self.thread = threading.Thread(target=self._run, name=f"AsyncLogWriter({log_file_path})", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def submit(self, timestamp, level, class_name, function_name, message, args=None, color=None, print_to_console=False):
+        """ Queues a record for the writer thread. The message is only formatted (message % args) on that thread. """
+        record = (timestamp, level, class_name, function_name, message, args, color, print_to_console)
+        if self.overflow_policy == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_records += 1
+
+    def _run(self):
+        """ Writer thread loop: drains the queue in batches and flushes once per batch. """
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            lines = []
+            for record in batch:
+                if record is _STOP:
+                    running = False
+                    continue
+                timestamp, level, class_name, function_name, message, args, color, print_to_console = record
+                try:
+                    message = message % args if args else message
+                except Exception as e:
+                    # a bad record must not stop the thread, every later record would be lost
+                    message = f"{message} {args!r} (formatting failed: {e!r})"
+                log_entry = f"[{timestamp}] [{level}] [{class_name}::{function_name}] {message}"
+                lines.append(log_entry + "\n")
+
+                if print_to_console:
+                    try:
+                        print(colored(log_entry, color) if color else log_entry)
+                    except Exception:
+                        pass  # e.g. an unknown color or a closed console, the record still goes to the file
+
+            try:
+                self.log_file.write("".join(lines))
+                self.log_file.flush()
+            except Exception as e:
+                self.failed_writes += 1
+                if self.failed_writes == 1:
+                    print(f"AsyncLogWriter: writing {self.log_file.name} failed ({e!r}), records are lost", file=sys.stderr)
+
+    def close(self, timeout=30.0):
+        """
+        Writes every queued record, stops the writer thread and closes the file.
+
+        :param timeout: Seconds to wait for the writer thread to drain the queue.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        atexit.unregister(self.close)
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            print(f"AsyncLogWriter: {self.log_file.name} not drained within {timeout} s, "
+                  f"{self.queue.qsize()} records are lost", file=sys.stderr)
+            return
+        try:
+            if self.dropped_records:
+                timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                self.log_file.write(f"[{timestamp}] [WARNING] [AsyncLogWriter::close] "
+                                    f"{self.dropped_records} log records were dropped (queue full)\n")
+            self.log_file.close()
+        except Exception:
+            pass  # the write failures were reported by the writer thread
@@ -1,37 +1,53 @@
 import datetime
-from termcolor import colored
+from .log_writer import AsyncLogWriter, LOG_LEVELS
 
 class Logger:
     """ Handles logging to both the console and a log file with timestamps, colors, and source info. """
 
-    def __init__(self, log_file_path="main/simulation_log.log"):
-        """ Initialize the logger with a log file path. """
-        self.log_file = open(log_file_path, "w", encoding="utf-8")
-        self.log("Simulation log file initialized.", "INFO", "cyan", 
+    def __init__(self, log_file_path="main/simulation_log.log", level="INFO", overflow_policy="block", console=True):
+        """
+        Initialize the logger with a log file path.
+
+        :param level: Records below this level are discarded without being formatted.
+        :param overflow_policy: What to do when the writer queue is full ("block" or "drop").
+        :param console: Set to False to keep records out of the console (e.g. in sweep workers).
+        """
+        self.level = LOG_LEVELS[level]
+        self.console = console
+        self.timestamp = None
+        self.writer = AsyncLogWriter(log_file_path, overflow_policy=overflow_policy)
+        self.log("Simulation log file initialized.", "INFO", "cyan",
                  class_name="Logger", function_name="__init__")
 
-    def log(self, message, level="INFO", color=None, class_name="UNKNOWN", function_name="UNKNOWN"):
+    def is_enabled(self, level):
+        """ Returns True if records of the given level are written. """
+        return LOG_LEVELS.get(level, 0) >= self.level
+
+    def refresh_timestamp(self):
+        """ Caches the current time once per simulation step, so log calls do not format it again. """
+        self.timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def log(self, message, level="INFO", color=None, class_name="UNKNOWN", function_name="UNKNOWN", print_to_console=True, args=None):
         """
         Logs a message to the console and the log file with timestamp, level, class name, and function name.
 
-        :param message: The message to log.
+        :param message: The message to log. When args are given it is a %-format template, formatted by the writer thread.
         :param level: The log level (INFO, WARNING, ERROR, etc.).
         :param color: The color for the console output.
         :param class_name: The name of the class calling the log.
         :param function_name: The name of the function calling the log.
+        :param print_to_console: Whether the record is also printed to the console.
+        :param args: Optional arguments for the message template.
         """
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"[{timestamp}] [{level}] [{class_name}::{function_name}] {message}"
-
-        # Print to console
-        if color:
-            print(colored(log_entry, color))
-        else:
-            print(log_entry)
+        if LOG_LEVELS.get(level, 0) < self.level:
+            return
+        timestamp = self.timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.writer.submit(timestamp, level, class_name, function_name, message, args, color, print_to_console and self.console)
 
-        # Write to log file
-        self.log_file.write(log_entry + "\n")
+    def get_dropped_records(self):
+        """ Returns how many records were dropped because the writer queue was full. """
+        return self.writer.dropped_records
 
     def close(self):
-        """ Closes the log file. """
-        self.log_file.close()
+        """ Flushes all queued records and closes the log file. """
+        self.writer.close()
@@ -0,0 +1,102 @@
+import os
+import csv
+import time
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .simulation_runner import SimulationRunner
+
+# Columns of the merged summary table, in order
+SUMMARY_COLUMNS = (
+    "scenario", "seed", "demand_scale", "traffic_phase_duration", "eta_predictor", "num_of_steps",
+    "most_vehicles", "most_vehicles_step", "fastest_vehicle", "fastest_speed", "fastest_step",
+    "mean_eta_error", "wall_time", "error",
+)
+
+def run_scenario(scenario, output_dir, backend="libsumo"):
+    """
+    Runs one scenario in the current (worker) process and returns its summary row.
+    Each scenario gets its own TraCI connection label and its own log directory.
+    """
+    row = dict(scenario)
+    started = time.perf_counter()
+    try:
+        runner = SimulationRunner(
+            scenario.get("tracked_vehicle_id"),
+            sumo_config=scenario.get("sumo_config", "sumo_config/StudyArea.sumocfg"),
+            run_mode="headless",
+            sumo_args=["--scale", str(scenario["demand_scale"])],
+            label=scenario["scenario"],
+            log_dir=os.path.join(output_dir, scenario["scenario"]),
+            num_of_steps=scenario["num_of_steps"],
+            traffic_phase_duration=scenario["traffic_phase_duration"],
+            seed=scenario["seed"],
+            backend=backend,
+            eta_predictor=scenario.get("eta_predictor", "travel_time"),
+        )
+        runner.run_simulation(delay=0)
+        row.update(runner.get_summary())
+    except Exception as e:
+        row["error"] = str(e)
+    row["wall_time"] = round(time.perf_counter() - started, 3)
+    return row
+
+
+class ScenarioSweep:
+    """ Runs independent simulation scenarios in parallel, one SUMO instance per worker process. """
+
+    def __init__(self, scenarios, output_dir="main/sweep", max_workers=None, backend="libsumo"):
+        """
+        :param scenarios: List of scenario dicts (see build_grid).
+        :param output_dir: Directory receiving one log directory per scenario and summary.csv.
+        :param max_workers: Number of worker processes (default: number of CPUs).
+        :param backend: SUMO backend of every worker, libsumo by default since each worker owns its own process.
+        """
+        self.scenarios = scenarios
+        self.output_dir = output_dir
+        self.max_workers = max_workers or os.cpu_count()
+        self.backend = backend
+
+    @staticmethod
+    def build_grid(seeds=(1,), demand_scales=(1.0,), phase_durations=(10,), eta_predictors=("travel_time",), num_of_steps=1000,
+                   tracked_vehicle_id=None, sumo_config="sumo_config/StudyArea.sumocfg"):
+        """ Builds one scenario for every combination of seed, demand scale, traffic phase duration and ETA predictor. """
+        scenarios = []
+        for seed, scale, duration, predictor in itertools.product(seeds, demand_scales, phase_durations, eta_predictors):
+            scenarios.append({
+                "scenario": f"seed{seed}_scale{scale}_phase{duration}_{predictor}",
+                "seed": seed,
+                "demand_scale": scale,
+                "traffic_phase_duration": duration,
+                "eta_predictor": predictor,
+                "num_of_steps": num_of_steps,
+                "tracked_vehicle_id": tracked_vehicle_id,
+                "sumo_config": sumo_config,
+            })
+        return scenarios
+
+    def run(self):
+        """ Runs all scenarios across the process pool and writes the merged summary table. """
+        os.makedirs(self.output_dir, exist_ok=True)
+        rows = []
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(run_scenario, scenario, self.output_dir, self.backend): scenario for scenario in self.scenarios}
+            for future in as_completed(futures):
+                try:
+                    row = future.result()
+                except Exception as e:
+                    row = dict(futures[future], error=str(e))
+                rows.append(row)
+                print(f"✅ Scenario {row['scenario']} finished" + (f" with error: {row['error']}" if row.get("error") else ""))
+
+        rows.sort(key=lambda row: row["scenario"])
+        self.write_summary(rows)
+        return rows
+
+    def write_summary(self, rows):
+        """ Writes the merged summary table as summary.csv in the sweep directory. """
+        summary_path = os.path.join(self.output_dir, "summary.csv")
+        with open(summary_path, "w", newline="", encoding="utf-8") as summary_file:
+            writer = csv.DictWriter(summary_file, fieldnames=SUMMARY_COLUMNS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"📊 Sweep summary written to {summary_path}")
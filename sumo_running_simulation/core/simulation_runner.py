@@ -1,90 +1,205 @@
-import traci
+import os
 import time
+import traci
 import random
 from .logger import Logger
 from .traffic_controller import TrafficController
 from .vehicle_controller import VehicleController
+from .vehicle_state import VehicleStateCache
+from .step_state import StepState
 from .eta_logger import ETAFileLogger
 from .eta_vehicle_tracker import ETAVehicleTracker
+from .eta_engine import ETAEngine
+from .edge_travel_time import EdgeTravelTimeModel, ETA_PREDICTORS
+from .sumo_backend import launch_backend
+from .checkpoint import CheckpointManager
+from .run_mode import get_sumo_binary, get_sumo_options, create_pacer
+from .step_profiler import StepProfiler
+from .plugin_scheduler import PluginScheduler
 
 class SimulationRunner:
     """ Main class to run the SUMO simulation with plugins and dynamic vehicle behavior. """
 
-    def __init__(self, tracked_vehicle_id_=None):
-        self.logger = Logger()
-        
+    def __init__(self, tracked_vehicle_id_=None, log_level="INFO", log_overflow_policy="block",
+                 sumo_config="sumo_config/StudyArea.sumocfg", run_mode="gui", sumo_args=(), label="default",
+                 log_dir="main", num_of_steps=100, traffic_phase_duration=10, seed=None, console_output=None, backend="traci",
+                 eta_vehicle_ids=None, eta_pattern=None, eta_predictor="travel_time",
+                 profile=False, profile_steps=None, trace=None, checkpoint_dir=None, checkpoint_interval=None,
+                 checkpoint_steps=(), from_checkpoint=None, plugins=()):
+        """
+        :param run_mode: "headless" (plain sumo, full speed, no console output), "gui" (sumo-gui) or "realtime" (paced).
+        :param sumo_args: Extra SUMO command line options (e.g. ["--scale", "1.5"]).
+        :param label: TraCI connection label, so several runners never share a connection.
+        :param log_dir: Directory receiving simulation_log.log and ETA_vehicle_log.log.
+        :param seed: Seeds both SUMO and the random vehicle speed changes for reproducible runs.
+        :param console_output: Whether log records are echoed to the console (default: all modes except headless).
+        :param backend: "traci" (socket), "libsumo" (in-process, headless only, falls back to traci if unavailable)
+                        or "mock" (no SUMO, replays trace).
+        :param eta_vehicle_ids: Vehicles tracked by the multi-vehicle ETA engine (writes ETA_table.csv to log_dir).
+        :param eta_pattern: Shell-style pattern of vehicle IDs tracked by the ETA engine (e.g. "flow_4*").
+        :param eta_predictor: "travel_time" (learned per-edge travel times) or "speed" (remaining distance / current speed).
+        :param profile: Records per-phase step times and SUMO call counts, summarized at the end of the run.
+        :param profile_steps: (first step, last step) window run under cProfile when profiling, written to log_dir/profile.pstats.
+        :param trace: Trace replayed by the "mock" backend (default: a SyntheticTrace).
+        :param checkpoint_dir: Directory of the SUMO + controller state checkpoints (default: log_dir/checkpoints).
+        :param checkpoint_interval: Steps between checkpoints (None disables the periodic checkpoints).
+        :param checkpoint_steps: Additional steps after which a checkpoint is saved (e.g. the end of the warm-up).
+        :param from_checkpoint: Checkpoint name (e.g. "step_2999") or "latest" to start from instead of step 0,
+                                the run continues with the step after it up to num_of_steps.
+        :param plugins: Additional StepPlugins, run after the built-in tasks at their own interval.
+        """
+        if eta_predictor not in ETA_PREDICTORS:
+            raise ValueError(f"Unknown ETA predictor '{eta_predictor}', expected one of {ETA_PREDICTORS}")
+        init_started = time.perf_counter()
+        # Start SUMO (or SUMO-GUI, depending on the run mode) first, it loads the network while the loggers are set up
+        sumo_binary = get_sumo_binary(run_mode)
+        sumo_cmd = [sumo_binary, "-c", sumo_config] + get_sumo_options(run_mode) + list(sumo_args)
+        if seed is not None:
+            sumo_cmd += ["--seed", str(seed)]
+        if checkpoint_interval or checkpoint_steps:
+            # random number generator states and full-precision positions keep resumed runs close to the original
+            sumo_cmd += ["--save-state.rng", "--save-state.precision", "8"]
+        # Close existing SUMO connection if it's already active (before launching, the new one may take the same label)
+        closed_existing = traci.isLoaded()
+        if closed_existing:
+            traci.close()
+        launch = launch_backend(sumo_cmd, backend, label, trace)
         try:
-            self.eta_logger = ETAFileLogger()
-            self.logger.log("📝 ETA tracking logger initialized.", "INFO", "cyan",
-                        class_name="SimulationRunner", function_name="__init__")
-        except Exception as e:  
-            self.logger.log(f"❌ Error initializing ETA tracking logger: {e}", "ERROR", "red",
-                        class_name="SimulationRunner", function_name="__init__")
-
-        # Close existing SUMO connection if it's already active
-        if traci.isLoaded():
-            self.logger.log("⚠️ Closing existing SUMO connection before starting a new one.", "WARNING", "yellow",
+            os.makedirs(log_dir, exist_ok=True)
+            if console_output is None:
+                console_output = run_mode != "headless"
+            self.logger = Logger(log_file_path=os.path.join(log_dir, "simulation_log.log"), level=log_level,
+                                 overflow_policy=log_overflow_policy, console=console_output)
+        
+            try:
+                self.eta_logger = ETAFileLogger(log_file_path=os.path.join(log_dir, "ETA_vehicle_log.log"), level=log_level,
+                                                overflow_policy=log_overflow_policy, console=console_output)
+                self.logger.log("📝 ETA tracking logger initialized.", "INFO", "cyan",
+                            class_name="SimulationRunner", function_name="__init__")
+            except Exception as e:  
+                self.logger.log(f"❌ Error initializing ETA tracking logger: {e}", "ERROR", "red",
                             class_name="SimulationRunner", function_name="__init__")
-            traci.close()
 
-        # Start SUMO-GUI with the simulation configuration
-        sumo_cmd = ["sumo-gui", "-c", "sumo_config/StudyArea.sumocfg", "--start"]
-        traci.start(sumo_cmd)
-        self.logger.log("✅ Simulation started successfully with SUMO-GUI!", "INFO", "green",
+            if closed_existing:
+                self.logger.log("⚠️ Closed the existing SUMO connection before starting a new one.", "WARNING", "yellow",
+                                class_name="SimulationRunner", function_name="__init__")
+
+            # every controller queries SUMO through this one handle (TraCI connection or in-process libsumo)
+            self.sumo, self.backend = launch.connect(self.logger)
+        except BaseException:
+            # nothing else would stop the SUMO process started above
+            launch.abort()
+            raise
+        # with profiling on, every controller gets the call-counting handle
+        self.profiler = StepProfiler(enabled=profile, profile_steps=profile_steps, profile_path=os.path.join(log_dir, "profile.pstats"))
+        self.sumo = self.profiler.wrap(self.sumo)
+        self.label = label
+        self.run_mode = run_mode
+        self.random = random.Random(seed)
+        self.logger.log(f"✅ Simulation started successfully with {sumo_binary}! (backend: {self.backend}, connection '{label}')", "INFO", "green",
                         class_name="SimulationRunner", function_name="__init__")
 
+        self.vehicle_state = VehicleStateCache(self.logger, self.sumo)
+        self.step_state = StepState() # the same snapshot as NumPy arrays, for vectorized per-step aggregates
         self.tracked_vehicle_id = tracked_vehicle_id_
-        self.vehicle_tracker = ETAVehicleTracker(self.tracked_vehicle_id, self.eta_logger) if tracked_vehicle_id_ else None
+        self.travel_time_model = EdgeTravelTimeModel(self.logger, self.sumo, self.vehicle_state) \
+            if eta_predictor == "travel_time" and (tracked_vehicle_id_ or eta_vehicle_ids or eta_pattern) else None
+        self.vehicle_tracker = ETAVehicleTracker(self.tracked_vehicle_id, self.eta_logger, self.sumo, self.vehicle_state,
+                                                 self.travel_time_model) if tracked_vehicle_id_ else None
         self.logger.log(f"🚦 Initializing SUMO simulation with vehicle tracking: {tracked_vehicle_id_}", "INFO", "green",
                         class_name="SimulationRunner", function_name="__init__")
+        self.eta_engine = None
+        if eta_vehicle_ids or eta_pattern:
+            self.eta_engine = ETAEngine(self.eta_logger, self.sumo, self.vehicle_state, eta_vehicle_ids, eta_pattern,
+                                        table_path=os.path.join(log_dir, "ETA_table.csv"), travel_time_model=self.travel_time_model)
         
         # Initialize controllers
-        self.traffic_controller = TrafficController(self.logger)
-        self.vehicle_controller = VehicleController(self.logger)
+        self.traffic_controller = TrafficController(self.logger, self.sumo)
+        self.vehicle_controller = VehicleController(self.logger, self.sumo, self.vehicle_state, self.step_state)
         # Any appeal to traci should be done from VehicleController 
         # Simulation parameters
-        self.num_of_steps = 100
+        self.num_of_steps = num_of_steps
         self.most_veh = 0
         self.most_veh_step = 0
-        self.traffic_phase_duration = 10
+        self.traffic_phase_duration = traffic_phase_duration
 
-        # Initialize vehicle tracking if requested
+        # Every per-step task is a plugin with its own interval, fed from one shared snapshot per step
+        self.scheduler = PluginScheduler(self.profiler)
+        self.scheduler.add("step_log", self.log_step)
+        self.scheduler.add("speed_adjust", lambda context: self.adjust_vehicle_speeds_randomly(), interval=10)
+        self.scheduler.add("traffic_lights", lambda context: self.traffic_controller.update_traffic_light(
+            context.step, self.traffic_phase_duration), interval=self.traffic_phase_duration)
+        self.scheduler.add("log_vehicle_info", lambda context: self.vehicle_controller.log_vehicle_info())
+        self.scheduler.add("fastest_vehicle", lambda context: self.vehicle_controller.track_fastest_vehicle(context.step))
+        # Learn edge travel times from every vehicle that moved to a new edge, then track the ETAs
+        if self.travel_time_model:
+            self.scheduler.add("travel_time_model", lambda context: self.travel_time_model.update(context.step))
         if self.vehicle_tracker:
-            self.vehicle_tracker.initialize_tracking()
+            self.scheduler.register(self.vehicle_tracker)
+        if self.eta_engine:
+            self.scheduler.add("eta_engine", lambda context: self.eta_engine.update(context.step))
+        for plugin in plugins:
+            self.scheduler.register(plugin)
 
-    def run_simulation(self, delay=0.01):
-        """ Runs the simulation loop while logging all events. """
-        try:
-            for step in range(self.num_of_steps):
-                traci.simulationStep()
-                time.sleep(delay)
+        # Checkpoints of the SUMO state plus the Python-side state, to skip the warm-up or resume a crashed run
+        self.checkpoints = None
+        if checkpoint_interval or checkpoint_steps or from_checkpoint:
+            self.checkpoints = CheckpointManager(self.logger, self.sumo, checkpoint_dir or os.path.join(log_dir, "checkpoints"),
+                                                 checkpoint_interval, checkpoint_steps)
+        self.first_step = 0
+        if from_checkpoint:
+            last_step, state = self.checkpoints.load(from_checkpoint)
+            self.set_state(state)
+            self.first_step = last_step + 1
 
-                # Log current step and vehicle count
-                num_vehicles = traci.vehicle.getIDCount()
-                self.logger.log(f"🔹 Step {step}: {num_vehicles} vehicles on the road", "INFO",
-                                class_name="SimulationRunner", function_name="run_simulation")
+        # Initialize vehicle tracking if requested (unless restored from a checkpoint)
+        if self.vehicle_tracker and self.vehicle_tracker.destination is None:
+            self.vehicle_tracker.initialize_tracking()
+
+        self.logger.log("⏱️ Startup: SUMO ready %.3f s after launch (waited %.3f s for it), runner initialized in %.3f s",
+                        "INFO", "cyan", class_name="SimulationRunner", function_name="__init__",
+                        args=(launch.startup_time, launch.connect_wait, time.perf_counter() - init_started))
 
-                # Track the maximum vehicle count
-                if num_vehicles > self.most_veh:
-                    self.most_veh = num_vehicles
-                    self.most_veh_step = step
+    def run_simulation(self, delay=0.01):
+        """
+        Runs the simulation loop while logging all events.
 
-                # Adjust the speed of one random vehicle every 10 steps
-                if step % 10 == 0:
-                    self.adjust_vehicle_speeds_randomly()
+        :param delay: Wall-clock seconds per step in "realtime" mode (0 = the step length) or "gui" mode (0 = unpaced).
+                      Ignored in "headless" mode.
+        """
+        try:
+            # subscribe vehicles so each step costs one snapshot instead of per-vehicle queries
+            # (after a checkpoint load this also restores the subscriptions, they are not part of the SUMO state)
+            self.vehicle_state.require(self.scheduler.get_variables()) # one subscription covers what every plugin reads
+            self.vehicle_state.start()
+            if self.eta_engine:
+                self.eta_engine.start()
+            pacer = create_pacer(self.run_mode, delay, self.sumo.simulation.getDeltaT())
+            profiler = self.profiler
+            profiler.start()
 
-                # Update traffic lights
-                self.traffic_controller.update_traffic_light(step, self.traffic_phase_duration)
+            for step in range(self.first_step, self.num_of_steps):
+                profiler.begin_step(step)
+                self.sumo.simulationStep()
+                profiler.lap("simulation_step")
+                self.vehicle_state.refresh()
+                self.step_state.load(step, self.vehicle_state.snapshot)
+                profiler.lap("state_refresh")
+                if pacer:
+                    pacer.wait()
+                    profiler.lap("pacing")
 
-                # Log all vehicle information
-                self.vehicle_controller.log_vehicle_info()
+                # One timestamp per step for every log record of this step
+                self.logger.refresh_timestamp()
+                self.eta_logger.refresh_timestamp()
 
-                # Track the fastest vehicle each step
-                self.vehicle_controller.track_fastest_vehicle(step)
+                # Step log, speed changes, traffic lights, vehicle info, fastest vehicle, ETA tracking and extra plugins
+                self.scheduler.run(step, self.vehicle_state, self.step_state)
 
-                # Track ETA for the selected vehicle
-                if self.vehicle_tracker:
-                    self.vehicle_tracker.track_vehicle(step)
+                if self.checkpoints and self.checkpoints.should_save(step):
+                    self.checkpoints.save(step, self.get_state())
+                    profiler.lap("checkpoint")
+                profiler.end_step()
 
             # Log the summary of the fastest vehicle
             fastest_vehicle, fastest_speed, fastest_step = self.vehicle_controller.get_fastest_vehicle_summary()
@@ -97,24 +212,90 @@ class SimulationRunner:
             if self.vehicle_tracker:
                 self.eta_logger.log(self.vehicle_tracker.get_summary(), "INFO", "green",
                                     class_name="SimulationRunner", function_name="run_simulation")
+            self.scheduler.log_summary(self.logger)
+            self.profiler.log_summary(self.logger)
+            if self.travel_time_model:
+                self.logger.log(f"📈 {self.travel_time_model.get_summary()}", "INFO", "green",
+                                class_name="SimulationRunner", function_name="run_simulation")
+            if self.eta_engine:
+                self.eta_logger.log(self.eta_engine.get_summary(), "INFO", "green",
+                                    class_name="SimulationRunner", function_name="run_simulation")
 
         except Exception as e:
             self.logger.log(f"❌ Critical simulation error: {e}", "ERROR", "red",
                             class_name="SimulationRunner", function_name="run_simulation")
 
         finally:
-            traci.close()
+            self.sumo.close()
+            if self.eta_engine:
+                self.eta_engine.close()
+            self.logger.refresh_timestamp()
             self.logger.log("🔚 Simulation finished and closed successfully!", "INFO", "green",
                             class_name="SimulationRunner", function_name="run_simulation")
             self.logger.close()
             self.eta_logger.close()
 
+    def log_step(self, context):
+        """ Logs the vehicle count of the step and tracks the maximum. """
+        num_vehicles = context.step_state.size
+        self.logger.log("🔹 Step %d: %d vehicles on the road (mean speed %.2f m/s, %d stopped)", "INFO",
+                        class_name="SimulationRunner", function_name="run_simulation",
+                        args=(context.step, num_vehicles, context.step_state.get_mean_speed(), context.step_state.get_stopped_count()))
+
+        # Track the maximum vehicle count
+        if num_vehicles > self.most_veh:
+            self.most_veh = num_vehicles
+            self.most_veh_step = context.step
+
     def adjust_vehicle_speeds_randomly(self):
         """ Randomly adjust the speed of one random active vehicle. """
         vehicles = self.vehicle_controller.get_active_vehicles()
         if vehicles:
-            selected_vehicle = random.choice(vehicles)
-            random_speed = random.uniform(5, 25)  # Speed between 5 and 25 m/s
+            selected_vehicle = self.random.choice(vehicles)
+            random_speed = self.random.uniform(5, 25)  # Speed between 5 and 25 m/s
             self.vehicle_controller.update_vehicle_speed(selected_vehicle, random_speed)
             self.logger.log(f"🔀 Randomly adjusted speed of vehicle {selected_vehicle} to {random_speed:.2f} m/s",
                             "INFO", "blue", class_name="SimulationRunner", function_name="adjust_vehicle_speeds_randomly")
+
+    def get_state(self):
+        """ Returns the Python-side state of the run (counters, random generator, trackers), saved with every checkpoint. """
+        return {
+            "most_veh": self.most_veh,
+            "most_veh_step": self.most_veh_step,
+            "random": self.random.getstate(),
+            "vehicle_controller": self.vehicle_controller.get_state(),
+            "vehicle_tracker": self.vehicle_tracker.get_state() if self.vehicle_tracker else None,
+            "travel_time_model": self.travel_time_model.get_state() if self.travel_time_model else None,
+            "eta_engine": self.eta_engine.get_state() if self.eta_engine else None,
+        }
+
+    def set_state(self, state):
+        """ Restores the state saved by get_state(), trackers that are not part of this run are skipped. """
+        self.most_veh = state["most_veh"]
+        self.most_veh_step = state["most_veh_step"]
+        self.random.setstate(state["random"])
+        self.vehicle_controller.set_state(state["vehicle_controller"])
+        for name in ("vehicle_tracker", "travel_time_model", "eta_engine"):
+            component = getattr(self, name)
+            if component and state[name] is not None:
+                component.set_state(state[name])
+
+    def get_summary(self):
+        """ Returns the headline results of the run (used by the scenario sweep summary table). """
+        fastest_vehicle, fastest_speed, fastest_step = self.vehicle_controller.get_fastest_vehicle_summary()
+        return {
+            "most_vehicles": self.most_veh,
+            "most_vehicles_step": self.most_veh_step,
+            "fastest_vehicle": fastest_vehicle,
+            "fastest_speed": round(fastest_speed, 3),
+            "fastest_step": fastest_step,
+            "mean_eta_error": self.get_mean_eta_error(),
+        }
+
+    def get_mean_eta_error(self):
+        """ Returns the mean ETA error (seconds) of the single tracked vehicle, else of the ETA engine, else None. """
+        if self.vehicle_tracker:
+            return self.vehicle_tracker.get_mean_eta_error()
+        if self.eta_engine:
+            return self.eta_engine.get_mean_eta_error()
+        return None
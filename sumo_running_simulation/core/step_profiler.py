@@ -0,0 +1,173 @@
+import time
+import types
+import cProfile
+from array import array
+import numpy as np
+
+# Attribute types that are SUMO commands - anything else on the handle is a domain (vehicle, junction, ...)
+_COMMAND_TYPES = (types.FunctionType, types.MethodType, types.BuiltinFunctionType, types.BuiltinMethodType)
+
+def _counting_command(command, key, counts):
+    """ Wraps one SUMO command so every call increments its counter. """
+    def call(*args, **kwargs):
+        counts[key] = counts.get(key, 0) + 1
+        return command(*args, **kwargs)
+    return call
+
+
+class _CountingDomain:
+    """ Stands in for one SUMO domain (handle.vehicle, handle.junction, ...) and counts its commands. """
+
+    def __init__(self, domain, name, counts):
+        self._domain = domain
+        self._name = name
+        self._counts = counts
+
+    def __getattr__(self, name):
+        attribute = getattr(self._domain, name)
+        if isinstance(attribute, _COMMAND_TYPES):
+            attribute = _counting_command(attribute, f"{self._name}.{name}", self._counts)
+        # cache on the instance, so later lookups skip __getattr__
+        setattr(self, name, attribute)
+        return attribute
+
+
+class CountingConnection:
+    """ Wraps a SUMO handle (TraCI connection or libsumo) and counts every call by domain and command. """
+
+    def __init__(self, sumo, counts):
+        self._sumo = sumo
+        self._counts = counts
+
+    def __getattr__(self, name):
+        attribute = getattr(self._sumo, name)
+        if isinstance(attribute, _COMMAND_TYPES):
+            attribute = _counting_command(attribute, name, self._counts)
+        else:
+            attribute = _CountingDomain(attribute, name, self._counts)
+        setattr(self, name, attribute)
+        return attribute
+
+
+class StepProfiler:
+    """
+    Records the wall time spent in each phase of every simulation step and counts SUMO calls.
+
+    The runner calls begin_step(), then lap(phase) after each phase and end_step() at the end of the step.
+    When disabled every call returns immediately and the SUMO handle is left unwrapped.
+    """
+
+    def __init__(self, enabled=False, count_calls=True, profile_steps=None, profile_path="profile.pstats"):
+        """
+        :param enabled: Whether anything is recorded at all.
+        :param count_calls: Whether wrap() counts the SUMO calls made through the handle.
+        :param profile_steps: (first step, last step) window run under cProfile, None to skip.
+        :param profile_path: File receiving the pstats dump of the cProfile window.
+        """
+        self.enabled = enabled
+        self.count_calls = count_calls
+        self.profile_steps = profile_steps
+        self.profile_path = profile_path
+        self.phase_times = {}  # phase -> seconds spent in it, one entry per step the phase ran in
+        self.step_times = array("d")
+        self.step_phases = {}
+        self.call_counts = {}  # "domain.command" -> number of calls
+        self.current_step = None
+        self.last_lap = 0.0
+        self.step_started = 0.0
+        self.profiler = None
+        self.profile_written = False
+
+    def wrap(self, sumo):
+        """ Returns the handle every controller should use - a counting proxy when call counting is on. """
+        if not (self.enabled and self.count_calls):
+            return sumo
+        return CountingConnection(sumo, self.call_counts)
+
+    def start(self):
+        """ Forgets the calls made during setup, so the calls per step only cover the simulation loop. """
+        self.call_counts.clear()
+
+    def begin_step(self, step):
+        """ Starts timing a simulation step. """
+        if not self.enabled:
+            return
+        self.current_step = step
+        if self.profile_steps and step == self.profile_steps[0]:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.step_phases.clear()
+        self.step_started = self.last_lap = time.perf_counter()
+
+    def lap(self, phase):
+        """ Charges the time since the previous lap (or the step start) to a phase. """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.step_phases[phase] = self.step_phases.get(phase, 0.0) + now - self.last_lap
+        self.last_lap = now
+
+    def end_step(self):
+        """ Stores the phase times of the current step. """
+        if not self.enabled:
+            return
+        self.step_times.append(time.perf_counter() - self.step_started)
+        for phase, seconds in self.step_phases.items():
+            times = self.phase_times.get(phase)
+            if times is None:
+                times = self.phase_times[phase] = array("d")
+            times.append(seconds)
+
+        if self.profiler and self.current_step == self.profile_steps[1]:
+            self.stop_profiler()
+
+    def stop_profiler(self):
+        """ Stops the cProfile window and writes its pstats file. """
+        self.profiler.disable()
+        self.profiler.dump_stats(self.profile_path)
+        self.profiler = None
+        self.profile_written = True
+
+    def get_summary(self):
+        """ Returns p50/p95/max/total seconds per phase and the SUMO calls per step. """
+        steps = len(self.step_times)
+        phases = {}
+        for phase, times in [("step", self.step_times)] + list(self.phase_times.items()):
+            values = np.frombuffer(times, dtype=np.float64)
+            if not len(values):
+                continue
+            p50, p95 = np.percentile(values, (50, 95))
+            phases[phase] = {"steps": len(values), "p50": float(p50), "p95": float(p95),
+                             "max": float(values.max()), "total": float(values.sum())}
+        total_calls = sum(self.call_counts.values())
+        return {
+            "steps": steps,
+            "phases": phases,
+            "calls": dict(sorted(self.call_counts.items(), key=lambda item: -item[1])),
+            "calls_per_step": total_calls / steps if steps else 0.0,
+        }
+
+    def log_summary(self, logger):
+        """ Logs the summary, slowest phases first. """
+        if not self.enabled:
+            return
+        summary = self.get_summary()
+        logger.log(f"⏱️ Step profile over {summary['steps']} steps (ms):", "INFO", "cyan",
+                   class_name="StepProfiler", function_name="log_summary")
+        for phase, stats in sorted(summary["phases"].items(), key=lambda item: -item[1]["total"]):
+            logger.log("⏱️ %-18s p50 %8.3f | p95 %8.3f | max %8.3f | total %9.1f (%d steps)", "INFO", "cyan",
+                       class_name="StepProfiler", function_name="log_summary",
+                       args=(phase, stats["p50"] * 1000, stats["p95"] * 1000, stats["max"] * 1000, stats["total"] * 1000, stats["steps"]))
+        if self.count_calls:
+            logger.log(f"📞 SUMO calls: {summary['calls_per_step']:.1f} per step", "INFO", "cyan",
+                       class_name="StepProfiler", function_name="log_summary")
+            for command, count in summary["calls"].items():
+                logger.log("📞 %-40s %8d (%.2f per step)", "INFO", "cyan",
+                           class_name="StepProfiler", function_name="log_summary",
+                           args=(command, count, count / summary["steps"] if summary["steps"] else 0.0))
+        if self.profiler:
+            # the run ended inside the cProfile window
+            self.stop_profiler()
+        if self.profile_written:
+            logger.log(f"📊 cProfile of steps {self.profile_steps[0]}-{self.profile_steps[1]} written to {self.profile_path}",
+                       "INFO", "cyan", class_name="StepProfiler", function_name="log_summary")
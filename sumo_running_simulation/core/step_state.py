@@ -0,0 +1,106 @@
+import numpy as np
+import traci.constants as tc
+from .id_table import IdTable
+
+class StepState:
+    """
+    Holds the vehicles of one simulation step as NumPy arrays, with vectorized aggregates.
+
+    The arrays are preallocated and reused from step to step (they only grow when a step has more
+    vehicles than ever before). The public arrays are views trimmed to the current vehicle count
+    and are only valid until the next load().
+    """
+
+    def __init__(self, capacity=1024, stopped_speed=0.1):
+        """
+        :param capacity: Number of vehicles the arrays are allocated for up front.
+        :param stopped_speed: Speed (m/s) below which a vehicle counts as stopped.
+        """
+        self.stopped_speed = stopped_speed
+        self.vehicle_table = IdTable()
+        self.edge_table = IdTable()
+        self.step = None
+        self.size = 0
+        self.vehicle_ids = ()
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        """ (Re)allocates the column arrays for the given number of vehicles. """
+        self.capacity = capacity
+        self._positions = np.zeros((capacity, 2), dtype=np.float64)
+        self._speeds = np.zeros(capacity, dtype=np.float64)
+        self._lanes = np.zeros(capacity, dtype=np.int32)
+        self._vehicles = np.zeros(capacity, dtype=np.int64)
+        self._edges = np.zeros(capacity, dtype=np.int64)
+
+    def load(self, step, snapshot):
+        """
+        Fills the arrays from one vehicle snapshot. Call once per step after the vehicle state refresh.
+
+        :param snapshot: Dict of vehicle ID -> subscription results (see VehicleStateCache.snapshot).
+        """
+        size = len(snapshot)
+        if size > self.capacity:
+            self._allocate(max(size, 2 * self.capacity))
+        self.step = step
+        self.size = size
+        self.vehicle_ids = tuple(snapshot)
+
+        states = snapshot.values()
+        self._positions[:size] = np.fromiter((value for state in states for value in state[tc.VAR_POSITION]),
+                                             dtype=np.float64, count=2 * size).reshape(size, 2)
+        self._speeds[:size] = np.fromiter((state[tc.VAR_SPEED] for state in states), dtype=np.float64, count=size)
+        self._lanes[:size] = np.fromiter((state[tc.VAR_LANE_INDEX] for state in states), dtype=np.int32, count=size)
+        self._vehicles[:size] = np.fromiter(map(self.vehicle_table.intern, self.vehicle_ids), dtype=np.int64, count=size)
+        intern_edge = self.edge_table.intern
+        self._edges[:size] = np.fromiter((intern_edge(state[tc.VAR_ROAD_ID]) for state in states), dtype=np.int64, count=size)
+
+    @property
+    def positions(self):
+        """ (vehicles, 2) array of x, y positions, in vehicle_ids order. """
+        return self._positions[:self.size]
+
+    @property
+    def speeds(self):
+        """ Array of speeds (m/s), in vehicle_ids order. """
+        return self._speeds[:self.size]
+
+    @property
+    def lanes(self):
+        """ Array of lane indices, in vehicle_ids order. """
+        return self._lanes[:self.size]
+
+    @property
+    def vehicles(self):
+        """ Array of interned vehicle IDs (see vehicle_table), in vehicle_ids order. """
+        return self._vehicles[:self.size]
+
+    @property
+    def edges(self):
+        """ Array of interned edge IDs (see edge_table), in vehicle_ids order. """
+        return self._edges[:self.size]
+
+    def get_fastest_vehicle(self):
+        """ Returns (vehicle ID, speed) of the fastest vehicle, or (None, 0) when the road is empty. """
+        if not self.size:
+            return None, 0.0
+        index = int(np.argmax(self.speeds))
+        return self.vehicle_ids[index], float(self._speeds[index])
+
+    def get_mean_speed(self):
+        """ Returns the mean speed (m/s) of all vehicles, or 0 when the road is empty. """
+        return float(self.speeds.mean()) if self.size else 0.0
+
+    def get_stopped_count(self):
+        """ Returns the number of vehicles slower than the stopped speed. """
+        return int(np.count_nonzero(self.speeds < self.stopped_speed))
+
+    def get_edge_counts(self):
+        """ Returns a dict of edge ID -> number of vehicles on it (edges without vehicles are left out). """
+        counts = np.bincount(self.edges, minlength=len(self.edge_table))
+        return {self.edge_table.ids[edge]: int(counts[edge]) for edge in np.flatnonzero(counts)}
+
+    def get_speed_histogram(self, bins=10, max_speed=None):
+        """ Returns (counts, bin edges) of the vehicle speeds between 0 and max_speed (default: the fastest vehicle). """
+        upper = max_speed if max_speed is not None else (float(self.speeds.max()) if self.size else 0.0)
+        return np.histogram(self.speeds, bins=bins, range=(0.0, max(upper, self.stopped_speed)))
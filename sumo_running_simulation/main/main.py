@@ -1,6 +1,12 @@
 from core.simulation_runner import SimulationRunner
 
 if __name__ == "__main__":
-    simulation = SimulationRunner("flow_444.0") # Initialize the simulation with tracking specific vehicle
+    run_mode = "gui" # "headless" (max speed, no GUI/console), "gui" (sumo-gui) or "realtime" (paced to wall-clock time)
+    eta_pattern = None # e.g. "flow_4*" to track the ETA of every matching vehicle (written to main/ETA_table.csv)
+    profile = False # True to log per-phase step times and SUMO calls per step at the end of the run
+    checkpoint_interval = None # e.g. 1000 to save the SUMO + tracker state to main/checkpoints every 1000 steps
+    from_checkpoint = None # e.g. "latest" to resume a crashed run, or "step_2999" to skip the warm-up
+    simulation = SimulationRunner("flow_444.0", run_mode=run_mode, eta_pattern=eta_pattern, profile=profile,
+                                  checkpoint_interval=checkpoint_interval, from_checkpoint=from_checkpoint) # Initialize the simulation with tracking specific vehicle
     delay = 0.01 # Add delay to slow down the simulation speed for better visualization
     simulation.run_simulation(delay=0)
@@ -0,0 +1,14 @@
+from core.scenario_sweep import ScenarioSweep
+
+if __name__ == "__main__":
+    # Every combination below runs as an independent SUMO instance in its own worker process
+    scenarios = ScenarioSweep.build_grid(
+        seeds=(1, 2, 3, 4),
+        demand_scales=(1.0, 1.5),
+        phase_durations=(10, 20),
+        eta_predictors=("travel_time", "speed"),
+        num_of_steps=1000,
+        tracked_vehicle_id="flow_444.0",
+    )
+    sweep = ScenarioSweep(scenarios, output_dir="main/sweep")
+    sweep.run()